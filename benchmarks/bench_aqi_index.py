@@ -0,0 +1,80 @@
+# Micro-benchmark: nearest-time AQI lookup, DataFrame scan vs AQIIndex.
+#
+#   python benchmarks/bench_aqi_index.py [--years 3] [--locations 19] [--queries 200]
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from waybetter.aqi_index import AQIIndex
+
+
+# Synthetic dataset shaped like pm25_only_aqi_dataset_updated.csv (15-minute readings)
+def make_dataset(n_locations, years, seed=0):
+    rng = np.random.default_rng(seed)
+    stamps = pd.date_range('2020-01-01', periods=int(years * 365 * 96), freq='15min')
+    frames = []
+    for i in range(n_locations):
+        frames.append(pd.DataFrame({
+            'Location': f'Station {i}',
+            'From Date': stamps,
+            'PM2.5': rng.uniform(10, 300, len(stamps)).round(1),
+        }))
+    return pd.concat(frames, ignore_index=True), stamps
+
+
+# The lookup fyp.py used before the index existed
+def legacy_lookup(df, location, date_time):
+    df_loc = df[df['Location'] == location]
+    closest_time = df_loc.iloc[(df_loc['From Date'] - date_time).abs().argsort()[:1]]
+    return round(closest_time['PM2.5'].values[0])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--years', type=float, default=3)
+    parser.add_argument('--locations', type=int, default=19)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    df, stamps = make_dataset(args.locations, args.years)
+    print(f"dataset: {len(df):,} rows, {args.locations} locations, {args.years} years @ 15 min")
+
+    rng = np.random.default_rng(1)
+    locations = [f'Station {i}' for i in rng.integers(0, args.locations, args.queries)]
+    offsets = rng.integers(0, (stamps[-1] - stamps[0]).value, args.queries)
+    when = [stamps[0] + pd.Timedelta(int(o), unit='ns') for o in offsets]
+
+    t0 = time.perf_counter()
+    index = AQIIndex.from_frame(df)
+    build = time.perf_counter() - t0
+
+    n_legacy = min(args.queries, 20)
+    t0 = time.perf_counter()
+    expected = [legacy_lookup(df, loc, w) for loc, w in zip(locations[:n_legacy], when[:n_legacy])]
+    legacy = (time.perf_counter() - t0) / n_legacy
+
+    t0 = time.perf_counter()
+    single = [index.nearest(loc, w) for loc, w in zip(locations, when)]
+    indexed = (time.perf_counter() - t0) / args.queries
+
+    t0 = time.perf_counter()
+    batch = index.nearest_batch(locations, when)
+    batched = (time.perf_counter() - t0) / args.queries
+
+    assert [round(v) for v in single[:n_legacy]] == expected
+    assert np.array_equal(batch, np.array(single))
+
+    print(f"index build:            {build * 1e3:10.1f} ms (once per process)")
+    print(f"legacy scan:            {legacy * 1e6:10.1f} us/lookup")
+    print(f"AQIIndex.nearest:       {indexed * 1e6:10.1f} us/lookup  ({legacy / indexed:,.0f}x)")
+    print(f"AQIIndex.nearest_batch: {batched * 1e6:10.2f} us/lookup  ({legacy / batched:,.0f}x)")
+
+
+if __name__ == '__main__':
+    main()
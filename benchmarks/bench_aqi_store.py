@@ -0,0 +1,78 @@
+# Benchmark: AQI dataset cold load, CSV parse vs partitioned Parquet store.
+# Each load runs in a fresh subprocess so the page cache is the only thing shared.
+#
+#   python benchmarks/bench_aqi_store.py [--years 3] [--locations 19] [--repeat 3]
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+from bench_aqi_index import make_dataset
+from waybetter.aqi_store import convert_csv
+
+PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, {root!r})
+from waybetter.aqi_index import AQIIndex
+from waybetter.aqi_store import read_csv, read_parquet
+kind, path, locations = sys.argv[1], sys.argv[2], json.loads(sys.argv[3])
+t1 = time.perf_counter()
+if kind == 'csv':
+    df = read_csv(path)
+else:
+    df = read_parquet(path, locations)
+t2 = time.perf_counter()
+AQIIndex.from_frame(df)
+t3 = time.perf_counter()
+print(json.dumps({{'load': t2 - t1, 'index': t3 - t2, 'total': t3 - t0, 'rows': len(df)}}))
+"""
+
+
+def probe(kind, path, locations=None, repeat=3):
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, '-c', PROBE.format(root=str(ROOT)), kind, str(path), json.dumps(locations)],
+            check=True, capture_output=True, text=True
+        )
+        runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return min(runs, key=lambda r: r['total'])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--years', type=float, default=3)
+    parser.add_argument('--locations', type=int, default=19)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        df, _ = make_dataset(args.locations, args.years)
+        csv_path = Path(tmp, 'aqi.csv')
+        df.to_csv(csv_path, index=False)
+        store = Path(tmp, 'aqi_parquet')
+        convert_csv(csv_path, store)
+
+        csv_mb = csv_path.stat().st_size / 1e6
+        store_mb = sum(p.stat().st_size for p in store.rglob('*.parquet')) / 1e6
+        print(f"dataset: {len(df):,} rows | CSV {csv_mb:.1f} MB | Parquet {store_mb:.1f} MB")
+
+        results = [
+            ('CSV read_csv + to_datetime', probe('csv', csv_path, repeat=args.repeat)),
+            ('Parquet, all locations', probe('parquet', store, repeat=args.repeat)),
+            ('Parquet, 3 locations', probe('parquet', store, ['Station 0', 'Station 1', 'Station 2'], args.repeat)),
+        ]
+        for label, r in results:
+            print(f"{label:28s} load {r['load'] * 1e3:8.1f} ms | index {r['index'] * 1e3:7.1f} ms | "
+                  f"process total {r['total'] * 1e3:8.1f} ms | {r['rows']:,} rows")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+# Benchmark: claim registry throughput under repeated claims. Replays a
+# stream of (wallet, route) claims where most are repeats of earlier ones,
+# from several threads sharing one queue file, and checks exactly one claim
+# per (wallet, route) made it into the queue.
+#
+#   python benchmarks/bench_claim_dedup.py [--claims 20000] [--unique 2000] [--threads 4]
+import argparse
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from waybetter.reward_queue import ClaimQueue, DuplicateClaim
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--claims', type=int, default=20000)
+    parser.add_argument('--unique', type=int, default=2000, help='distinct (wallet, route) pairs')
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    pairs = [(f"0x{rng.getrandbits(160):040x}", f"{rng.getrandbits(160):040x}") for _ in range(args.unique)]
+    stream = [pairs[rng.randrange(args.unique)] for _ in range(args.claims)]
+    now = time.time()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = ClaimQueue(Path(tmp, 'claims.sqlite3'))
+        accepted = [0] * args.threads
+        rejected = [0] * args.threads
+
+        def worker(i):
+            for wallet, fingerprint in stream[i::args.threads]:
+                try:
+                    queue.enqueue(wallet, fingerprint, now=now)
+                    accepted[i] += 1
+                except DuplicateClaim:
+                    rejected[i] += 1
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+        t0 = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - t0
+        queued = queue.stats().get('queued', 0)
+
+    expected = len(set(stream))
+    print(f"{args.claims} claims, {expected} distinct, {args.threads} threads: {elapsed:.2f}s "
+          f"({args.claims / elapsed * 60:,.0f} claims/min)")
+    print(f"accepted {sum(accepted)}, rejected {sum(rejected)}, queued {queued}"
+          f" -> {'ok' if sum(accepted) == queued == expected else 'MISMATCH'}")
+
+
+if __name__ == '__main__':
+    main()
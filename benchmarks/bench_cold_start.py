@@ -0,0 +1,177 @@
+# Benchmark: cold start of the Streamlit page. Each run is a fresh
+# interpreter, so nothing is imported or cached yet:
+#
+#   - imports: `python -X importtime` over fyp.py's own import lines,
+#     with the slowest top-level modules
+#   - first render: Streamlit's AppTest runs fyp.py; "form" is when the route
+#     form's submit button is created (elements stream to the browser as they
+#     are created, so that's when the page is usable) and "script" is the whole
+#     run (both include the 0.5 s header animation)
+#   - first plan: the form is submitted and the routes are planned and drawn
+#     (this includes the page's 1.5 s loading spinner)
+#
+# Synthetic AQI data and the local ORS stub stand in for the real ones. The
+# chain is unreachable, so the numbers also show that an outage doesn't block
+# routing. Each run is appended with its git commit to a JSON-lines history,
+# so cold start can be tracked over time. Pass --root to measure another
+# checkout, e.g. a `git worktree` of an older commit.
+#
+#   python benchmarks/bench_cold_start.py [--runs 3] [--root .] [--history benchmarks/cold_start_history.jsonl]
+import argparse
+import datetime
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+from ors_stub import start_stub
+
+# Run inside the child process, from the checkout being measured
+PAGE_RUN = """
+import json, time
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+form_drawn = []
+submit_button = st.form_submit_button
+def timed_submit_button(*args, **kwargs):
+    form_drawn.append(time.perf_counter())
+    return submit_button(*args, **kwargs)
+st.form_submit_button = timed_submit_button
+
+at = AppTest.from_file('fyp.py', default_timeout=300)
+t0 = time.perf_counter()
+at.run()
+result = {'first_render_s': time.perf_counter() - t0, 'first_plan_s': None, 'routes': False}
+result['form_s'] = form_drawn[0] - t0 if form_drawn else None
+submit = [b for b in at.button if 'Find Best Routes' in b.label]
+result['form'] = bool(submit) and not at.exception
+if result['form']:
+    t0 = time.perf_counter()
+    submit[0].click().run()
+    result['first_plan_s'] = time.perf_counter() - t0
+    result['routes'] = any('Route Map' in m.value for m in at.markdown) and not at.exception
+result['exceptions'] = [str(e.value)[:200] for e in at.exception]
+print(json.dumps(result))
+"""
+
+
+def page_imports(root):
+    lines = (root / 'fyp.py').read_text().splitlines()
+    return '\n'.join(line for line in lines if re.match(r'(import|from) \S+', line))
+
+
+# (total seconds, [(module, seconds)] slowest first) for one cold import
+def import_times(root, env):
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', page_imports(root)],
+                          cwd=root, env=env, capture_output=True, text=True, check=True)
+    modules = []
+    for line in proc.stderr.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)', line)
+        # Top-level imports only, not what they pull in
+        if match and not match.group(2):
+            modules.append((match.group(3), int(match.group(1)) / 1e6))
+    return sum(s for _, s in modules), sorted(modules, key=lambda m: -m[1])
+
+
+def page_run(root, env):
+    proc = subprocess.run([sys.executable, '-c', PAGE_RUN], cwd=root, env=env,
+                          capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def git_commit(root):
+    proc = subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=root, capture_output=True, text=True)
+    return proc.stdout.strip() or None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--years', type=float, default=0.5)
+    parser.add_argument('--root', type=Path, default=ROOT, help='checkout to measure')
+    parser.add_argument('--history', type=Path, default=ROOT / 'benchmarks' / 'cold_start_history.jsonl')
+    parser.add_argument('--top', type=int, default=6)
+    args = parser.parse_args()
+    root = args.root.resolve()
+
+    from profile_plan import station_dataset
+
+    server = start_stub()
+    df, _ = station_dataset(args.years)
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp, 'aqi.csv')
+        df.to_csv(csv_path, index=False)
+        env = dict(
+            os.environ,
+            PYTHONPATH=str(root),
+            AQI_CSV=str(csv_path),
+            ORS_BASE_URL=f"http://127.0.0.1:{server.server_port}",
+            # Nothing listens on the discard port: the chain is down
+            GANACHE_URL='http://127.0.0.1:9',
+            CONTRACT_ADDRESS='0x0000000000000000000000000000000000000001',
+        )
+
+        imports, forms, renders, plans = [], [], [], []
+        for run in range(args.runs):
+            # Fresh artifacts and stores every run, as on a new deployment
+            state = Path(tmp, f'run{run}')
+            state.mkdir()
+            env.update(
+                AQI_STORE_DIR=str(state / 'aqi_parquet'), MODEL_STORE_DIR=str(state / 'arima_models'),
+                ARIMA_PICKLE=str(state / 'arima_models.pkl'), FORECAST_CUBE_DIR=str(state / 'forecast_cube'),
+                AQI_GRID_DIR=str(state / 'aqi_grid'), ROAD_GRAPH_DIR=str(state / 'road_graph'),
+                ROUTE_CACHE_PATH=str(state / 'routes.sqlite3'), CLAIM_QUEUE_PATH=str(state / 'claims.sqlite3'),
+                LEDGER_PATH=str(state / 'ledger.sqlite3'),
+            )
+            total, modules = import_times(root, env)
+            imports.append(total)
+            result = page_run(root, env)
+            renders.append(result['first_render_s'])
+            if result['form_s'] is not None:
+                forms.append(result['form_s'])
+            if result['exceptions']:
+                print(f"run {run}: page raised {result['exceptions']}")
+            if result['routes']:
+                plans.append(result['first_plan_s'])
+
+    server.shutdown()
+    record = {
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(root),
+        'python': sys.version.split()[0],
+        'imports_s': round(statistics.median(imports), 3),
+        'first_render_s': round(statistics.median(renders), 3),
+        'form_rendered': result['form'],
+        'form_s': round(statistics.median(forms), 3) if forms else None,
+        'first_plan_s': round(statistics.median(plans), 3) if plans else None,
+    }
+
+    print(f"commit {record['commit']}, {args.runs} cold runs, chain down")
+    print(f"imports:      {record['imports_s']:.3f}s  (slowest: "
+          + ', '.join(f"{name} {s:.2f}s" for name, s in modules[:args.top]) + ")")
+    print(f"first render: " + (f"form {record['form_s']:.3f}s, " if forms else "form NOT drawn, ")
+          + f"script {record['first_render_s']:.3f}s")
+    print(f"first plan:   " + (f"{record['first_plan_s']:.3f}s" if plans else "no routes (page blocked)"))
+
+    previous = None
+    if args.history.exists():
+        lines = args.history.read_text().splitlines()
+        previous = json.loads(lines[-1]) if lines else None
+    if previous:
+        print(f"previous ({previous['commit']}, {previous['date']}): imports {previous['imports_s']:.3f}s, "
+              f"form {previous.get('form_s') or '-'}s, script {previous['first_render_s']:.3f}s, "
+              f"first plan {previous['first_plan_s'] or '-'}s")
+    with args.history.open('a') as f:
+        f.write(json.dumps(record) + '\n')
+
+
+if __name__ == '__main__':
+    main()
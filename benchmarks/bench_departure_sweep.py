@@ -0,0 +1,86 @@
+# Benchmark: "when should I leave" sweep vs planning each departure on its
+# own. Synthetic AQI for the real stations and the local ORS stub, so both
+# paths see the same cached routes; checks the sweep picks the same best
+# route and eco-score as the per-departure plans.
+#
+#   python benchmarks/bench_departure_sweep.py [--pairs 10] [--hours 4] [--step 15]
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+from ors_stub import start_stub
+from profile_plan import station_dataset
+from waybetter.engine import Engine
+from waybetter.places import places
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pairs', type=int, default=10)
+    parser.add_argument('--hours', type=float, default=4)
+    parser.add_argument('--step', type=int, default=15, help='minutes between departures')
+    parser.add_argument('--years', type=float, default=0.5)
+    args = parser.parse_args()
+
+    names = list(places)
+    df, stamps = station_dataset(args.years)
+    server = start_stub()
+    rng = np.random.default_rng(0)
+    pairs = [tuple(rng.choice(names, 2, replace=False)) for _ in range(args.pairs)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp, 'aqi.csv')
+        df.to_csv(csv_path, index=False)
+        engine = Engine(
+            aqi_csv=csv_path,
+            aqi_store_dir=Path(tmp, 'aqi_parquet'),
+            model_store_dir=Path(tmp, 'arima_models'),
+            arima_pickle=Path(tmp, 'arima_models.pkl'),
+            forecast_cube_dir=Path(tmp, 'forecast_cube'),
+            aqi_grid_dir=Path(tmp, 'aqi_grid'),
+            route_cache_path=Path(tmp, 'routes.sqlite3'),
+            road_graph_dir=Path(tmp, 'road_graph'),
+            ors_base_url=f"http://127.0.0.1:{server.server_port}",
+        )
+        start = pd.Timestamp(stamps[len(stamps) // 2])
+        # Warm the route cache and match store so both sides time scoring only
+        for source, destination in pairs:
+            engine.plan_routes(source, destination, start, weighting='distance')
+
+        plan_t, sweep_t, loop_t, mismatches, slots = [], [], [], 0, 0
+        for source, destination in pairs:
+            t0 = time.perf_counter()
+            engine.plan_routes(source, destination, start, weighting='distance')
+            plan_t.append(time.perf_counter() - t0)
+
+            t0 = time.perf_counter()
+            sweep = engine.sweep_departures(source, destination, start, args.hours, args.step)
+            sweep_t.append(time.perf_counter() - t0)
+            slots = len(sweep.times)
+
+            t0 = time.perf_counter()
+            plans = [engine.plan_routes(source, destination, when, weighting='distance').best for when in sweep.times]
+            loop_t.append(time.perf_counter() - t0)
+            frame = sweep.to_frame()
+            mismatches += sum(best.preference != pref or not np.isclose(best.eco_score, score)
+                              for best, pref, score in zip(plans, frame.preference, frame.eco_score))
+    server.shutdown()
+
+    print(f"{args.pairs} pairs, {slots} departures each")
+    print(f"one plan            {np.median(plan_t) * 1000:7.1f} ms")
+    print(f"sweep               {np.median(sweep_t) * 1000:7.1f} ms")
+    print(f"plan per departure  {np.median(loop_t) * 1000:7.1f} ms")
+    print(f"{mismatches} departures where the sweep and the plans disagree")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+# Benchmark: cold start time and peak RSS, arima_models.pkl vs ModelStore.
+# Each variant is measured in a fresh subprocess so RSS isn't shared.
+#
+#   python benchmarks/bench_model_store.py [--stations 19 100] [--observations 20000]
+import argparse
+import json
+import pickle
+import subprocess
+import sys
+import tempfile
+import warnings
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from waybetter.model_store import convert
+
+# Runs in the child: import, open, touch `touch` locations, report timings and RSS
+PROBE = r"""
+import json, pickle, resource, sys, time
+sys.path.insert(0, {root!r})
+import statsmodels.tsa.arima.model
+# Current RSS in KB (ru_maxrss would include the parent's peak from before exec)
+def rss_kb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * resource.getpagesize() // 1024
+kind, path, touch = sys.argv[1], sys.argv[2], json.loads(sys.argv[3])
+base = rss_kb()
+t0 = time.perf_counter()
+if kind == 'pickle':
+    with open(path, 'rb') as f:
+        models = pickle.load(f)
+else:
+    from waybetter.model_store import ModelStore
+    models = ModelStore(path)
+startup = time.perf_counter() - t0
+t0 = time.perf_counter()
+for location in touch:
+    models[location].forecast(96)
+first_use = time.perf_counter() - t0
+rss = rss_kb() - base
+print(json.dumps({{'startup': startup, 'first_use': first_use, 'rss_kb': rss}}))
+"""
+
+
+# Fit a few ARIMA models and reuse them under many station names, which is
+# what the pickle looks like size-wise as stations are added
+def make_models(n_stations, observations, n_fits=3, seed=0):
+    from statsmodels.tsa.arima.model import ARIMA
+
+    rng = np.random.default_rng(seed)
+    fits = []
+    for _ in range(n_fits):
+        noise = rng.normal(0, 20, observations)
+        series = 100 + np.convolve(noise, np.ones(8) / 8, 'same')
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            fits.append(ARIMA(series, order=(2, 0, 1)).fit())
+    return {f'Station {i}': fits[i % n_fits] for i in range(n_stations)}
+
+
+def probe(kind, path, touch):
+    out = subprocess.run(
+        [sys.executable, '-c', PROBE.format(root=str(ROOT)), kind, str(path), json.dumps(touch)],
+        check=True, capture_output=True, text=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--stations', type=int, nargs='+', default=[19, 100])
+    parser.add_argument('--observations', type=int, default=20000)
+    parser.add_argument('--touch', type=int, default=4, help='locations a request forecasts for')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_stations in args.stations:
+            models = make_models(n_stations, args.observations)
+            pickle_path = Path(tmp, f'arima_{n_stations}.pkl')
+            with open(pickle_path, 'wb') as f:
+                # Pickle each entry separately so shared fits aren't deduplicated
+                pickle.dump({k: pickle.loads(pickle.dumps(v)) for k, v in models.items()}, f)
+            store_dir = Path(tmp, f'store_{n_stations}')
+            convert(pickle_path, store_dir)
+
+            touch = list(models)[:args.touch]
+            legacy = probe('pickle', pickle_path, touch)
+            store = probe('store', store_dir, touch)
+
+            pickle_mb = pickle_path.stat().st_size / 1e6
+            store_mb = sum(p.stat().st_size for p in store_dir.iterdir()) / 1e6
+            print(f"{n_stations} stations, {args.observations} obs/model")
+            print(f"  pickle : {pickle_mb:8.1f} MB on disk | startup {legacy['startup'] * 1e3:8.1f} ms | "
+                  f"first {args.touch} forecasts {legacy['first_use'] * 1e3:7.1f} ms | RSS +{legacy['rss_kb'] / 1024:7.1f} MB")
+            print(f"  store  : {store_mb:8.1f} MB on disk | startup {store['startup'] * 1e3:8.1f} ms | "
+                  f"first {args.touch} forecasts {store['first_use'] * 1e3:7.1f} ms | RSS +{store['rss_kb'] / 1024:7.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
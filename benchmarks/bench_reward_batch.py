@@ -0,0 +1,86 @@
+# Benchmark: per-claim giveReward vs batched giveRewardBatch payouts through
+# the reward dispatcher, on a local chain (Ganache/anvil) with the upgraded
+# rewards contract deployed and funded. Reports gas, transactions, JSON-RPC
+# calls and wall time per mode.
+#
+#   GANACHE_URL=http://127.0.0.1:8545 CONTRACT_ADDRESS=0x... \
+#       python benchmarks/bench_reward_batch.py [--claims 200] [--batch-sizes 10 50 100]
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from eth_account import Account
+from web3 import Web3
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from waybetter.reward_queue import ClaimQueue, RewardDispatcher
+from waybetter.rewards import CONTRACT_ADDRESS, GANACHE_URL, RewardContract
+
+
+class CountingProvider(Web3.HTTPProvider):
+    calls = 0
+
+    def make_request(self, method, params):
+        CountingProvider.calls += 1
+        return super().make_request(method, params)
+
+
+def run(url, address, wallets, batch_size, flush_window):
+    provider = CountingProvider(url)
+    rewards = RewardContract(address=address, web3=Web3(provider))
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = ClaimQueue(Path(tmp, 'claims.sqlite3'))
+        ids = [queue.enqueue(wallet) for wallet in wallets]
+        dispatcher = RewardDispatcher(queue, lambda: rewards, batch_size=batch_size, flush_window=flush_window)
+
+        CountingProvider.calls = 0
+        t0 = time.perf_counter()
+        while True:
+            dispatcher.run_once()
+            claims = [queue.get(claim_id) for claim_id in ids]
+            if all(claim.done for claim in claims):
+                break
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - t0
+
+    failed = sum(claim.status != 'confirmed' for claim in claims)
+    hashes = {claim.tx_hash for claim in claims if claim.tx_hash}
+    gas = sum(rewards.web3.eth.get_transaction_receipt(tx_hash).gasUsed for tx_hash in hashes)
+    return {
+        'elapsed': elapsed,
+        'transactions': dispatcher.transactions,
+        'rpc': CountingProvider.calls,
+        'gas': gas,
+        'failed': failed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default=GANACHE_URL)
+    parser.add_argument('--address', default=CONTRACT_ADDRESS)
+    parser.add_argument('--claims', type=int, default=200)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[10, 50, 100])
+    args = parser.parse_args()
+
+    if not Web3(Web3.HTTPProvider(args.url)).is_connected():
+        sys.exit(f"no node at {args.url}; start Ganache/anvil and deploy the rewards contract first")
+
+    wallets = [Account.create().address for _ in range(args.claims)]
+    modes = [('per-claim giveReward', 20, None)]
+    modes += [(f'giveRewardBatch x{size}', size, 0.0) for size in args.batch_sizes]
+
+    print(f"{args.claims} claims against {args.url}")
+    for label, batch_size, flush_window in modes:
+        r = run(args.url, args.address, wallets, batch_size, flush_window)
+        n = args.claims
+        print(f"{label:24s} {r['transactions']:5d} tx | {r['gas'] / n:9.0f} gas/claim | "
+              f"{r['rpc'] / n:6.2f} RPC/claim | {n / r['elapsed']:8.1f} claims/s | {r['failed']} failed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+# Benchmark: A* queries on the local road graph. Uses the graph built by
+# `python -m waybetter.road_graph build`, or with --synthetic a jittered
+# lattice over the Mumbai bounding box with mixed road speeds. Every query
+# is checked against scipy's Dijkstra for the same costs; alternatives are
+# timed per plan.
+#
+#   python benchmarks/bench_road_graph.py [--synthetic 400] [--queries 50] [--alternatives 4]
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from waybetter.aqi_grid import MUMBAI_BBOX
+from waybetter.places import places
+from waybetter.road_graph import ROAD_GRAPH_DIR, RoadGraph, LocalRoutingProvider
+from waybetter.spatial_index import haversine_km
+
+
+# side x side lattice, two-way streets, every 10th row/column an arterial
+def synthetic_graph(side, seed=0):
+    rng = np.random.default_rng(seed)
+    lat_min, lon_min, lat_max, lon_max = MUMBAI_BBOX
+    lats, lons = np.meshgrid(np.linspace(lat_min, lat_max, side), np.linspace(lon_min, lon_max, side), indexing='ij')
+    jitter = (lat_max - lat_min) / side / 4
+    lats = (lats + rng.uniform(-jitter, jitter, lats.shape)).reshape(-1)
+    lons = (lons + rng.uniform(-jitter, jitter, lons.shape)).reshape(-1)
+
+    ids = np.arange(side * side).reshape(side, side)
+    a = np.concatenate((ids[:, :-1].reshape(-1), ids[:-1, :].reshape(-1)))
+    b = np.concatenate((ids[:, 1:].reshape(-1), ids[1:, :].reshape(-1)))
+    arterial = np.concatenate(((ids[:, :-1] // side % 10 == 0).reshape(-1), (ids[:-1, :] % side % 10 == 0).reshape(-1)))
+    speed = np.where(arterial, 45.0, 20.0) * rng.uniform(0.8, 1.2, len(a))
+    sources, targets = np.concatenate((a, b)), np.concatenate((b, a))
+    speed = np.concatenate((speed, speed))
+    length_m = haversine_km(lats[sources], lons[sources], lats[targets], lons[targets]) * 1000
+    return RoadGraph.from_edges(lats, lons, sources, targets, length_m, length_m / (speed / 3.6), places)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dir', default=ROAD_GRAPH_DIR)
+    parser.add_argument('--synthetic', type=int, default=0, metavar='SIDE', help='use a SIDE x SIDE lattice')
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--alternatives', type=int, default=4)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    graph = synthetic_graph(args.synthetic) if args.synthetic else RoadGraph.open(args.dir)
+    if graph is None:
+        sys.exit(f"no road graph in {args.dir}; build one or pass --synthetic")
+    print(f"{graph.n_nodes:,} nodes, {graph.n_edges:,} edges, loaded in {time.perf_counter() - t0:.2f}s")
+
+    rng = np.random.default_rng(1)
+    names = list(places)
+    pairs = [tuple(rng.choice(len(names), 2, replace=False)) for _ in range(args.queries)]
+    station_aqi = rng.uniform(50, 300, len(graph.stations))
+    station_congestion = rng.uniform(10, 100, len(graph.stations))
+    factors = graph.eco_factors(station_aqi, station_congestion)
+    searches = {
+        'fastest': (graph.travel_s, None),
+        'shortest': (graph.length_m, None),
+        'eco': (graph.travel_s, factors),
+    }
+    sources = np.repeat(np.arange(graph.n_nodes), np.diff(graph.indptr))
+
+    for pref, (cost, pref_factors) in searches.items():
+        if pref_factors is not None:
+            cost = graph.eco_costs(pref_factors)
+        matrix = csr_matrix((cost, (sources, graph.targets)), shape=(graph.n_nodes, graph.n_nodes))
+        times, mismatches = [], 0
+        for i, j in pairs:
+            s, t = graph.nearest_nodes([places[names[i]][0], places[names[j]][0]],
+                                       [places[names[i]][1], places[names[j]][1]])
+            t0 = time.perf_counter()
+            edges = graph.shortest_path(int(s), int(t), *searches[pref])
+            times.append(time.perf_counter() - t0)
+            reference = dijkstra(matrix, indices=int(s))[int(t)]
+            mismatches += not np.isclose(cost[edges].sum(), reference)
+        times = np.array(times) * 1000
+        print(f"{pref:10s} A* p50 {np.percentile(times, 50):7.1f} ms  p95 {np.percentile(times, 95):7.1f} ms  "
+              f"{mismatches} mismatches vs Dijkstra")
+
+    provider = LocalRoutingProvider(graph)
+    t0 = time.perf_counter()
+    for i, j in pairs:
+        provider.fetch_routes(places[names[i]], places[names[j]], ('fastest', 'shortest', 'eco'),
+                              station_aqi=station_aqi, station_congestion=station_congestion)
+    print(f"fetch_routes (3 preferences + GeoJSON): {(time.perf_counter() - t0) / len(pairs) * 1000:.1f} ms per plan")
+
+    t0 = time.perf_counter()
+    found = 0
+    for i, j in pairs:
+        routes, _ = provider.fetch_alternatives(places[names[i]], places[names[j]], args.alternatives,
+                                                station_aqi=station_aqi, station_congestion=station_congestion)
+        found += len(routes)
+    print(f"fetch_alternatives (k={args.alternatives}): {(time.perf_counter() - t0) / len(pairs) * 1000:.1f} ms per plan, "
+          f"{found / len(pairs):.1f} routes on average")
+
+
+if __name__ == '__main__':
+    main()
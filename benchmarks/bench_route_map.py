@@ -0,0 +1,141 @@
+# Benchmark: route map payload and render time. Renders the result map for
+# station pairs the old way (full ORS GeoJSON straight into folium, every
+# rerun) and the new way (simplified, rounded geometry, rendered once per
+# route set then served from cache), and reports HTML size and time per
+# render. Routes are stub routes with street-level jitter at roughly ORS
+# vertex density; checks no dropped vertex is further than the tolerance
+# from the simplified line.
+#
+#   python benchmarks/bench_route_map.py [--pairs 10] [--vertices-per-km 60] [--zoom 15]
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+import folium
+from ors_stub import canned_route
+from waybetter.places import places
+from waybetter.route_map import ROUTE_COLORS, MUMBAI_CENTER, render_route_map, simplify_indices, tolerance_for_zoom
+from waybetter.route_matches import geometry_key, route_coordinates
+from waybetter.scoring import RouteScore
+
+
+def jittered_routes(source, destination, vertices_per_km, rng):
+    (lat1, lon1), (lat2, lon2) = places[source], places[destination]
+    km = np.hypot((lon2 - lon1) * 105, (lat2 - lat1) * 111)
+    scores = []
+    for pref in ('recommended', 'fastest', 'shortest'):
+        route = canned_route((lon1, lat1), (lon2, lat2), pref, max(int(km * vertices_per_km), 50))
+        coords = np.asarray(route['features'][0]['geometry']['coordinates'])
+        # ~3 m of wiggle, like a polyline following real streets
+        coords[1:-1] += rng.normal(0, 3e-5, (len(coords) - 2, 2))
+        route['features'][0]['geometry']['coordinates'] = coords.round(6).tolist()
+        scores.append(RouteScore(route, pref, 0.0, [], km, 0.0, 0.0, 0.0))
+    return scores
+
+
+# The map as fyp.py drew it before: whole route GeoJSON into folium
+def render_full(scores, source, destination):
+    route_map = folium.Map(location=list(MUMBAI_CENTER), zoom_start=11, tiles="OpenStreetMap")
+    for idx, scored in enumerate(scores):
+        if idx == 0:
+            style = {'color': 'green', 'weight': 5, 'opacity': 0.8}
+        else:
+            style = {'color': ROUTE_COLORS[(idx - 1) % len(ROUTE_COLORS)], 'weight': 3, 'opacity': 0.6}
+        folium.GeoJson(scored.route, name=scored.preference,
+                       style_function=lambda _, style=style: style).add_to(route_map)
+    folium.Marker(places[source], popup=f"Start: {source}", tooltip=f"Start: {source}",
+                  icon=folium.Icon(color="green", icon="play", prefix="fa")).add_to(route_map)
+    folium.Marker(places[destination], popup=f"End: {destination}", tooltip=f"End: {destination}",
+                  icon=folium.Icon(color="red", icon="flag-checkered", prefix="fa")).add_to(route_map)
+    folium.LayerControl().add_to(route_map)
+    return folium.Figure().add_child(route_map).render()
+
+
+# Largest distance (m) from a dropped vertex to its simplified segment
+def max_deviation(coords, keep):
+    lat0 = np.radians(coords[:, 1].mean())
+    xy = np.column_stack((coords[:, 0] * np.cos(lat0), coords[:, 1])) * 111320.0
+    worst = 0.0
+    for first, last in zip(keep[:-1], keep[1:]):
+        if last - first < 2:
+            continue
+        (x1, y1), (x2, y2) = xy[first], xy[last]
+        points = xy[first + 1:last]
+        length = max(np.hypot(x2 - x1, y2 - y1), 1e-9)
+        dist = np.abs((x2 - x1) * (points[:, 1] - y1) - (y2 - y1) * (points[:, 0] - x1)) / length
+        worst = max(worst, float(dist.max()))
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pairs', type=int, default=10)
+    parser.add_argument('--vertices-per-km', type=int, default=60)
+    parser.add_argument('--zoom', type=int, default=15, help='zoom level the geometry is simplified for')
+    parser.add_argument('--reruns', type=int, default=20, help='page reruns per route set')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    names = list(places)
+    pairs = [tuple(rng.choice(names, 2, replace=False)) for _ in range(args.pairs)]
+    route_sets = [(s, d, jittered_routes(s, d, args.vertices_per_km, rng)) for s, d in pairs]
+    tolerance = tolerance_for_zoom(args.zoom)
+
+    vertices = kept = 0
+    worst = 0.0
+    for _, _, scores in route_sets:
+        for scored in scores:
+            coords = np.asarray(route_coordinates(scored.route))
+            keep = simplify_indices(coords, tolerance)
+            vertices += len(coords)
+            kept += len(keep)
+            worst = max(worst, max_deviation(coords, keep))
+    print(f"{args.pairs} route sets, {vertices} vertices -> {kept} at zoom {args.zoom} "
+          f"(tolerance {tolerance:.1f} m), max deviation {worst:.2f} m "
+          f"-> {'ok' if worst <= tolerance else 'MISMATCH'}")
+
+    # Warm folium's template and tile provider lookups before timing
+    source, destination, scores = route_sets[0]
+    render_full(scores, source, destination)
+    full_bytes = full_time = 0.0
+    for source, destination, scores in route_sets:
+        t0 = time.perf_counter()
+        html = render_full(scores, source, destination)
+        full_time += time.perf_counter() - t0
+        full_bytes += len(html.encode())
+
+    new_bytes = new_time = 0.0
+    for source, destination, scores in route_sets:
+        t0 = time.perf_counter()
+        html = render_route_map(scores, source, destination, places[source], places[destination], tolerance)
+        new_time += time.perf_counter() - t0
+        new_bytes += len(html.encode())
+
+    # A cached rerun only builds the route set key and looks the HTML up
+    cache = {}
+    for source, destination, scores in route_sets:
+        key = tuple((s.preference, geometry_key(route_coordinates(s.route))) for s in scores)
+        cache[key] = render_route_map(scores, source, destination, places[source], places[destination], tolerance)
+    t0 = time.perf_counter()
+    for _ in range(args.reruns):
+        for source, destination, scores in route_sets:
+            html = cache[tuple((s.preference, geometry_key(route_coordinates(s.route))) for s in scores)]
+    cached_time = (time.perf_counter() - t0) / (args.pairs * args.reruns)
+
+    n = args.pairs
+    print(f"full:       {full_bytes / n / 1024:8.1f} KiB/map  {full_time / n * 1000:7.2f} ms/render")
+    print(f"simplified: {new_bytes / n / 1024:8.1f} KiB/map  {new_time / n * 1000:7.2f} ms/render "
+          f"({full_bytes / new_bytes:.1f}x smaller)")
+    print(f"cached:     {'':8s}          {cached_time * 1000:7.2f} ms/rerun "
+          f"({full_time / n / cached_time:.0f}x less than rendering)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# Micro-benchmark: route vertex -> nearest station, geodesic loop vs StationIndex.
+#
+#   python benchmarks/bench_station_index.py [--vertices 3000] [--stations 19 500 5000]
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from geopy.distance import geodesic
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from waybetter.spatial_index import StationIndex
+
+# Mumbai bounding box
+LAT_RANGE = (18.89, 19.38)
+LON_RANGE = (72.80, 72.95)
+
+
+# The per-vertex loop fyp.py used before the index existed
+def find_nearest_place(lat, lon, places, threshold_km=1.0):
+    closest_place = None
+    min_distance = float('inf')
+    for place_name, (p_lat, p_lon) in places.items():
+        dist = geodesic((lat, lon), (p_lat, p_lon)).km
+        if dist < threshold_km and dist < min_distance:
+            min_distance = dist
+            closest_place = place_name
+    return closest_place
+
+
+def random_points(rng, n):
+    return rng.uniform(*LAT_RANGE, n), rng.uniform(*LON_RANGE, n)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--vertices', type=int, default=3000)
+    parser.add_argument('--stations', type=int, nargs='+', default=[19, 500, 5000])
+    parser.add_argument('--legacy-solves', type=int, default=20000,
+                        help='geodesic solves to time the legacy loop with per station count')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    route_lats, route_lons = random_points(rng, args.vertices)
+
+    for n_stations in args.stations:
+        lats, lons = random_points(rng, n_stations)
+        places = {f'Station {i}': (lats[i], lons[i]) for i in range(n_stations)}
+
+        t0 = time.perf_counter()
+        index = StationIndex(places)
+        build = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        ids, _ = index.query(route_lats, route_lons)
+        indexed = time.perf_counter() - t0
+
+        n_legacy = max(1, min(args.vertices, args.legacy_solves // n_stations))
+        t0 = time.perf_counter()
+        expected = [find_nearest_place(lat, lon, places) for lat, lon in zip(route_lats[:n_legacy], route_lons[:n_legacy])]
+        legacy = (time.perf_counter() - t0) / n_legacy * args.vertices
+
+        got = [index.names[i] if i >= 0 else None for i in ids[:n_legacy]]
+        mismatches = sum(a != b for a, b in zip(got, expected))
+
+        print(f"{n_stations:>6} stations: build {build * 1e3:7.2f} ms | "
+              f"geodesic loop {legacy * 1e3:10.1f} ms/route (est.) | "
+              f"index {indexed * 1e3:7.2f} ms/route | {legacy / indexed:,.0f}x | "
+              f"{mismatches} mismatches in {n_legacy} vertices")
+
+
+if __name__ == '__main__':
+    main()
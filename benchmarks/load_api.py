@@ -0,0 +1,140 @@
+# Load test for the HTTP API (waybetter.api) against the ORS stub.
+# Starts the stub and the API server as subprocesses on synthetic data in a
+# temp directory, then drives them with an asyncio httpx client and reports
+# p50/p99 latency and requests/sec per endpoint.
+#
+#   python benchmarks/load_api.py [--requests 2000] [--concurrency 50] [--delay 0.05] [--workers 1]
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+from profile_plan import station_dataset
+from waybetter.places import places
+
+
+def wait_ready(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+def report(label, latencies, elapsed, failures):
+    ms = np.array(latencies) * 1e3
+    print(f"{label:22s} n={len(ms):6d} | p50 {np.percentile(ms, 50):8.1f} ms | p99 {np.percentile(ms, 99):8.1f} ms | "
+          f"{len(ms) / elapsed:8.1f} req/s | {failures} failed")
+
+
+async def run_load(base_url, jobs, concurrency):
+    latencies = {}
+    failures = {}
+    queue = asyncio.Queue()
+    for job in jobs:
+        queue.put_nowait(job)
+
+    async def worker(client):
+        while not queue.empty():
+            label, method, path, body = queue.get_nowait()
+            t0 = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            latencies.setdefault(label, []).append(time.perf_counter() - t0)
+            if response.status_code != 200:
+                failures[label] = failures.get(label, 0) + 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+    return latencies, failures, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--delay', type=float, default=0.05, help='stub latency per ORS request')
+    parser.add_argument('--workers', type=int, default=1, help='API server worker processes')
+    parser.add_argument('--ors-workers', type=int, default=32, help='concurrent ORS requests in the API server')
+    parser.add_argument('--years', type=float, default=1)
+    parser.add_argument('--plan-share', type=float, default=0.5, help='fraction of requests that plan routes')
+    parser.add_argument('--api-port', type=int, default=8765)
+    parser.add_argument('--stub-port', type=int, default=8766)
+    args = parser.parse_args()
+
+    names = list(places)
+    df, stamps = station_dataset(args.years)
+    when = pd.Timestamp(stamps[len(stamps) // 2]).isoformat()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        df.to_csv(Path(tmp, 'aqi.csv'), index=False)
+        env = dict(
+            os.environ,
+            PYTHONPATH=str(ROOT),
+            AQI_CSV=str(Path(tmp, 'aqi.csv')),
+            AQI_STORE_DIR=str(Path(tmp, 'aqi_parquet')),
+            MODEL_STORE_DIR=str(Path(tmp, 'arima_models')),
+            ARIMA_PICKLE=str(Path(tmp, 'arima_models.pkl')),
+            FORECAST_CUBE_DIR=str(Path(tmp, 'forecast_cube')),
+            AQI_GRID_DIR=str(Path(tmp, 'aqi_grid')),
+            ROUTE_CACHE_PATH=str(Path(tmp, 'route_cache.sqlite3')),
+            CONGESTION_PROFILE=str(Path(tmp, 'congestion_profile.csv')),
+            ORS_BASE_URL=f'http://127.0.0.1:{args.stub_port}',
+            ORS_API_KEY='stub',
+            ORS_MAX_WORKERS=str(args.ors_workers),
+        )
+        stub = subprocess.Popen([sys.executable, str(ROOT / 'benchmarks' / 'ors_stub.py'),
+                                 '--port', str(args.stub_port), '--delay', str(args.delay)], env=env)
+        api = subprocess.Popen([sys.executable, '-m', 'waybetter.api', '--port', str(args.api_port),
+                                '--workers', str(args.workers)], env=env, cwd=tmp)
+        base_url = f'http://127.0.0.1:{args.api_port}'
+        try:
+            wait_ready(f'{base_url}/health')
+            # Load the engine's data before timing
+            httpx.post(f'{base_url}/routes', json={'source': names[0], 'destination': names[1], 'when': when},
+                       timeout=120).raise_for_status()
+
+            rng = random.Random(0)
+            jobs = []
+            for _ in range(args.requests):
+                if rng.random() < args.plan_share:
+                    source, destination = rng.sample(names, 2)
+                    body = {'source': source, 'destination': destination, 'when': when, 'weighting': 'distance'}
+                    jobs.append(('POST /routes', 'POST', '/routes', body))
+                else:
+                    jobs.append(('GET /stations/*/aqi', 'GET', f'/stations/{rng.choice(names)}/aqi?when={when}', None))
+
+            latencies, failures, elapsed = asyncio.run(run_load(base_url, jobs, args.concurrency))
+            print(f"{args.requests} requests, concurrency {args.concurrency}, stub delay {args.delay * 1e3:.0f} ms, "
+                  f"{args.workers} worker(s), {elapsed:.2f}s")
+            for label, values in sorted(latencies.items()):
+                report(label, values, elapsed, failures.get(label, 0))
+            report('all', [v for values in latencies.values() for v in values], elapsed, sum(failures.values()))
+        finally:
+            api.terminate()
+            stub.terminate()
+            api.wait()
+            stub.wait()
+
+
+if __name__ == '__main__':
+    main()
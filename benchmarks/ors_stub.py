@@ -0,0 +1,120 @@
+# Local stand-in for the OpenRouteService directions endpoint.
+# Serves canned GeoJSON for POST /v2/directions/<profile>/geojson so the
+# routing layer, the API service and the load tests can run without network
+# access or an API key.
+#
+#   python benchmarks/ors_stub.py --port 8090 [--delay 0.2] [--fail shortest] [--fixture route.json]
+#
+# then point the app at it with ORS_BASE_URL=http://127.0.0.1:8090
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Sideways bend (degrees) per preference so the three routes differ
+BENDS = {'recommended': 0.0, 'fastest': 0.01, 'shortest': -0.01}
+
+
+# A bent polyline from start to end with `vertices` points, shaped like an ORS response
+def canned_route(start, end, preference, vertices=500):
+    (lon1, lat1), (lon2, lat2) = start, end
+    t = np.linspace(0.0, 1.0, vertices)
+    bend = BENDS.get(preference, 0.0) * np.sin(np.pi * t)
+    lons = lon1 + (lon2 - lon1) * t + bend
+    lats = lat1 + (lat2 - lat1) * t
+    coordinates = np.column_stack((lons, lats)).round(6).tolist()
+
+    distance = float(np.sum(np.hypot(np.diff(lons) * 105000, np.diff(lats) * 111000)))
+    return {
+        'type': 'FeatureCollection',
+        'bbox': [min(lon1, lon2), min(lat1, lat2), max(lon1, lon2), max(lat1, lat2)],
+        'features': [{
+            'type': 'Feature',
+            'bbox': [min(lon1, lon2), min(lat1, lat2), max(lon1, lon2), max(lat1, lat2)],
+            'properties': {
+                'summary': {'distance': round(distance, 1), 'duration': round(distance / 8.0, 1)},
+                'way_points': [0, vertices - 1],
+            },
+            'geometry': {'type': 'LineString', 'coordinates': coordinates},
+        }],
+        'metadata': {'query': {'preference': preference}, 'engine': {'version': 'stub'}},
+    }
+
+
+def make_handler(delay=0.0, fail=(), fixture=None, vertices=500):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            parts = self.path.split('?')[0].strip('/').split('/')
+            if len(parts) != 4 or parts[:2] != ['v2', 'directions'] or parts[3] != 'geojson':
+                return self._send(404, {'error': {'code': 404, 'message': 'Not found'}})
+
+            preference = body.get('preference', 'recommended')
+            if delay:
+                time.sleep(delay)
+            if preference in fail:
+                return self._send(400, {'error': {'code': 2099, 'message': f'stub failure for {preference}'}})
+
+            if fixture is not None:
+                return self._send(200, fixture)
+            start, end = body['coordinates'][0], body['coordinates'][-1]
+            route = canned_route(start, end, preference, vertices)
+            # alternative_routes: the main route plus bends to either side
+            count = body.get('alternative_routes', {}).get('target_count', 1)
+            for i in range(1, count):
+                bent = canned_route(start, end, preference, vertices)
+                coordinates = np.array(bent['features'][0]['geometry']['coordinates'])
+                coordinates[:, 1] += 0.004 * (-1) ** i * ((i + 1) // 2) * np.sin(np.linspace(0, np.pi, len(coordinates)))
+                bent['features'][0]['geometry']['coordinates'] = coordinates.round(6).tolist()
+                route['features'].append(bent['features'][0])
+            return self._send(200, route)
+
+        def _send(self, status, payload):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/geo+json;charset=UTF-8')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+# Start the stub on a background thread; port=0 picks a free port.
+# Returns the server; its base URL is f"http://127.0.0.1:{server.server_port}".
+def start_stub(port=0, **handler_kwargs):
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(**handler_kwargs))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--delay', type=float, default=0.0, help='seconds to sleep per request')
+    parser.add_argument('--fail', nargs='*', default=[], help='preferences to answer with an error')
+    parser.add_argument('--vertices', type=int, default=500)
+    parser.add_argument('--fixture', help='recorded ORS GeoJSON response to serve verbatim')
+    args = parser.parse_args()
+
+    fixture = None
+    if args.fixture:
+        with open(args.fixture) as f:
+            fixture = json.load(f)
+
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(args.delay, set(args.fail), fixture, args.vertices))
+    print(f"ORS stub listening on http://127.0.0.1:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
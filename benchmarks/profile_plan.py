@@ -0,0 +1,96 @@
+# Profile Engine.plan_routes without Streamlit or a browser: synthetic AQI
+# data for the real stations, the local ORS stub, and everything else in a
+# temp directory. Reports the cold first plan (lazy resource loading),
+# warm plans, and the top functions from cProfile.
+#
+#   python benchmarks/profile_plan.py [--plans 50] [--years 1] [--delay 0.05] [--top 15]
+import argparse
+import cProfile
+import io
+import pstats
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+from bench_aqi_index import make_dataset
+from ors_stub import start_stub
+from waybetter.engine import Engine
+from waybetter.places import places
+
+
+# make_dataset with the real station names, so plans match stations
+def station_dataset(years):
+    names = list(places)
+    df, stamps = make_dataset(len(names), years)
+    df['Location'] = df['Location'].map({f'Station {i}': name for i, name in enumerate(names)})
+    return df, stamps
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--plans', type=int, default=50)
+    parser.add_argument('--years', type=float, default=1)
+    parser.add_argument('--delay', type=float, default=0.05, help='stub latency per ORS request')
+    parser.add_argument('--vertices', type=int, default=500)
+    parser.add_argument('--weighting', default='distance')
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    names = list(places)
+    df, stamps = station_dataset(args.years)
+    server = start_stub(delay=args.delay, vertices=args.vertices)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp, 'aqi.csv')
+        df.to_csv(csv_path, index=False)
+        engine = Engine(
+            aqi_csv=csv_path,
+            aqi_store_dir=Path(tmp, 'aqi_parquet'),
+            model_store_dir=Path(tmp, 'arima_models'),
+            arima_pickle=Path(tmp, 'arima_models.pkl'),
+            forecast_cube_dir=Path(tmp, 'forecast_cube'),
+            aqi_grid_dir=Path(tmp, 'aqi_grid'),
+            route_cache_path=Path(tmp, 'route_cache.sqlite3'),
+            congestion_profile=Path(tmp, 'congestion_profile.csv'),
+            ors_api_key='stub',
+            ors_base_url=f'http://127.0.0.1:{server.server_port}',
+        )
+
+        rng = random.Random(0)
+        pairs = [tuple(rng.sample(names, 2)) for _ in range(args.plans)]
+        when = pd.Timestamp(stamps[len(stamps) // 2]).to_pydatetime()
+
+        t0 = time.perf_counter()
+        results = engine.plan_routes(*pairs[0], when, weighting=args.weighting)
+        cold = time.perf_counter() - t0
+        print(f"cold plan (loads data, indexes, client): {cold * 1e3:8.1f} ms | "
+              f"{len(results.routes)} routes, {len(results.errors)} errors")
+
+        # First pass misses the route cache, second pass hits it
+        for label in ('warm, route cache miss', 'warm, route cache hit'):
+            profiler = cProfile.Profile()
+            t0 = time.perf_counter()
+            profiler.enable()
+            for source, destination in pairs:
+                engine.plan_routes(source, destination, when, weighting=args.weighting)
+            profiler.disable()
+            elapsed = time.perf_counter() - t0
+            print(f"{label:40s} {elapsed / len(pairs) * 1e3:8.2f} ms/plan over {len(pairs)} plans")
+
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(args.top)
+        print(out.getvalue())
+        engine.routing.close()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+# Shared fixtures: synthetic AQI data for the real stations, the local ORS
+# stub from benchmarks/, and an Engine plus API app over them with every
+# store in a temp directory. Nothing here needs network access or a chain.
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+from ors_stub import start_stub
+from profile_plan import station_dataset
+from waybetter.engine import Engine
+
+
+@pytest.fixture(scope='session')
+def ors_stub():
+    server = start_stub()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.fixture(scope='session')
+def aqi_data(tmp_path_factory):
+    df, stamps = station_dataset(0.1)
+    path = tmp_path_factory.mktemp('data') / 'aqi.csv'
+    df.to_csv(path, index=False)
+    return path, pd.Timestamp(stamps[len(stamps) // 2])
+
+
+@pytest.fixture(scope='session')
+def engine(tmp_path_factory, ors_stub, aqi_data):
+    tmp = tmp_path_factory.mktemp('engine')
+    return Engine(
+        aqi_csv=aqi_data[0],
+        aqi_store_dir=tmp / 'aqi_parquet',
+        model_store_dir=tmp / 'arima_models',
+        arima_pickle=tmp / 'arima_models.pkl',
+        forecast_cube_dir=tmp / 'forecast_cube',
+        aqi_grid_dir=tmp / 'aqi_grid',
+        route_cache_path=tmp / 'routes.sqlite3',
+        road_graph_dir=tmp / 'road_graph',
+        ors_base_url=ors_stub,
+        routing_backend='ors',
+    )
+
+
+@pytest.fixture
+def claim_queue(tmp_path):
+    from waybetter.reward_queue import ClaimQueue
+    return ClaimQueue(tmp_path / 'claims.sqlite3')
+
+
+# API app without its lifespan, so no dispatcher or ledger tailer is started
+@pytest.fixture
+def client(engine, claim_queue, tmp_path):
+    from fastapi.testclient import TestClient
+    from waybetter.api import create_app
+    from waybetter.ledger import Ledger
+
+    return TestClient(create_app(engine, claim_queue, Ledger(tmp_path / 'ledger.sqlite3')))
@@ -0,0 +1,179 @@
+# In-memory stand-in for the reward contract and its node, shaped like the
+# parts of RewardContract and web3 the dispatcher uses. Gas follows the real
+# contract's shape: crediting a wallet for the first time writes a new
+# storage slot and costs more than topping up an existing one. Wallets in
+# `reverting` make any call that pays them revert, as does paying out more
+# than the contract holds. `drop_sends` makes the
+# next sends fail like a dropped connection: 'before' the node gets the
+# transaction, or 'after' it has mined it. Mined payouts, fund() and
+# withdraw() emit the contract's events as raw logs for get_logs.
+import itertools
+
+from eth_abi import encode
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.datastructures import AttributeDict
+from web3.exceptions import ContractLogicError, TransactionNotFound
+
+from waybetter.rewards import CONTRACT_ABI, REWARD_WEI, ContractState, event_topics
+
+OWNER = Web3.to_checksum_address('0x' + '11' * 20)
+CONTRACT = Web3.to_checksum_address('0x' + '22' * 20)
+BASE_GAS = 25000
+NEW_SLOT_GAS = 25000
+UPDATE_GAS = 5000
+
+
+def wallet(i):
+    return Web3.to_checksum_address(f"0x{i + 1:040x}")
+
+
+class FakeCall:
+    def __init__(self, chain, wallets, amounts):
+        self.chain = chain
+        self.wallets = [Web3.to_checksum_address(w) for w in wallets]
+        self.amounts = amounts
+
+    def estimate_gas(self, tx):
+        self.chain.check(self.wallets, self.amounts)
+        return self.chain.gas_for(self.wallets)
+
+    def transact(self, tx):
+        return self.chain.execute(self, tx)
+
+
+class FakeFunctions:
+    def __init__(self, chain):
+        self.chain = chain
+
+    def giveReward(self, user):
+        return FakeCall(self.chain, [user], [REWARD_WEI])
+
+    def giveRewardBatch(self, users, amounts):
+        return FakeCall(self.chain, users, amounts)
+
+
+class FakeEth:
+    def __init__(self, chain):
+        self.chain = chain
+
+    @property
+    def block_number(self):
+        return self.chain.block
+
+    # Every transaction is mined at once, so 'pending' and 'latest' agree
+    def get_transaction_count(self, address, block='latest'):
+        return self.chain.nonce
+
+    def get_logs(self, log_filter):
+        topics = set(log_filter['topics'][0])
+        return [log for log in self.chain.logs
+                if log['address'] == log_filter['address'] and Web3.to_hex(log['topics'][0]) in topics
+                and log_filter['fromBlock'] <= log['blockNumber'] <= log_filter['toBlock']]
+
+    def get_block(self, number, full_transactions=False):
+        return AttributeDict({'number': number, 'transactions': self.chain.blocks.get(number, [])})
+
+    def get_transaction_receipt(self, tx_hash):
+        if tx_hash not in self.chain.receipts:
+            raise TransactionNotFound(tx_hash)
+        return self.chain.receipts[tx_hash]
+
+
+class FakeWeb3:
+    to_checksum_address = staticmethod(Web3.to_checksum_address)
+    is_address = staticmethod(Web3.is_address)
+    to_wei = staticmethod(Web3.to_wei)
+    to_hex = staticmethod(Web3.to_hex)
+
+    def __init__(self, chain):
+        self.eth = FakeEth(chain)
+
+
+class FakeContract:
+    address = CONTRACT
+
+    def __init__(self, chain):
+        self.functions = FakeFunctions(chain)
+        # Event decoding needs no node
+        self.events = Web3().eth.contract(address=CONTRACT, abi=CONTRACT_ABI).events
+
+
+class FakeChain:
+    def __init__(self, reverting=(), balance_eth=10, drop_sends=()):
+        self.balances = {}
+        self.reverting = {Web3.to_checksum_address(w) for w in reverting}
+        self.balance_wei = Web3.to_wei(balance_eth, 'ether')
+        self.receipts = {}
+        self.transactions = []
+        self.blocks = {}
+        self.logs = []
+        self.drop_sends = list(drop_sends)
+        self.nonce = 0
+        self.block = 1
+        self._hashes = itertools.count(1)
+        self.web3 = FakeWeb3(self)
+        self.contract = FakeContract(self)
+
+    def gas_for(self, wallets):
+        return BASE_GAS + sum(UPDATE_GAS if w in self.balances else NEW_SLOT_GAS for w in wallets)
+
+    def check(self, wallets, amounts):
+        if self.reverting.intersection(wallets) or sum(amounts) > self.balance_wei:
+            raise ContractLogicError("execution reverted")
+
+    # Mines the call in its own block; out of gas reverts with status 0
+    def execute(self, call, tx):
+        drop = self.drop_sends.pop(0) if self.drop_sends else None
+        if drop == 'before':
+            raise ConnectionError("connection reset")
+        self.check(call.wallets, call.amounts)
+        needed = self.gas_for(call.wallets)
+        self.nonce += 1
+        self.block += 1
+        tx_hash = next(self._hashes).to_bytes(32, 'big')
+        ok = tx['gas'] >= needed
+        if ok:
+            for w, amount in zip(call.wallets, call.amounts):
+                self.balances[w] = self.balances.get(w, 0) + amount
+                self.balance_wei -= amount
+                self.emit('RewardGiven', w, amount, tx_hash)
+        self.transactions.append((call.wallets, tx['gas'], ok))
+        self.receipts[Web3.to_hex(tx_hash)] = AttributeDict({'status': int(ok), 'blockNumber': self.block})
+        self.blocks[self.block] = [AttributeDict({
+            'hash': tx_hash, 'from': tx['from'], 'to': CONTRACT, 'nonce': tx['nonce'],
+        })]
+        if drop == 'after':
+            raise TimeoutError("read timed out")
+        return tx_hash
+
+    def emit(self, event, user, amount, tx_hash):
+        self.logs.append(AttributeDict({
+            'address': CONTRACT,
+            'topics': [HexBytes(event_topics()[event]), HexBytes(encode(['address'], [user]))],
+            'data': HexBytes(encode(['uint256'], [amount])),
+            'blockNumber': self.block,
+            'logIndex': sum(log['blockNumber'] == self.block for log in self.logs),
+            'transactionHash': HexBytes(tx_hash),
+            'transactionIndex': 0,
+            'blockHash': HexBytes(self.block.to_bytes(32, 'big')),
+            'removed': False,
+        }))
+
+    # Funding and withdrawals, each mined in its own block
+    def fund(self, sender, amount):
+        self.block += 1
+        self.balance_wei += amount
+        self.emit('Funded', sender, amount, next(self._hashes).to_bytes(32, 'big'))
+
+    def withdraw(self, user):
+        self.block += 1
+        amount = self.balances.pop(Web3.to_checksum_address(user))
+        self.emit('RewardWithdrawn', user, amount, next(self._hashes).to_bytes(32, 'big'))
+
+    # RewardContract's interface
+    def state(self):
+        return ContractState(OWNER, self.balance_wei, [OWNER], self.block)
+
+    def invalidate(self):
+        pass
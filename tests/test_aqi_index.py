@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from waybetter.aqi_index import AQIIndex
+
+
+# Readings at irregular, unsorted times for a few locations, as in the CSV
+def readings(rng, n=400):
+    start = pd.Timestamp('2024-01-01').value
+    return pd.DataFrame({
+        'Location': rng.choice(['Bandra', 'Colaba', 'Worli'], n),
+        'From Date': pd.to_datetime(start + rng.integers(0, 30 * 86400 * 10**9, n)),
+        'PM2.5': rng.uniform(20, 300, n),
+    })
+
+
+# The page's original lookup: argsort over the location's whole frame
+def argsort_nearest(df, location, when):
+    df_loc = df[df['Location'] == location]
+    return df_loc.iloc[(df_loc['From Date'] - when).abs().argsort()[:1]]['PM2.5'].values[0]
+
+
+def test_nearest_matches_argsort_scan():
+    rng = np.random.default_rng(0)
+    df = readings(rng)
+    index = AQIIndex.from_frame(df)
+    start = pd.Timestamp('2023-12-30').value
+    queries = pd.to_datetime(start + rng.integers(0, 34 * 86400 * 10**9, 50))
+    for location in ('Bandra', 'Colaba', 'Worli'):
+        for when in queries:
+            assert index.nearest(location, when) == argsort_nearest(df, location, when)
+
+        batch = index.nearest_batch([location] * len(queries), queries)
+        assert batch.tolist() == [argsort_nearest(df, location, when) for when in queries]
+
+
+def test_unknown_location():
+    index = AQIIndex.from_frame(readings(np.random.default_rng(1), 20))
+    assert index.nearest('Andheri', pd.Timestamp('2024-01-02')) is None
+    assert np.isnan(index.nearest_batch(['Andheri'], [pd.Timestamp('2024-01-02')])[0])
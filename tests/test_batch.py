@@ -0,0 +1,45 @@
+import pandas as pd
+import pyarrow.parquet as pq
+
+from waybetter.batch import plan_trips, run_batch
+
+PAIRS = [('Bandra', 'Colaba'), ('Worli', 'Powai'), ('Sion', 'Kurla')]
+
+
+def trips(when, offset=None):
+    departures = [when + pd.Timedelta(hours=h) for h in (0, 3, 7)]
+    if offset is not None:
+        departures = [t.tz_localize('Asia/Kolkata').tz_convert(offset).isoformat() for t in departures]
+    return pd.DataFrame({
+        'trip': range(len(PAIRS)),
+        'origin': [o for o, _ in PAIRS],
+        'destination': [d for _, d in PAIRS],
+        'departure': departures,
+    })
+
+
+def test_aware_departures_plan_in_local_time(engine, aqi_data):
+    when = aqi_data[1].floor('h')
+    naive = plan_trips(engine, trips(when))
+    for offset in ('+05:30', 'UTC'):
+        aware = plan_trips(engine, trips(when, offset))
+        pd.testing.assert_frame_equal(aware, naive)
+
+
+def test_run_batch_with_offsets_in_the_csv(engine, aqi_data, tmp_path):
+    when = aqi_data[1].floor('h')
+    trips(when, '+05:30').drop(columns='trip').to_csv(tmp_path / 'aware.csv', index=False)
+    trips(when).drop(columns='trip').to_csv(tmp_path / 'naive.csv', index=False)
+    engine_kwargs = {
+        'aqi_csv': engine.aqi_csv, 'aqi_store_dir': engine.aqi_store_dir, 'model_store_dir': engine.model_store_dir,
+        'arima_pickle': engine.arima_pickle, 'forecast_cube_dir': engine.forecast_cube_dir,
+        'aqi_grid_dir': engine.aqi_grid_dir, 'route_cache_path': engine.route_cache_path,
+        'road_graph_dir': engine.road_graph_dir, 'ors_base_url': engine.ors_base_url, 'routing_backend': 'ors',
+    }
+    for name in ('aware', 'naive'):
+        assert run_batch(tmp_path / f'{name}.csv', tmp_path / f'{name}.parquet', workers=0,
+                         engine_kwargs=engine_kwargs) == len(PAIRS)
+    aware = pq.read_table(tmp_path / 'aware.parquet').to_pandas()
+    pd.testing.assert_frame_equal(aware, pq.read_table(tmp_path / 'naive.parquet').to_pandas())
+    assert aware['error'].isna().all()
+    assert list(aware['departure']) == [when + pd.Timedelta(hours=h) for h in (0, 3, 7)]
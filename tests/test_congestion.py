@@ -0,0 +1,33 @@
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from waybetter.congestion import HOURS_PER_WEEK, CongestionProvider, SeededCongestion
+from waybetter.places import places
+
+
+def test_provider_is_abstract():
+    with pytest.raises(TypeError):
+        CongestionProvider()
+
+
+def test_callers_get_their_own_copy():
+    provider = SeededCongestion()
+    when = datetime.datetime(2024, 3, 4, 9, 30)
+    first = provider.for_slot(places, when)
+    first['Bandra'] = -1
+    again = provider.for_slot(places, when)
+    assert again['Bandra'] != -1
+    assert again == provider.for_slot(places, when.replace(minute=0))
+
+
+def test_for_slot_from_many_threads():
+    provider = SeededCongestion()
+    start = datetime.datetime(2024, 3, 4)
+    times = [start + datetime.timedelta(hours=h % (HOURS_PER_WEEK + 20)) for h in range(2000)]
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda when: provider.for_slot(places, when), times))
+    expected = SeededCongestion()
+    assert all(result == expected.for_slot(places, when) for result, when in zip(results, times))
+    assert len(provider._slots) <= HOURS_PER_WEEK
@@ -0,0 +1,22 @@
+from waybetter.scoring import WEIGHTINGS
+
+
+def sweep(client, aqi_data, **fields):
+    return client.post('/departures', json={
+        'source': 'Bandra', 'destination': 'Colaba', 'start': aqi_data[1].isoformat(),
+        'hours': 1, 'step_minutes': 30, **fields,
+    })
+
+
+def test_departures_reject_unknown_weighting(client, aqi_data):
+    response = sweep(client, aqi_data, weighting='bogus')
+    assert response.status_code == 422
+    assert 'bogus' in response.json()['detail']
+
+
+def test_departures_with_each_weighting(client, aqi_data):
+    for weighting in WEIGHTINGS:
+        response = sweep(client, aqi_data, weighting=weighting)
+        assert response.status_code == 200
+        # The sweep has no grid products and runs 'grid' as 'distance'
+        assert response.json()['weighting'] == ('distance' if weighting == 'grid' else weighting)
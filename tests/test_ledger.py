@@ -0,0 +1,65 @@
+import pytest
+from fake_chain import OWNER, FakeChain, wallet
+
+from waybetter.ledger import Ledger
+from waybetter.reward_queue import RewardDispatcher
+
+ETH = 10**18
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return Ledger(tmp_path / 'ledger.sqlite3')
+
+
+# Pays one reward per wallet in `wallets` through the dispatcher
+def pay(claim_queue, chain, wallets):
+    for w in wallets:
+        claim_queue.enqueue(w)
+    dispatcher = RewardDispatcher(claim_queue, rewards_factory=lambda: chain, reward_wei=ETH // 10)
+    dispatcher.run_once()
+    dispatcher.run_once()
+    claim_queue.release_lease(dispatcher.holder)
+
+
+def test_sync_indexes_only_new_blocks(ledger, claim_queue):
+    chain = FakeChain(balance_eth=0)
+    chain.fund(OWNER, 5 * ETH)
+    pay(claim_queue, chain, [wallet(0), wallet(1), wallet(0)])
+
+    # Small chunks, so ranges are stitched together
+    assert ledger.sync(chain, chunk_blocks=2) == 4
+    assert ledger.last_block(chain.contract.address) == chain.block
+    assert ledger.sync(chain) == 0
+
+    chain.withdraw(wallet(0))
+    pay(claim_queue, chain, [wallet(1)])
+    assert ledger.sync(chain) == 2
+    assert ledger.totals() == {'Funded': 5.0, 'RewardGiven': pytest.approx(0.4), 'RewardWithdrawn': 0.2}
+
+
+def test_outstanding_matches_the_contract(ledger, claim_queue):
+    chain = FakeChain(balance_eth=0)
+    chain.fund(OWNER, 5 * ETH)
+    pay(claim_queue, chain, [wallet(0), wallet(1), wallet(0)])
+    chain.withdraw(wallet(1))
+    pay(claim_queue, chain, [wallet(1)])
+    ledger.sync(chain)
+
+    for w in (wallet(0), wallet(1), wallet(2)):
+        assert ledger.outstanding(w) == pytest.approx(chain.balances.get(w, 0) / ETH)
+    assert ledger.outstanding(wallet(0).lower()) == pytest.approx(0.2)
+    assert sorted((user, round(total, 6), count) for user, total, count in ledger.leaderboard()) == [
+        (wallet(0), 0.2, 2), (wallet(1), 0.2, 2),
+    ]
+    assert [event for _, event, _, _ in ledger.history(wallet(1))] == ['RewardGiven', 'RewardWithdrawn', 'RewardGiven']
+
+
+def test_confirmations_hold_back_recent_blocks(ledger, claim_queue):
+    chain = FakeChain(balance_eth=0)
+    chain.fund(OWNER, 5 * ETH)
+    pay(claim_queue, chain, [wallet(0)])
+    assert ledger.sync(chain, confirmations=1) == 1
+    assert ledger.outstanding(wallet(0)) == 0
+    assert ledger.sync(chain) == 1
+    assert ledger.outstanding(wallet(0)) == pytest.approx(0.1)
@@ -0,0 +1,46 @@
+import pickle
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from waybetter.model_store import TAIL_OBSERVATIONS, ModelStore, convert
+
+
+def fitted(series, trend):
+    from statsmodels.tsa.arima.model import ARIMA
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        return ARIMA(series, order=(1, 0, 1), trend=trend).fit()
+
+
+def pm25(n=4 * TAIL_OBSERVATIONS):
+    rng = np.random.default_rng(0)
+    return 100 + 0.02 * np.arange(n) + rng.normal(0, 5, n)
+
+
+@pytest.mark.parametrize('trend', ['c', 'ct'])
+@pytest.mark.parametrize('index', ['dates', 'range', 'none'])
+def test_round_trip_forecasts_match(tmp_path, trend, index):
+    values = pm25()
+    if index == 'dates':
+        series = pd.Series(values, index=pd.date_range('2024-01-01', periods=len(values), freq='15min'))
+    elif index == 'range':
+        series = pd.Series(values)
+    else:
+        series = values
+    model = fitted(series, trend)
+    with open(tmp_path / 'arima_models.pkl', 'wb') as f:
+        pickle.dump({'Bandra': model}, f)
+
+    manifest = convert(tmp_path / 'arima_models.pkl', tmp_path / 'store')
+    assert manifest['Bandra']['kind'] == 'arima'
+    rebuilt = ModelStore(tmp_path / 'store')['Bandra']
+
+    expected, actual = model.forecast(steps=96), rebuilt.forecast(steps=96)
+    assert type(actual) is type(expected)
+    np.testing.assert_allclose(np.asarray(actual), np.asarray(expected), rtol=1e-6)
+    if isinstance(expected, pd.Series):
+        assert actual.index.equals(expected.index)
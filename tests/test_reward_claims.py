@@ -0,0 +1,52 @@
+from fake_chain import wallet
+
+
+def plan(client, aqi_data):
+    response = client.post('/routes', json={
+        'source': 'Bandra', 'destination': 'Colaba', 'when': aqi_data[1].isoformat(),
+    })
+    assert response.status_code == 200
+    return response.json()['routes']
+
+
+def planned_fingerprint(client, aqi_data):
+    return plan(client, aqi_data)[0]['fingerprint']
+
+
+def test_claim_is_deduplicated(client, aqi_data):
+    claim = {'wallet': wallet(0), 'route': planned_fingerprint(client, aqi_data)}
+    first = client.post('/rewards/claim', json=claim)
+    assert first.status_code == 202
+    assert first.json()['status'] == 'queued'
+
+    again = client.post('/rewards/claim', json=claim)
+    assert again.status_code == 409
+    assert again.json()['detail']['claim']['id'] == first.json()['id']
+
+    other_wallet = client.post('/rewards/claim', json={**claim, 'wallet': wallet(1)})
+    assert other_wallet.status_code == 202
+
+
+def test_claim_for_unplanned_route_is_rejected(client, aqi_data):
+    planned_fingerprint(client, aqi_data)
+    response = client.post('/rewards/claim', json={'wallet': wallet(0), 'route': 'f' * 32})
+    assert response.status_code == 422
+
+
+def test_only_the_best_route_can_be_claimed(client, aqi_data):
+    routes = plan(client, aqi_data)
+    assert len(routes) == 3
+    # The other routes were planned and matched too, but not recommended
+    for route in routes[1:]:
+        response = client.post('/rewards/claim', json={'wallet': wallet(0), 'route': route['fingerprint']})
+        assert response.status_code == 422
+    response = client.post('/rewards/claim', json={'wallet': wallet(0), 'route': routes[0]['fingerprint']})
+    assert response.status_code == 202
+
+
+def test_planned_routes_expire_with_the_window(claim_queue):
+    claim_queue.record_plan('route', now=1000)
+    assert claim_queue.planned('route', now=1000 + claim_queue.window)
+    assert not claim_queue.planned('route', now=1001 + claim_queue.window)
+    claim_queue.record_plan('other', now=2000 + claim_queue.window)
+    assert claim_queue._conn().execute("SELECT fingerprint FROM planned_routes").fetchall() == [('other',)]
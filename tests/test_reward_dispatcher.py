@@ -0,0 +1,154 @@
+import pytest
+from fake_chain import FakeChain, wallet
+
+from waybetter.reward_queue import (
+    CONFIRMED, FAILED, QUEUED, SENDING, SETTLE_SECONDS, SUBMITTED, UNKNOWN, DuplicateClaim, RewardDispatcher,
+)
+
+
+def dispatch(queue, chain, **kwargs):
+    dispatcher = RewardDispatcher(queue, rewards_factory=lambda: chain, **kwargs)
+    dispatcher.run_once()
+    # Second pass picks up the receipts
+    dispatcher.run_once()
+    return dispatcher
+
+
+def test_gas_is_estimated_for_each_wallet(claim_queue):
+    chain = FakeChain()
+    chain.balances[wallet(0)] = 1
+    # A cheap top-up first, then a first-time wallet that needs a new slot
+    ids = [claim_queue.enqueue(wallet(0)), claim_queue.enqueue(wallet(1))]
+    dispatch(claim_queue, chain)
+
+    assert [claim_queue.get(i).status for i in ids] == [CONFIRMED, CONFIRMED]
+    assert all(ok for _, _, ok in chain.transactions)
+    assert chain.balances[wallet(1)] > 0
+
+
+def test_reverting_wallet_fails_alone_in_a_batch(claim_queue):
+    chain = FakeChain(reverting=[wallet(2)])
+    ids = [claim_queue.enqueue(wallet(i)) for i in range(5)]
+    dispatch(claim_queue, chain, flush_window=0, batch_size=5)
+
+    claims = [claim_queue.get(i) for i in ids]
+    assert [c.status for c in claims] == [CONFIRMED, CONFIRMED, FAILED, CONFIRMED, CONFIRMED]
+    assert 'reverted' in claims[2].error
+    assert claim_queue.stats().get(QUEUED, 0) == 0
+    assert sorted(chain.balances) == sorted(wallet(i) for i in (0, 1, 3, 4))
+
+
+def test_reverting_wallet_in_per_claim_mode(claim_queue):
+    chain = FakeChain(reverting=[wallet(0)])
+    ids = [claim_queue.enqueue(wallet(0)), claim_queue.enqueue(wallet(1))]
+    dispatch(claim_queue, chain)
+
+    assert [claim_queue.get(i).status for i in ids] == [FAILED, CONFIRMED]
+
+
+def test_reconnecting_leaves_sending_claims_alone(claim_queue):
+    chain = FakeChain()
+    stale = claim_queue.enqueue(wallet(0))
+    claim_queue.update(stale, SENDING)
+    dispatcher = RewardDispatcher(claim_queue, rewards_factory=lambda: chain)
+    dispatcher.run_once()
+    # Left over from a dead dispatcher: unknown from the first pass
+    assert claim_queue.get(stale).status == UNKNOWN
+
+    claim_id = claim_queue.enqueue(wallet(1))
+    claim_queue.update(claim_id, SENDING)
+    # As after a node error in _run
+    dispatcher._rewards = None
+    dispatcher.run_once()
+    assert claim_queue.get(claim_id).status == SENDING
+
+
+def test_pass_stops_when_the_lease_is_lost(claim_queue):
+    chain = FakeChain()
+    ids = [claim_queue.enqueue(wallet(i)) for i in range(3)]
+    dispatcher = RewardDispatcher(claim_queue, rewards_factory=lambda: chain)
+    estimate = chain.gas_for
+
+    # The first estimate is slow enough for the lease to expire and go to
+    # another dispatcher
+    def slow_gas_for(wallets):
+        if not chain.transactions:
+            claim_queue.release_lease(dispatcher.holder)
+            assert claim_queue.acquire_lease('other')
+        return estimate(wallets)
+    chain.gas_for = slow_gas_for
+
+    assert dispatcher.run_once() == 0
+    assert chain.transactions == []
+    assert [claim_queue.get(i).status for i in ids] == [QUEUED] * 3
+
+
+def test_recovers_again_after_taking_the_lease_back(claim_queue):
+    chain = FakeChain()
+    dispatcher = RewardDispatcher(claim_queue, rewards_factory=lambda: chain)
+    dispatcher.run_once()
+
+    # Another dispatcher takes over, dies mid-send and its lease runs out
+    claim_queue.release_lease(dispatcher.holder)
+    assert claim_queue.acquire_lease('other', seconds=0)
+    stale = claim_queue.enqueue(wallet(0))
+    claim_queue.update(stale, SENDING)
+
+    dispatcher.run_once()
+    assert claim_queue.get(stale).status == UNKNOWN
+
+
+def test_send_dropped_after_broadcast_is_settled_from_the_chain(claim_queue):
+    chain = FakeChain(drop_sends=['after'])
+    first = claim_queue.enqueue(wallet(0), 'route')
+    second = claim_queue.enqueue(wallet(1))
+    dispatcher = RewardDispatcher(claim_queue, rewards_factory=lambda: chain)
+
+    with pytest.raises(TimeoutError):
+        dispatcher.run_once()
+    assert claim_queue.get(first).status == UNKNOWN
+    assert claim_queue.get(second).status == QUEUED
+    # May have been paid, so it can't be claimed again
+    with pytest.raises(DuplicateClaim):
+        claim_queue.enqueue(wallet(0), 'route')
+
+    dispatcher.run_once()
+    assert claim_queue.get(first).status == SUBMITTED
+    dispatcher.run_once()
+    assert [claim_queue.get(i).status for i in (first, second)] == [CONFIRMED, CONFIRMED]
+    assert [wallets for wallets, _, _ in chain.transactions] == [[wallet(0)], [wallet(1)]]
+
+
+def test_send_dropped_before_broadcast_is_queued_again(claim_queue):
+    chain = FakeChain(drop_sends=['before'])
+    claim_id = claim_queue.enqueue(wallet(0))
+    other = claim_queue.enqueue(wallet(1))
+    dispatcher = RewardDispatcher(claim_queue, rewards_factory=lambda: chain)
+
+    with pytest.raises(ConnectionError):
+        dispatcher.run_once()
+    # The nonce is still free: nothing else is sent until it's settled
+    assert dispatcher.run_once() == 0
+    assert chain.transactions == []
+
+    claim_queue._conn().execute("UPDATE claims SET updated_at = updated_at - ?", (SETTLE_SECONDS,))
+    claim_queue._conn().commit()
+    dispatcher.run_once()
+    dispatcher.run_once()
+    assert [claim_queue.get(i).status for i in (claim_id, other)] == [CONFIRMED, CONFIRMED]
+    assert len(chain.transactions) == 2
+
+
+def test_claims_the_balance_cannot_cover_stay_queued(claim_queue):
+    chain = FakeChain(balance_eth=1.25)
+    ids = [claim_queue.enqueue(wallet(i)) for i in range(5)]
+    dispatcher = dispatch(claim_queue, chain, flush_window=0, batch_size=5, reward_wei=5 * 10**17)
+
+    claims = [claim_queue.get(i) for i in ids]
+    assert [c.status for c in claims] == [CONFIRMED] * 2 + [QUEUED] * 3
+    assert all('funded' in c.error for c in claims[2:])
+
+    chain.balance_wei += 2 * 10**18
+    dispatcher.run_once()
+    dispatcher.run_once()
+    assert all(claim_queue.get(i).status == CONFIRMED for i in ids)
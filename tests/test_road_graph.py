@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from waybetter.aqi_grid import MUMBAI_BBOX
+from waybetter.places import places
+from waybetter.road_graph import RoadGraph, read_osm
+from waybetter.spatial_index import haversine_km
+
+
+# side x side jittered lattice over Mumbai, two-way streets with mixed speeds
+@pytest.fixture(scope='module')
+def graph():
+    side = 12
+    rng = np.random.default_rng(3)
+    lat_min, lon_min, lat_max, lon_max = MUMBAI_BBOX
+    lats, lons = np.meshgrid(np.linspace(lat_min, lat_max, side), np.linspace(lon_min, lon_max, side), indexing='ij')
+    lats = (lats + rng.uniform(-0.002, 0.002, lats.shape)).reshape(-1)
+    lons = (lons + rng.uniform(-0.002, 0.002, lons.shape)).reshape(-1)
+    ids = np.arange(side * side).reshape(side, side)
+    a = np.concatenate((ids[:, :-1].reshape(-1), ids[:-1, :].reshape(-1)))
+    b = np.concatenate((ids[:, 1:].reshape(-1), ids[1:, :].reshape(-1)))
+    sources, targets = np.concatenate((a, b)), np.concatenate((b, a))
+    speed = rng.uniform(15, 60, len(sources))
+    length_m = haversine_km(lats[sources], lons[sources], lats[targets], lons[targets]) * 1000
+    return RoadGraph.from_edges(lats, lons, sources, targets, length_m, length_m / (speed / 3.6), places)
+
+
+def edge_sources(graph):
+    return np.repeat(np.arange(graph.n_nodes), np.diff(graph.indptr))
+
+
+def dijkstra_costs(graph, costs, source):
+    matrix = csr_matrix((costs, (edge_sources(graph), graph.targets)), shape=(graph.n_nodes, graph.n_nodes))
+    return dijkstra(matrix, indices=source)
+
+
+@pytest.mark.parametrize('weights', ['travel_s', 'length_m', 'eco', 'custom'])
+def test_alt_costs_match_dijkstra(graph, weights):
+    rng = np.random.default_rng(5)
+    factors = None
+    if weights == 'eco':
+        costs = graph.travel_s
+        factors = graph.eco_factors(rng.uniform(50, 250, len(graph.stations)), rng.uniform(0, 80, len(graph.stations)))
+        edge_costs = graph.eco_costs(factors)
+    elif weights == 'custom':
+        costs = edge_costs = graph.length_m * rng.uniform(0.5, 3.0, graph.n_edges)
+    else:
+        costs = edge_costs = getattr(graph, weights)
+
+    for source, target in rng.integers(0, graph.n_nodes, (15, 2)):
+        edges = graph.shortest_path(int(source), int(target), costs, factors)
+        assert edges is not None
+        nodes = edge_sources(graph)[edges]
+        assert (len(edges) == 0 and source == target) or (nodes[0] == source and graph.targets[edges[-1]] == target)
+        assert edge_costs[edges].sum() == pytest.approx(dijkstra_costs(graph, edge_costs, int(source))[target])
+
+
+def test_read_osm_keeps_drivable_ways(tmp_path):
+    path = tmp_path / 'tiny.osm'
+    path.write_text("""<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6">
+  <node id="1" lat="19.0700" lon="72.8700"/>
+  <node id="2" lat="19.0710" lon="72.8700"/>
+  <node id="3" lat="19.0720" lon="72.8700"/>
+  <node id="4" lat="19.0720" lon="72.8710"/>
+  <way id="10">
+    <nd ref="1"/><nd ref="2"/><nd ref="3"/>
+    <tag k="highway" v="primary"/>
+  </way>
+  <way id="11">
+    <nd ref="3"/><nd ref="4"/>
+    <tag k="highway" v="residential"/>
+    <tag k="oneway" v="yes"/>
+  </way>
+  <way id="12">
+    <nd ref="1"/><nd ref="4"/>
+    <tag k="highway" v="footway"/>
+  </way>
+  <relation id="20">
+    <member type="way" ref="10" role=""/>
+  </relation>
+</osm>
+""")
+    lats, lons, sources, targets, length_m, travel_s = read_osm(path)
+    assert len(lats) == 4
+    assert sorted(zip(sources.tolist(), targets.tolist())) == [(0, 1), (1, 0), (1, 2), (2, 1), (2, 3)]
+    assert (length_m > 100).all() and (travel_s > 0).all()
@@ -0,0 +1,38 @@
+import time
+
+from ors_stub import canned_route
+
+from waybetter.places import places
+from waybetter.route_cache import RouteCache
+from waybetter.route_matches import RouteMatchStore
+from waybetter.spatial_index import StationIndex
+
+
+def route(source, destination, preference='recommended'):
+    (lat1, lon1), (lat2, lon2) = places[source], places[destination]
+    return canned_route((lon1, lat1), (lon2, lat2), preference, 50)
+
+
+def test_purge_without_ttl(tmp_path):
+    cache = RouteCache(tmp_path / 'routes.sqlite3', ttl=None)
+    cache.put(places['Bandra'], places['Colaba'], 'fastest', route('Bandra', 'Colaba'))
+    assert cache.purge_expired() == 0
+    assert len(cache) == 1
+
+
+def test_route_matches_expire_and_are_evicted(tmp_path):
+    index = StationIndex(places)
+    path = tmp_path / 'routes.sqlite3'
+    store = RouteMatchStore(path, ttl=3600, max_entries=2)
+    for destination in ('Colaba', 'Worli', 'Powai'):
+        store.match(route('Bandra', destination), index)
+    assert store._conn().execute("SELECT COUNT(*) FROM route_matches").fetchone()[0] == 2
+
+    # A later process sees the rows as expired, and purging drops them
+    store._conn().execute("UPDATE route_matches SET last_access = ?", (time.time() - 7200,))
+    store._conn().commit()
+    later = RouteMatchStore(path, ttl=3600)
+    key = later._station_key(index, 1.0)
+    assert all(later.get(geometry, key) is None for (geometry,) in
+               later._conn().execute("SELECT geometry_key FROM route_matches"))
+    assert later.purge_expired() == 2
@@ -0,0 +1,43 @@
+import time
+
+import pytest
+from ors_stub import start_stub
+
+from waybetter.engine import Engine
+from waybetter.places import places
+from waybetter.routing import ORS_API_KEY, RoutingProvider
+
+
+@pytest.fixture
+def failing_stub():
+    server = start_stub(delay=0.3, fail=('shortest',))
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_partial_failure_is_reported(failing_stub):
+    provider = RoutingProvider(ORS_API_KEY, base_url=failing_stub)
+    try:
+        t0 = time.perf_counter()
+        routes, errors = provider.fetch_routes(places['Bandra'], places['Colaba'])
+        elapsed = time.perf_counter() - t0
+    finally:
+        provider.close()
+
+    assert [pref for _, pref in routes] == ['recommended', 'fastest']
+    assert [pref for pref, _ in errors] == ['shortest']
+    assert 'stub failure' in str(errors[0][1])
+    # Three 0.3 s requests in flight at once, not one after another
+    assert elapsed < 0.8
+
+
+def test_plan_keeps_the_routes_that_arrived(failing_stub, aqi_data, tmp_path):
+    engine = Engine(
+        aqi_csv=aqi_data[0], aqi_store_dir=tmp_path / 'aqi_parquet', model_store_dir=tmp_path / 'arima_models',
+        arima_pickle=tmp_path / 'arima_models.pkl', forecast_cube_dir=tmp_path / 'forecast_cube',
+        aqi_grid_dir=tmp_path / 'aqi_grid', route_cache_path=tmp_path / 'routes.sqlite3',
+        road_graph_dir=tmp_path / 'road_graph', ors_base_url=failing_stub, routing_backend='ors',
+    )
+    results = engine.plan_routes('Bandra', 'Colaba', aqi_data[1])
+    assert sorted(score.preference for score in results.routes) == ['fastest', 'recommended']
+    assert [pref for pref, _ in results.errors] == ['shortest']
@@ -0,0 +1,42 @@
+import numpy as np
+from geopy.distance import geodesic
+
+from waybetter.places import places
+from waybetter.spatial_index import StationIndex
+
+
+# The page's original loop: closest station by geodesic distance under the threshold
+def find_nearest_place(lat, lon, threshold_km=1.0):
+    closest_place = None
+    min_distance = float('inf')
+    for place_name, (p_lat, p_lon) in places.items():
+        dist = geodesic((lat, lon), (p_lat, p_lon)).km
+        if dist < threshold_km and dist < min_distance:
+            min_distance = dist
+            closest_place = place_name
+    return closest_place
+
+
+def test_threshold_matches_geodesic():
+    index = StationIndex(places)
+    rng = np.random.default_rng(0)
+    checked = 0
+    for name, (lat, lon) in places.items():
+        # Points up to ~2 km around each station, inside and outside 1 km
+        for dlat, dlon in rng.uniform(-0.018, 0.018, (40, 2)):
+            point = (lat + dlat, lon + dlon)
+            distances = sorted(geodesic(point, p).km for p in places.values())
+            # Sphere vs ellipsoid differ by well under 1%: skip points that
+            # sit on the threshold or halfway between two stations
+            if abs(distances[0] - 1.0) < 0.01 or distances[1] - distances[0] < 0.01:
+                continue
+            assert index.nearest_name(*point) == find_nearest_place(*point)
+            checked += 1
+    assert checked > 500
+
+
+def test_match_route_collapses_repeats():
+    index = StationIndex(places)
+    (lat1, lon1), (lat2, lon2) = places['Bandra'], places['Colaba']
+    route = [[lon1, lat1], [lon1 + 1e-4, lat1], [lon2, lat2], [lon2, lat2 + 1e-4]]
+    assert index.match_route(route) == ['Bandra', 'Colaba']
@@ -0,0 +1,38 @@
+import datetime
+
+import pandas as pd
+
+from waybetter.engine import local_time
+
+
+def test_local_time_converts_aware_times_to_naive_kolkata():
+    assert local_time('2024-03-01T03:30:00Z') == pd.Timestamp('2024-03-01 09:00')
+    assert local_time('2024-03-01T09:00:00+05:30') == pd.Timestamp('2024-03-01 09:00')
+    assert local_time(datetime.datetime(2024, 3, 1, 9)) == pd.Timestamp('2024-03-01 09:00')
+    assert local_time('2024-03-01T09:00:00Z').tzinfo is None
+
+
+def test_predict_aqi_accepts_aware_times(engine, aqi_data):
+    when = aqi_data[1]
+    aware = when.tz_localize('Asia/Kolkata').tz_convert('UTC').to_pydatetime()
+    assert engine.predict_aqi('Bandra', aware) == engine.predict_aqi('Bandra', when.to_pydatetime())
+
+
+def test_station_aqi_with_offset(client, aqi_data):
+    when = aqi_data[1]
+    naive = client.get('/stations/Bandra/aqi', params={'when': when.isoformat()})
+    aware = client.get('/stations/Bandra/aqi', params={'when': when.isoformat() + '+05:30'})
+    assert naive.status_code == aware.status_code == 200
+    assert aware.json()['aqi'] == naive.json()['aqi']
+    assert aware.json()['when'] == naive.json()['when']
+
+
+def test_plan_with_utc_timestamp(client, aqi_data):
+    when = aqi_data[1].tz_localize('Asia/Kolkata').tz_convert('UTC')
+    response = client.post('/routes', json={
+        'source': 'Bandra', 'destination': 'Colaba', 'when': when.isoformat().replace('+00:00', 'Z'),
+    })
+    assert response.status_code == 200
+    body = response.json()
+    assert body['routes']
+    assert pd.Timestamp(body['when']) == aqi_data[1]
@@ -0,0 +1,242 @@
+import argparse
+import datetime
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from web3 import Web3
+
+from waybetter.engine import SWEEP_HOURS, SWEEP_STEP_MINUTES, get_engine, local_time
+from waybetter.ledger import Ledger, LedgerTailer
+from waybetter.reward_queue import ClaimQueue, DuplicateClaim, RewardDispatcher
+from waybetter.route_matches import geometry_key, route_coordinates
+from waybetter.rewards import RewardContract
+from waybetter.scoring import WEIGHTINGS
+
+MAX_ALTERNATIVES = 8
+MAX_SWEEP_SLOTS = 288
+
+
+class PlanRequest(BaseModel):
+    source: str
+    destination: str
+    when: datetime.datetime | None = None
+    weighting: str = 'station'
+    # Include each route's [lon, lat] polyline in the response
+    geometry: bool = False
+    # Extra diverse candidates to generate beyond the preference routes
+    alternatives: int = 0
+
+
+class SweepRequest(BaseModel):
+    source: str
+    destination: str
+    start: datetime.datetime | None = None
+    hours: float = SWEEP_HOURS
+    step_minutes: int = SWEEP_STEP_MINUTES
+    weighting: str = 'distance'
+
+
+class ClaimRequest(BaseModel):
+    wallet: str
+    # 'fingerprint' of the route taken, from the /routes response
+    route: str
+
+
+# JSON view of a RouteScore; `pareto` marks routes on the plan's trade-off front
+def route_summary(score, geometry=False, pareto=False):
+    summary = {
+        'preference': score.preference,
+        'eco_score': score.eco_score,
+        'matched_places': score.matched_places,
+        'distance_km': score.distance_km,
+        'duration_min': score.duration_min,
+        'avg_aqi': score.avg_aqi,
+        'avg_congestion': score.avg_congestion,
+        'exposure': score.exposure,
+        'fingerprint': geometry_key(route_coordinates(score.route)),
+        'pareto': pareto,
+    }
+    if geometry:
+        summary['geometry'] = score.route['features'][0]['geometry']['coordinates']
+    return summary
+
+
+def claim_summary(claim):
+    return {
+        'id': claim.id,
+        'wallet': claim.wallet,
+        'status': claim.status,
+        'tx_hash': claim.tx_hash,
+        'block': claim.block,
+        'error': claim.error,
+    }
+
+
+# HTTP/JSON service over the same Engine the Streamlit page uses, so the
+# data, models, route cache and match store are shared in-process across
+# requests. Engine calls block, so handlers run them on the threadpool and
+# the event loop stays free to accept more requests. Reward claims go on the
+# shared claim queue, one per wallet and route fingerprint per window, and
+# only for the best route of a plan made here; a dispatcher runs alongside
+# the app and clients poll the claim for its status.
+def create_app(engine=None, claim_queue=None, ledger=None, rewards_factory=RewardContract):
+    engine = engine or get_engine()
+    claim_queue = claim_queue or ClaimQueue()
+    ledger = ledger or Ledger()
+
+    @asynccontextmanager
+    async def lifespan(app):
+        dispatcher = RewardDispatcher(claim_queue, rewards_factory).start()
+        tailer = LedgerTailer(ledger, rewards_factory).start()
+        yield
+        tailer.stop()
+        dispatcher.stop()
+
+    app = FastAPI(title="WayBetter", lifespan=lifespan)
+
+    def check_station(name):
+        if name not in engine.places:
+            raise HTTPException(404, f"unknown station {name!r}")
+
+    def check_weighting(weighting):
+        if weighting not in WEIGHTINGS:
+            raise HTTPException(422, f"unknown weighting {weighting!r}, expected one of {WEIGHTINGS}")
+
+    @app.get('/health')
+    async def health():
+        return {'status': 'ok'}
+
+    @app.get('/stations')
+    async def stations():
+        return [{'name': name, 'lat': lat, 'lon': lon} for name, (lat, lon) in engine.places.items()]
+
+    @app.get('/stations/{name}/aqi')
+    async def station_aqi(name: str, when: datetime.datetime | None = None):
+        check_station(name)
+        when = local_time(when or datetime.datetime.now()).to_pydatetime()
+        aqi = await run_in_threadpool(engine.predict_aqi, name, when)
+        return {'station': name, 'when': when.isoformat(), 'aqi': aqi}
+
+    @app.post('/routes')
+    async def plan(request: PlanRequest):
+        check_station(request.source)
+        check_station(request.destination)
+        check_weighting(request.weighting)
+        if not 0 <= request.alternatives <= MAX_ALTERNATIVES:
+            raise HTTPException(422, f"alternatives must be between 0 and {MAX_ALTERNATIVES}")
+
+        when = local_time(request.when or datetime.datetime.now()).to_pydatetime()
+        results = await run_in_threadpool(
+            engine.plan_routes, request.source, request.destination, when, weighting=request.weighting,
+            alternatives=request.alternatives,
+        )
+        # The best route is the one a reward can be claimed for
+        if results.best is not None:
+            await run_in_threadpool(claim_queue.record_plan, geometry_key(route_coordinates(results.best.route)))
+        front = {id(score) for score in results.front}
+        return {
+            'source': results.source,
+            'destination': results.destination,
+            'when': results.when.isoformat(),
+            'weighting': results.weighting,
+            'routes': [route_summary(score, request.geometry, id(score) in front) for score in results.routes],
+            'errors': [{'preference': pref, 'message': str(e)} for pref, e in results.errors],
+            'notes': results.notes,
+        }
+
+    # Exposure against departure time for the candidate routes
+    @app.post('/departures')
+    async def departures(request: SweepRequest):
+        check_station(request.source)
+        check_station(request.destination)
+        check_weighting(request.weighting)
+        if request.step_minutes <= 0 or request.hours < 0 or request.hours * 60 / request.step_minutes > MAX_SWEEP_SLOTS:
+            raise HTTPException(422, f"sweep must cover 1 to {MAX_SWEEP_SLOTS} departures")
+
+        start = local_time(request.start or datetime.datetime.now()).to_pydatetime()
+        sweep = await run_in_threadpool(
+            engine.sweep_departures, request.source, request.destination, start,
+            hours=request.hours, step_minutes=request.step_minutes, weighting=request.weighting,
+        )
+        response = {
+            'source': sweep.source,
+            'destination': sweep.destination,
+            'weighting': sweep.weighting,
+            'preferences': sweep.preferences,
+            'errors': [{'preference': pref, 'message': str(e)} for pref, e in sweep.errors],
+            'notes': sweep.notes,
+            'departures': [],
+        }
+        if sweep.best_departure is None:
+            return response
+        best_time, best_pref = sweep.best_departure
+        response['best'] = {'departure': best_time.isoformat(), 'preference': best_pref}
+        for i, row in enumerate(sweep.to_frame().itertuples(index=False)):
+            response['departures'].append({
+                'departure': row.departure.isoformat(),
+                'preference': row.preference,
+                'eco_score': row.eco_score,
+                'avg_aqi': row.avg_aqi,
+                'exposure': row.exposure,
+                'duration_min': row.duration_min,
+                'route_exposure': sweep.exposure[i].tolist(),
+            })
+        return response
+
+    @app.post('/rewards/claim', status_code=202)
+    async def claim(request: ClaimRequest):
+        if not Web3.is_address(request.wallet):
+            raise HTTPException(422, "invalid Ethereum address")
+        # Only the best route of a plan made here can earn a reward
+        if not await run_in_threadpool(claim_queue.planned, request.route):
+            raise HTTPException(422, "not the best route of a recent plan; plan the route first")
+        try:
+            claim_id = await run_in_threadpool(claim_queue.enqueue, request.wallet, request.route)
+        except DuplicateClaim as e:
+            raise HTTPException(409, {'message': str(e), 'claim': claim_summary(e.claim)})
+        return claim_summary(await run_in_threadpool(claim_queue.get, claim_id))
+
+    @app.get('/rewards/claims/{claim_id}')
+    async def claim_status(claim_id: int):
+        claim = await run_in_threadpool(claim_queue.get, claim_id)
+        if claim is None:
+            raise HTTPException(404, f"unknown claim {claim_id}")
+        return claim_summary(claim)
+
+    @app.get('/rewards/leaderboard')
+    async def leaderboard(limit: int = 10):
+        rows = await run_in_threadpool(ledger.leaderboard, limit)
+        return [{'wallet': user, 'total_eth': total, 'rewards': count} for user, total, count in rows]
+
+    @app.get('/rewards/history/{wallet}')
+    async def history(wallet: str):
+        if not Web3.is_address(wallet):
+            raise HTTPException(422, "invalid Ethereum address")
+        rows = await run_in_threadpool(ledger.history, wallet)
+        return {
+            'wallet': Web3.to_checksum_address(wallet),
+            'outstanding_eth': await run_in_threadpool(ledger.outstanding, wallet),
+            'events': [{'block': block, 'event': event, 'amount_eth': amount, 'tx_hash': tx_hash}
+                       for block, event, amount, tx_hash in rows],
+        }
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(prog='python -m waybetter.api', description='WayBetter HTTP API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+    # Each worker builds its own app, so importing this module opens no files
+    uvicorn.run('waybetter.api:create_app', factory=True, host=args.host, port=args.port, workers=args.workers,
+                log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
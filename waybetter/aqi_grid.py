@@ -0,0 +1,175 @@
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+AQI_GRID_DIR = os.environ.get("AQI_GRID_DIR", "aqi_grid")
+META = "grid.json"
+# Greater Mumbai, with margin around the outermost stations
+MUMBAI_BBOX = (18.85, 72.75, 19.45, 73.05)  # lat_min, lon_min, lat_max, lon_max
+CELL_DEG = 0.0025  # ~275 m north-south, ~260 m east-west at Mumbai's latitude
+STEP_SECONDS = 900
+KM_PER_DEG_LAT = 111.2
+
+
+# Inverse-distance-weighted surface from station values.
+# values is (slots, stations), NaN where a station has no value for a slot;
+# returns (slots, len(grid_lats), len(grid_lons)) float32. Cells within
+# `snap_km` of a station take its value directly.
+def idw_surface(station_lats, station_lons, values, grid_lats, grid_lons, power=2.0, snap_km=0.05):
+    values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+    lat_mid = np.radians(np.mean(grid_lats))
+    cell_lat, cell_lon = np.meshgrid(grid_lats, grid_lons, indexing='ij')
+
+    # Equirectangular km distances, cells x stations; plenty accurate at city scale
+    dy = (cell_lat.reshape(-1, 1) - np.asarray(station_lats)[None, :]) * KM_PER_DEG_LAT
+    dx = (cell_lon.reshape(-1, 1) - np.asarray(station_lons)[None, :]) * KM_PER_DEG_LAT * np.cos(lat_mid)
+    dist = np.maximum(np.hypot(dx, dy), snap_km)
+    weights = dist ** -power  # cells x stations
+
+    valid = np.isfinite(values)
+    num = np.where(valid, values, 0.0) @ weights.T  # slots x cells
+    den = valid.astype(np.float64) @ weights.T
+    with np.errstate(invalid='ignore', divide='ignore'):
+        surface = num / den
+    return surface.reshape(len(values), len(grid_lats), len(grid_lons)).astype(np.float32)
+
+
+# Precomputed AQI raster per 15-minute slot over the Mumbai bounding box,
+# stored float16 and memory-mapped. Route vertices are sampled with
+# vectorized bilinear interpolation, so coverage no longer stops 1 km from
+# the nearest station.
+class AQIGrid:
+    def __init__(self, surfaces, bbox, start, step_seconds=STEP_SECONDS):
+        self.surfaces = surfaces  # (slots, ny, nx)
+        self.bbox = tuple(bbox)
+        self.start = pd.Timestamp(start)
+        self.step_seconds = step_seconds
+        n_slots, ny, nx = surfaces.shape
+        lat_min, lon_min, lat_max, lon_max = self.bbox
+        self.lat_step = (lat_max - lat_min) / (ny - 1)
+        self.lon_step = (lon_max - lon_min) / (nx - 1)
+
+    @classmethod
+    def build(cls, station_lats, station_lons, values, start, bbox=MUMBAI_BBOX, cell_deg=CELL_DEG,
+              step_seconds=STEP_SECONDS, power=2.0):
+        lat_min, lon_min, lat_max, lon_max = bbox
+        grid_lats = np.linspace(lat_min, lat_max, int(round((lat_max - lat_min) / cell_deg)) + 1)
+        grid_lons = np.linspace(lon_min, lon_max, int(round((lon_max - lon_min) / cell_deg)) + 1)
+        surfaces = idw_surface(station_lats, station_lons, values, grid_lats, grid_lons, power)
+        return cls(surfaces.astype(np.float16), bbox, start, step_seconds)
+
+    def save(self, directory=AQI_GRID_DIR):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        meta = {
+            'file': f"grid-{time.time_ns()}.npy",
+            'bbox': list(self.bbox),
+            'start': self.start.isoformat(),
+            'step_seconds': self.step_seconds,
+        }
+        np.save(directory / meta['file'], np.asarray(self.surfaces, dtype=np.float16))
+        tmp = directory / (META + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        previous = json.loads((directory / META).read_text())['file'] if (directory / META).exists() else None
+        os.replace(tmp, directory / META)
+        for old in directory.glob('grid-*.npy'):
+            if old.name not in (meta['file'], previous):
+                old.unlink(missing_ok=True)
+
+    @classmethod
+    def open(cls, directory=AQI_GRID_DIR):
+        directory = Path(directory)
+        if not (directory / META).exists():
+            return None
+        meta = json.loads((directory / META).read_text())
+        surfaces = np.load(directory / meta['file'], mmap_mode='r')
+        return cls(surfaces, meta['bbox'], meta['start'], meta['step_seconds'])
+
+    @property
+    def n_slots(self):
+        return self.surfaces.shape[0]
+
+    # Slot covering date_time (slots start at self.start), None outside the grid's range
+    def slot_for(self, date_time):
+        slot = int((pd.Timestamp(date_time) - self.start).total_seconds() // self.step_seconds)
+        return slot if 0 <= slot < self.n_slots else None
+
+    # Bilinear AQI at each (lat, lon) for one slot; NaN outside the bounding box
+    def sample(self, lats, lons, slot):
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        lat_min, lon_min, lat_max, lon_max = self.bbox
+        surface = self.surfaces[slot]
+        ny, nx = surface.shape
+
+        fy = (lats - lat_min) / self.lat_step
+        fx = (lons - lon_min) / self.lon_step
+        inside = (fy >= 0) & (fy <= ny - 1) & (fx >= 0) & (fx <= nx - 1)
+        y0 = np.clip(np.floor(fy).astype(np.int64), 0, ny - 2)
+        x0 = np.clip(np.floor(fx).astype(np.int64), 0, nx - 2)
+        ty = np.clip(fy - y0, 0.0, 1.0)
+        tx = np.clip(fx - x0, 0.0, 1.0)
+
+        v00 = surface[y0, x0].astype(np.float64)
+        v01 = surface[y0, x0 + 1].astype(np.float64)
+        v10 = surface[y0 + 1, x0].astype(np.float64)
+        v11 = surface[y0 + 1, x0 + 1].astype(np.float64)
+        top = v00 * (1 - tx) + v01 * tx
+        bottom = v10 * (1 - tx) + v11 * tx
+        return np.where(inside, top * (1 - ty) + bottom * ty, np.nan)
+
+
+# Station values for every (slot, station): observations inside the dataset,
+# the forecast cube past its end
+def station_values(aqi_index, stations, times, forecast_cube=None):
+    times = pd.DatetimeIndex(times)
+    grid_locations = np.repeat(np.array(stations, dtype=object)[None, :], len(times), axis=0).reshape(-1)
+    grid_times = np.repeat(times.values, len(stations))
+    values = aqi_index.nearest_batch(grid_locations, grid_times)
+
+    if forecast_cube is not None:
+        last = np.array([aqi_index.times[s][-1] if s in aqi_index else np.iinfo(np.int64).max for s in stations])
+        future = grid_times.astype('datetime64[ns]').astype(np.int64) > np.tile(last, len(times))
+        if future.any():
+            forecast = forecast_cube.lookup_batch(grid_locations[future], grid_times[future])
+            values[future] = np.where(np.isfinite(forecast), forecast, values[future])
+    return values.reshape(len(times), len(stations))
+
+
+def main():
+    from waybetter.aqi_index import AQIIndex
+    from waybetter.aqi_store import load_frame
+    from waybetter.forecast_cube import FORECAST_CUBE_DIR, ForecastCube
+    from waybetter.places import places
+
+    parser = argparse.ArgumentParser(prog='python -m waybetter.aqi_grid',
+                                     description='precompute interpolated AQI rasters per 15-minute slot')
+    parser.add_argument('--start', default=pd.Timestamp.now().floor('D').isoformat())
+    parser.add_argument('--hours', type=float, default=48)
+    parser.add_argument('--cell-deg', type=float, default=CELL_DEG)
+    parser.add_argument('--power', type=float, default=2.0)
+    parser.add_argument('--directory', default=AQI_GRID_DIR)
+    args = parser.parse_args()
+
+    stations = list(places)
+    times = pd.date_range(args.start, periods=int(args.hours * 3600 / STEP_SECONDS), freq=f'{STEP_SECONDS}s')
+    aqi_index = AQIIndex.from_frame(load_frame(locations=stations))
+    values = station_values(aqi_index, stations, times, ForecastCube.open(FORECAST_CUBE_DIR))
+
+    t0 = time.perf_counter()
+    lats = [places[s][0] for s in stations]
+    lons = [places[s][1] for s in stations]
+    grid = AQIGrid.build(lats, lons, values, times[0], cell_deg=args.cell_deg, power=args.power)
+    grid.save(args.directory)
+    print(f"built {grid.surfaces.shape} AQI grid in {time.perf_counter() - t0:.1f}s "
+          f"({grid.surfaces.nbytes / 1e6:.1f} MB float16)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+
+# Per-location time index over the AQI dataset.
+# Each location keeps its timestamps as a sorted int64 (ns) array next to the
+# matching PM2.5 values, so nearest-time lookups are a binary search instead
+# of a scan over the whole DataFrame.
+class AQIIndex:
+    def __init__(self, times, values):
+        # times / values: dict of location -> sorted int64 array / float array
+        self.times = times
+        self.values = values
+        self.locations = list(times.keys())
+
+    @classmethod
+    def from_frame(cls, df, location_col='Location', time_col='From Date', value_col='PM2.5'):
+        df = df[[location_col, time_col, value_col]].dropna()
+        times = {}
+        values = {}
+        for location, group in df.groupby(location_col, sort=False, observed=True):
+            ts = group[time_col].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+            order = np.argsort(ts, kind='stable')
+            times[location] = ts[order]
+            values[location] = group[value_col].to_numpy(dtype=np.float64)[order]
+        return cls(times, values)
+
+    def __contains__(self, location):
+        return location in self.times
+
+    def last_time(self, location):
+        return pd.Timestamp(self.times[location][-1])
+
+    # Position of the closest timestamp for each query (ties go to the earlier one)
+    @staticmethod
+    def _nearest_positions(ts, query):
+        pos = np.searchsorted(ts, query)
+        if len(ts) == 1:
+            return np.zeros_like(pos)
+        pos = np.clip(pos, 1, len(ts) - 1)
+        left = ts[pos - 1]
+        right = ts[pos]
+        return np.where(query - left <= right - query, pos - 1, pos)
+
+    # PM2.5 value at the observation closest to date_time, or None if the
+    # location is not in the dataset
+    def nearest(self, location, date_time):
+        if location not in self.times:
+            return None
+        query = np.array([pd.Timestamp(date_time).value], dtype=np.int64)
+        pos = self._nearest_positions(self.times[location], query)
+        return float(self.values[location][pos[0]])
+
+    # Batched lookup: resolves many (location, datetime) pairs in one call.
+    # Returns a float array aligned with the inputs, NaN for unknown locations.
+    def nearest_batch(self, locations, date_times):
+        locations = np.asarray(locations, dtype=object)
+        query = pd.to_datetime(np.asarray(date_times)).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        if query.shape != locations.shape:
+            query = np.broadcast_to(query, locations.shape)
+
+        result = np.full(locations.shape, np.nan)
+        for location in pd.unique(locations):
+            if location not in self.times:
+                continue
+            mask = locations == location
+            pos = self._nearest_positions(self.times[location], query[mask])
+            result[mask] = self.values[location][pos]
+        return result
@@ -0,0 +1,82 @@
+import argparse
+import os
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+AQI_CSV = os.environ.get("AQI_CSV", "pm25_only_aqi_dataset_updated.csv")
+AQI_STORE_DIR = os.environ.get("AQI_STORE_DIR", "aqi_parquet")
+COLUMNS = ['Location', 'From Date', 'PM2.5']
+
+
+def read_csv(csv_path=AQI_CSV):
+    df = pd.read_csv(csv_path)
+    df['From Date'] = pd.to_datetime(df['From Date'])
+    return df
+
+
+# Write the AQI CSV as a Parquet dataset partitioned by location:
+# Location/<name>/part-0.parquet with int64 (ns) timestamps and float32 PM2.5
+def convert_csv(csv_path=AQI_CSV, directory=AQI_STORE_DIR):
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    df = read_csv(csv_path)[COLUMNS]
+    table = pa.Table.from_pandas(df, preserve_index=False, schema=pa.schema([
+        ('Location', pa.string()),
+        ('From Date', pa.timestamp('ns')),
+        ('PM2.5', pa.float32()),
+    ]))
+    table = table.sort_by([('Location', 'ascending'), ('From Date', 'ascending')])
+
+    if Path(directory).exists():
+        shutil.rmtree(directory)
+    ds.write_dataset(
+        table,
+        directory,
+        format='parquet',
+        partitioning=ds.partitioning(pa.schema([('Location', pa.string())]), flavor='hive'),
+        existing_data_behavior='overwrite_or_ignore',
+    )
+    return len(table)
+
+
+# Read the Parquet dataset with only the requested columns and, if given,
+# only the partitions for `locations`. Files are memory-mapped rather than
+# read into Python buffers; Location comes back categorical.
+def read_parquet(directory=AQI_STORE_DIR, locations=None, columns=COLUMNS):
+    import pyarrow.parquet as pq
+
+    filters = [('Location', 'in', list(locations))] if locations is not None else None
+    table = pq.read_table(directory, columns=list(columns), filters=filters, memory_map=True)
+    return table.to_pandas()
+
+
+def has_store(directory=AQI_STORE_DIR):
+    return Path(directory).is_dir() and any(Path(directory).iterdir())
+
+
+# Parquet store if it has been built, otherwise the CSV
+def load_frame(csv_path=AQI_CSV, directory=AQI_STORE_DIR, locations=None):
+    if has_store(directory):
+        return read_parquet(directory, locations)
+    df = read_csv(csv_path)
+    if locations is not None:
+        df = df[df['Location'].isin(locations)]
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m waybetter.aqi_store',
+                                     description='convert the AQI CSV into a Parquet dataset partitioned by location')
+    parser.add_argument('csv_path', nargs='?', default=AQI_CSV)
+    parser.add_argument('directory', nargs='?', default=AQI_STORE_DIR)
+    args = parser.parse_args()
+
+    rows = convert_csv(args.csv_path, args.directory)
+    print(f"wrote {rows:,} rows to {args.directory}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from waybetter.engine import Engine, local_times
+from waybetter.scoring import PairPlan
+
+TRIP_COLUMNS = ('origin', 'destination', 'departure')
+CHUNK_ROWS = 20000
+# Batch scoring uses station matches only; the interpolated grid is per-slot
+# and not worth loading for every departure time in a nightly run
+BATCH_WEIGHTINGS = ('station', 'distance')
+
+RESULT_SCHEMA = pa.schema([
+    ('trip', pa.int64()),
+    ('origin', pa.string()),
+    ('destination', pa.string()),
+    ('departure', pa.timestamp('ns')),
+    ('preference', pa.string()),
+    ('eco_score', pa.float64()),
+    ('avg_aqi', pa.float64()),
+    ('avg_congestion', pa.float64()),
+    ('exposure', pa.float64()),
+    ('distance_km', pa.float64()),
+    ('duration_min', pa.float64()),
+    ('candidates', pa.int32()),
+    ('error', pa.string()),
+])
+
+
+# Plan and score every trip in `trips`, a DataFrame with TRIP_COLUMNS plus a
+# 'trip' id column. Departures with a UTC offset are planned and reported
+# in naive Asia/Kolkata time. Routes are fetched once per origin/destination pair
+# through the engine's route cache; `pair_plans` carries them across calls.
+# AQI and congestion for every (trip, matched station) are looked up in one
+# vectorized call each.
+def plan_trips(engine, trips, weighting='distance', pair_plans=None):
+    if weighting not in BATCH_WEIGHTINGS:
+        raise ValueError(f"unknown batch weighting {weighting!r}, expected one of {BATCH_WEIGHTINGS}")
+    pair_plans = {} if pair_plans is None else pair_plans
+
+    n = len(trips)
+    origins = trips['origin'].astype(str).to_numpy()
+    destinations = trips['destination'].astype(str).to_numpy()
+    # Naive local time, like the AQI data; aware departures are converted
+    departures = local_times(trips['departure'])
+    columns = {
+        'preference': np.full(n, None, dtype=object),
+        'eco_score': np.full(n, np.nan),
+        'avg_aqi': np.full(n, np.nan),
+        'avg_congestion': np.full(n, np.nan),
+        'exposure': np.full(n, np.nan),
+        'distance_km': np.full(n, np.nan),
+        'duration_min': np.full(n, np.nan),
+    }
+    candidates = np.zeros(n, dtype=np.int32)
+    errors = np.full(n, None, dtype=object)
+
+    groups = []
+    pairs = pd.DataFrame({'origin': origins, 'destination': destinations}).groupby(['origin', 'destination'], sort=False)
+    for (origin, destination), rows in pairs.indices.items():
+        if origin not in engine.places or destination not in engine.places:
+            errors[rows] = "unknown station"
+            continue
+
+        key = (origin, destination, weighting)
+        plan = pair_plans.get(key)
+        if plan is None:
+            routes, route_errors = engine.routing.fetch_routes(engine.places[origin], engine.places[destination])
+            matches = [engine.match_store.match(route, engine.station_index, engine.threshold_km) for route, _ in routes]
+            plan = pair_plans[key] = PairPlan(routes, route_errors, matches, weighting)
+
+        candidates[rows] = len(plan.preferences)
+        if not plan.stations:
+            errors[rows] = "; ".join(f"{pref}: {e}" for pref, e in plan.errors) or "no routes with matched stations"
+            continue
+        groups.append((plan, rows))
+
+    if groups:
+        locations = np.concatenate([np.tile(np.array(plan.stations, dtype=object), len(rows)) for plan, rows in groups])
+        times = np.concatenate([np.repeat(departures[rows], len(plan.stations)) for plan, rows in groups])
+        aqi = engine.predict_aqi_batch(locations, times)
+        congestion = np.asarray(engine.congestion.lookup(locations, times), dtype=np.float64)
+
+        offset = 0
+        for plan, rows in groups:
+            size = len(rows) * len(plan.stations)
+            shape = (len(rows), len(plan.stations))
+            scored = plan.score(aqi[offset:offset + size].reshape(shape), congestion[offset:offset + size].reshape(shape))
+            offset += size
+            for column, values in scored.items():
+                columns[column][rows] = values
+
+    return pd.DataFrame({
+        'trip': trips['trip'].to_numpy(dtype=np.int64),
+        'origin': origins,
+        'destination': destinations,
+        'departure': departures,
+        **columns,
+        'candidates': candidates,
+        'error': errors,
+    })
+
+
+# Trips from a CSV or Parquet file in chunks, numbered by row
+def iter_trips(path, chunk_rows=CHUNK_ROWS, columns=TRIP_COLUMNS):
+    path = Path(path)
+    if path.suffix == '.parquet' or path.is_dir():
+        dataset = ds.dataset(path, format='parquet')
+        chunks = (batch.to_pandas() for batch in dataset.to_batches(columns=list(columns), batch_size=chunk_rows))
+    else:
+        chunks = pd.read_csv(path, usecols=list(columns), chunksize=chunk_rows)
+
+    offset = 0
+    for chunk in chunks:
+        chunk = chunk.rename(columns=dict(zip(columns, TRIP_COLUMNS))).reset_index(drop=True)
+        chunk['trip'] = np.arange(offset, offset + len(chunk))
+        offset += len(chunk)
+        yield chunk
+
+
+# Per-process state for the pool: one engine and pair cache per worker
+_worker = {}
+
+
+def _init_worker(engine_kwargs):
+    _worker['engine'] = Engine(**engine_kwargs)
+    _worker['pairs'] = {}
+
+
+def _plan_chunk(trips, weighting):
+    return plan_trips(_worker['engine'], trips, weighting, _worker['pairs'])
+
+
+# Plan every trip in `trips_path` and stream the best route per trip to
+# `output_path` as Parquet, in input order. Chunks go to a process pool
+# with a bounded number in flight, so memory stays flat for any input size.
+# workers=0 plans in this process.
+def run_batch(trips_path, output_path, workers=None, weighting='distance', chunk_rows=CHUNK_ROWS,
+              columns=TRIP_COLUMNS, engine_kwargs=None):
+    engine_kwargs = engine_kwargs or {}
+    workers = os.cpu_count() if workers is None else workers
+    trips = iter_trips(trips_path, chunk_rows, columns)
+    planned = 0
+
+    with pq.ParquetWriter(output_path, RESULT_SCHEMA) as writer:
+        def write(result):
+            writer.write_table(pa.Table.from_pandas(result, schema=RESULT_SCHEMA, preserve_index=False))
+            return len(result)
+
+        if workers == 0:
+            _init_worker(engine_kwargs)
+            for chunk in trips:
+                planned += write(_plan_chunk(chunk, weighting))
+            return planned
+
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(engine_kwargs,)) as pool:
+            pending = deque()
+            for chunk in trips:
+                pending.append(pool.submit(_plan_chunk, chunk, weighting))
+                if len(pending) >= 2 * workers:
+                    planned += write(pending.popleft().result())
+            while pending:
+                planned += write(pending.popleft().result())
+    return planned
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m waybetter.batch',
+                                     description='plan eco-routes for a file of (origin, destination, departure) trips')
+    parser.add_argument('trips', help='CSV or Parquet with origin, destination and departure columns')
+    parser.add_argument('output', help='Parquet file to write, one row per trip')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--weighting', choices=BATCH_WEIGHTINGS, default='distance')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--columns', nargs=3, default=TRIP_COLUMNS, metavar=('ORIGIN', 'DESTINATION', 'DEPARTURE'))
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    planned = run_batch(args.trips, args.output, args.workers, args.weighting, args.chunk_rows, args.columns)
+    elapsed = time.perf_counter() - t0
+    print(f"planned {planned:,} trips in {elapsed:.1f}s ({planned / elapsed:,.0f} trips/s) -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+import os
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CONGESTION_PROFILE = os.environ.get("CONGESTION_PROFILE", "congestion_profile.csv")
+HOURS_PER_WEEK = 168
+_NS_PER_HOUR = 3600 * 10**9
+
+
+# Hour of the week (Monday 00:00 = 0) for an array of datetimes, vectorized.
+# 1970-01-01 was a Thursday, hence the +3.
+def hour_of_week(date_times):
+    ns = pd.to_datetime(np.atleast_1d(np.asarray(date_times))).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    hours = ns // _NS_PER_HOUR
+    return ((hours // 24 + 3) % 7) * 24 + hours % 24
+
+
+# Congestion lookup by (location, timestamp). Subclasses implement lookup();
+# for_slot() memoizes, per provider, the per-place dict the page uses for one
+# hour slot (at most HOURS_PER_WEEK of them, oldest dropped first). The
+# provider is shared by sessions and API threads, so the memo is locked and
+# callers get their own copy of the dict.
+class CongestionProvider(ABC):
+    def __init__(self):
+        self._slots = OrderedDict()
+        self._slots_lock = threading.Lock()
+
+    @abstractmethod
+    def lookup(self, locations, date_times):
+        pass
+
+    def for_slot(self, locations, date_time):
+        key = (tuple(locations), int(hour_of_week(date_time)[0]))
+        with self._slots_lock:
+            values = self._slots.get(key)
+        if values is None:
+            values = self._for_slot(*key)
+            with self._slots_lock:
+                self._slots[key] = values
+                if len(self._slots) > HOURS_PER_WEEK:
+                    self._slots.popitem(last=False)
+        return dict(values)
+
+    def _for_slot(self, locations, slot):
+        # Any time in the slot works; the first week of 1973 starts on a Monday
+        when = pd.Timestamp('1973-01-01') + pd.Timedelta(hours=slot)
+        values = self.lookup(locations, [when] * len(locations))
+        return dict(zip(locations, values.tolist()))
+
+
+# Deterministic stand-in for the old random.seed(42) + randint(10, 100):
+# a fixed pseudo-random value per (location, hour of week) from an integer
+# hash, so it never touches the global `random` state and every session
+# sees the same numbers for the same slot.
+class SeededCongestion(CongestionProvider):
+    def __init__(self, low=10, high=100, seed=42):
+        super().__init__()
+        self.low = low
+        self.high = high
+        self.seed = seed
+
+    def lookup(self, locations, date_times):
+        keys = np.array([zlib.crc32(str(location).encode()) for location in locations], dtype=np.uint64)
+        slots = hour_of_week(date_times).astype(np.uint64)
+        slots = np.broadcast_to(slots, keys.shape)
+
+        # splitmix64 finalizer over (seed, location, slot)
+        with np.errstate(over='ignore'):
+            x = keys * np.uint64(0x9E3779B97F4A7C15) + slots + np.uint64(self.seed)
+            x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+            x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+            x = x ^ (x >> np.uint64(31))
+        return (self.low + x % np.uint64(self.high - self.low + 1)).astype(np.int64)
+
+
+# Historical congestion per location and hour of week, from a CSV with
+# columns location, hour_of_week (0-167, Monday 00:00 = 0), congestion.
+# Held as a (locations x 168) array, so a lookup is one fancy-index.
+# Locations missing from the table go to `fallback`.
+class HourOfWeekProfile(CongestionProvider):
+    def __init__(self, table, fallback=None):
+        super().__init__()
+        self.locations = list(table)
+        self.rows = {location: i for i, location in enumerate(self.locations)}
+        self.table = np.vstack([np.asarray(table[location], dtype=np.float64) for location in self.locations])
+        self.fallback = fallback or SeededCongestion()
+
+    @classmethod
+    def from_csv(cls, path=CONGESTION_PROFILE, fallback=None):
+        df = pd.read_csv(path)
+        table = {}
+        for location, group in df.groupby('location'):
+            profile = np.full(HOURS_PER_WEEK, np.nan)
+            profile[group['hour_of_week'].to_numpy()] = group['congestion'].to_numpy()
+            # Fill hours with no data from the location's mean
+            table[location] = np.where(np.isnan(profile), np.nanmean(profile), profile)
+        return cls(table, fallback)
+
+    def lookup(self, locations, date_times):
+        rows = np.array([self.rows.get(location, -1) for location in locations])
+        slots = np.broadcast_to(hour_of_week(date_times), rows.shape)
+        values = self.table[rows, slots]
+
+        missing = rows < 0
+        if missing.any():
+            values = values.copy()
+            values[missing] = self.fallback.lookup(
+                [location for location, row in zip(locations, rows) if row < 0],
+                np.broadcast_to(np.atleast_1d(np.asarray(date_times)), rows.shape)[missing]
+            )
+        return values
+
+
+# Profile table if one is present, otherwise the seeded stand-in
+def load_congestion_provider(path=CONGESTION_PROFILE):
+    if Path(path).exists():
+        return HourOfWeekProfile.from_csv(path)
+    return SeededCongestion()
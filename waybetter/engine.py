@@ -0,0 +1,437 @@
+import os
+import pickle
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from waybetter.aqi_store import AQI_CSV, AQI_STORE_DIR
+from waybetter.aqi_grid import AQI_GRID_DIR
+from waybetter.congestion import CONGESTION_PROFILE
+from waybetter.forecast_cube import FORECAST_CUBE_DIR
+from waybetter.model_store import MANIFEST, MODEL_STORE_DIR
+from waybetter.places import places as PLACES
+from waybetter.road_graph import ROAD_GRAPH_DIR
+from waybetter.route_cache import ROUTE_CACHE_PATH
+from waybetter.routing import ORS_API_KEY, ORS_BASE_URL, ORS_MAX_WORKERS, PREFERENCES
+
+ARIMA_PICKLE = os.environ.get("ARIMA_PICKLE", "arima_models.pkl")
+# 'auto' routes on the local road graph when one is built and falls back to
+# ORS otherwise; 'ors' and 'local' force one or the other
+ROUTING_BACKEND = os.environ.get("ROUTING_BACKEND", "auto")
+# Artifacts that are rebuilt offline are re-opened after this many seconds
+ARTIFACT_TTL = 900
+# Default departure sweep: every 15 minutes over the next 4 hours
+SWEEP_HOURS = 4
+SWEEP_STEP_MINUTES = 15
+# AQI data, forecasts and congestion slots are all in naive local time here
+LOCAL_TZ = 'Asia/Kolkata'
+
+
+# `when` as a naive Asia/Kolkata pd.Timestamp; timezone-aware inputs (e.g.
+# '...Z' or '+05:30' from the API) are converted first
+def local_time(when):
+    when = pd.Timestamp(when)
+    if when.tzinfo is not None:
+        when = when.tz_convert(LOCAL_TZ).tz_localize(None)
+    return when
+
+
+# local_time over an array or Series of datetimes, as datetime64[ns];
+# values with different UTC offsets are converted one by one
+def local_times(values):
+    try:
+        times = pd.DatetimeIndex(pd.to_datetime(values))
+    except ValueError:
+        times = pd.DatetimeIndex(pd.to_datetime(values, utc=True))
+    if times.tz is not None:
+        times = times.tz_convert(LOCAL_TZ).tz_localize(None)
+    return times.to_numpy(dtype='datetime64[ns]')
+
+
+# Resource built on first access and kept on the engine; with `ttl` it is
+# rebuilt on the next access after that many seconds. Thread-safe, so
+# concurrent Streamlit sessions or API requests build it once.
+class lazy_resource:
+    def __init__(self, factory=None, ttl=None):
+        self.factory = factory
+        self.ttl = ttl
+
+    def __call__(self, factory):
+        self.factory = factory
+        return self
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, engine, owner=None):
+        if engine is None:
+            return self
+        slot = engine._resources.get(self.name)
+        if slot is not None and (self.ttl is None or time.monotonic() - slot[1] < self.ttl):
+            return slot[0]
+        with engine._lock:
+            slot = engine._resources.get(self.name)
+            if slot is None or (self.ttl is not None and time.monotonic() - slot[1] >= self.ttl):
+                slot = (self.factory(engine), time.monotonic())
+                engine._resources[self.name] = slot
+        return slot[0]
+
+
+# Everything a route plan produced: ranked routes (best first), the ones on
+# the Pareto front over time, distance, exposure and congestion, per-preference
+# fetch errors, notes about fallbacks taken, and the congestion values used
+@dataclass(slots=True)
+class RouteResults:
+    source: str
+    destination: str
+    when: pd.Timestamp
+    weighting: str
+    routes: list = field(default_factory=list)
+    front: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+    notes: list = field(default_factory=list)
+    congestion: dict = field(default_factory=dict)
+
+    @property
+    def best(self):
+        return self.routes[0] if self.routes else None
+
+
+# Candidate routes scored at every departure time of a window: metric
+# matrices are (departures x routes), columns in `preferences` order
+@dataclass(slots=True)
+class DepartureSweep:
+    source: str
+    destination: str
+    times: pd.DatetimeIndex
+    weighting: str
+    preferences: list = field(default_factory=list)
+    avg_aqi: np.ndarray = None
+    avg_congestion: np.ndarray = None
+    exposure: np.ndarray = None
+    eco_score: np.ndarray = None
+    duration_min: np.ndarray = None
+    distance_km: np.ndarray = None
+    errors: list = field(default_factory=list)
+    notes: list = field(default_factory=list)
+
+    # Route index with the best eco-score at each departure
+    @property
+    def best_routes(self):
+        return np.argmin(self.eco_score, axis=1)
+
+    # PM2.5 exposure of the best route at each departure
+    @property
+    def best_exposure(self):
+        return self.exposure[np.arange(len(self.times)), self.best_routes]
+
+    # (departure time, preference) with the lowest exposure on its best route
+    @property
+    def best_departure(self):
+        if self.exposure is None:
+            return None
+        i = int(np.argmin(self.best_exposure))
+        return self.times[i], self.preferences[self.best_routes[i]]
+
+    # One row per departure: best route and its metrics
+    def to_frame(self):
+        best = self.best_routes
+        rows = np.arange(len(self.times))
+        return pd.DataFrame({
+            'departure': self.times,
+            'preference': np.array(self.preferences, dtype=object)[best],
+            'eco_score': self.eco_score[rows, best],
+            'avg_aqi': self.avg_aqi[rows, best],
+            'exposure': self.exposure[rows, best],
+            'duration_min': self.duration_min[best],
+        })
+
+
+# Headless routing and scoring engine. Data, models, indexes and the ORS
+# client are created on first use, so importing this module (or building
+# an Engine) costs nothing until a plan actually needs them.
+class Engine:
+    def __init__(self, places=PLACES, aqi_csv=AQI_CSV, aqi_store_dir=AQI_STORE_DIR,
+                 model_store_dir=MODEL_STORE_DIR, arima_pickle=ARIMA_PICKLE,
+                 forecast_cube_dir=FORECAST_CUBE_DIR, aqi_grid_dir=AQI_GRID_DIR,
+                 route_cache_path=ROUTE_CACHE_PATH, congestion_profile=CONGESTION_PROFILE,
+                 ors_api_key=ORS_API_KEY, ors_base_url=ORS_BASE_URL, ors_max_workers=ORS_MAX_WORKERS,
+                 road_graph_dir=ROAD_GRAPH_DIR, routing_backend=ROUTING_BACKEND, threshold_km=1.0):
+        self.places = places
+        self.aqi_csv = aqi_csv
+        self.aqi_store_dir = aqi_store_dir
+        self.model_store_dir = model_store_dir
+        self.arima_pickle = arima_pickle
+        self.forecast_cube_dir = forecast_cube_dir
+        self.aqi_grid_dir = aqi_grid_dir
+        self.route_cache_path = route_cache_path
+        self.congestion_profile = congestion_profile
+        self.ors_api_key = ors_api_key
+        self.ors_base_url = ors_base_url
+        self.ors_max_workers = ors_max_workers
+        self.road_graph_dir = road_graph_dir
+        self.routing_backend = routing_backend
+        self.threshold_km = threshold_km
+        self._resources = {}
+        self._lock = threading.RLock()
+
+    @lazy_resource
+    def aqi_index(self):
+        from waybetter.aqi_index import AQIIndex
+        from waybetter.aqi_store import load_frame
+        return AQIIndex.from_frame(load_frame(self.aqi_csv, self.aqi_store_dir))
+
+    # Per-location store if built, else the legacy pickle, else no models
+    @lazy_resource
+    def models(self):
+        if Path(self.model_store_dir, MANIFEST).exists():
+            from waybetter.model_store import ModelStore
+            return ModelStore(self.model_store_dir)
+        if Path(self.arima_pickle).exists():
+            with open(self.arima_pickle, 'rb') as f:
+                return pickle.load(f)
+        return {}
+
+    @lazy_resource(ttl=ARTIFACT_TTL)
+    def forecast_cube(self):
+        from waybetter.forecast_cube import ForecastCube
+        return ForecastCube.open(self.forecast_cube_dir)
+
+    @lazy_resource(ttl=ARTIFACT_TTL)
+    def aqi_grid(self):
+        from waybetter.aqi_grid import AQIGrid
+        return AQIGrid.open(self.aqi_grid_dir)
+
+    @lazy_resource
+    def station_index(self):
+        from waybetter.spatial_index import StationIndex
+        return StationIndex(self.places)
+
+    @lazy_resource
+    def match_store(self):
+        from waybetter.route_matches import RouteMatchStore
+        return RouteMatchStore(self.route_cache_path)
+
+    @lazy_resource
+    def road_graph(self):
+        from waybetter.road_graph import RoadGraph
+        return RoadGraph.open(self.road_graph_dir)
+
+    # Local road graph routing if selected and built, else ORS
+    @lazy_resource
+    def routing(self):
+        if self.routing_backend != 'ors' and self.road_graph is not None:
+            from waybetter.road_graph import LocalRoutingProvider
+            return LocalRoutingProvider(self.road_graph)
+        if self.routing_backend == 'local':
+            raise RuntimeError(f"ROUTING_BACKEND=local but no road graph in {self.road_graph_dir}")
+        from waybetter.route_cache import RouteCache
+        from waybetter.routing import RoutingProvider
+        return RoutingProvider(api_key=self.ors_api_key, base_url=self.ors_base_url,
+                               max_workers=self.ors_max_workers, cache=RouteCache(self.route_cache_path))
+
+    @lazy_resource
+    def congestion(self):
+        from waybetter.congestion import load_congestion_provider
+        return load_congestion_provider(self.congestion_profile)
+
+    # AQI prediction
+    def predict_aqi(self, location, date_time):
+        if getattr(date_time, 'tzinfo', None) is not None:
+            date_time = local_time(date_time).to_pydatetime()
+        aqi_index = self.aqi_index
+
+        # Within the dataset: nearest observation
+        if location in aqi_index and date_time <= aqi_index.last_time(location):
+            return round(aqi_index.nearest(location, date_time))
+
+        # Past the end of the dataset: precomputed forecast cube, then a live forecast
+        forecast_cube = self.forecast_cube
+        if forecast_cube is not None:
+            forecast = forecast_cube.lookup(location, date_time)
+            if forecast is not None:
+                return round(forecast)
+
+        models = self.models
+        if location in models and location in aqi_index:
+            model = models[location]
+            time_diff = (date_time - aqi_index.last_time(location)).total_seconds() / 900
+            forecast = model.forecast(steps=max(1, int(time_diff)))
+            return round(forecast.iloc[-1]) if isinstance(forecast, pd.Series) else round(forecast[-1])
+
+        closest_value = aqi_index.nearest(location, date_time)
+        if closest_value is not None:
+            return round(closest_value)
+
+        return random.randint(50, 300)
+
+    # predict_aqi over arrays of locations and datetimes, same precedence:
+    # observations and the forecast cube are vectorized, and only the
+    # remaining (location, time) pairs go through predict_aqi one by one
+    def predict_aqi_batch(self, locations, date_times):
+        locations = np.asarray(locations, dtype=object)
+        query = local_times(np.asarray(date_times))
+        aqi_index = self.aqi_index
+
+        values = aqi_index.nearest_batch(locations, query)
+        unique, inverse = np.unique(locations, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        known = np.array([location in aqi_index for location in unique], dtype=bool)[inverse]
+        last = np.array([aqi_index.times[location][-1] if location in aqi_index else 0 for location in unique],
+                        dtype=np.int64)[inverse]
+        future = known & (query.astype(np.int64) > last)
+
+        forecast_cube = self.forecast_cube
+        pending = future.copy()
+        if forecast_cube is not None and future.any():
+            forecast = forecast_cube.lookup_batch(locations[future], query[future])
+            values[future] = np.where(np.isfinite(forecast), forecast, values[future])
+            pending[future] = ~np.isfinite(forecast)
+
+        # Live forecasts past the cube, and unknown locations
+        models = self.models
+        pending &= np.array([location in models for location in unique], dtype=bool)[inverse]
+        pending |= ~known
+        if pending.any():
+            slow = {}
+            for i in np.flatnonzero(pending):
+                key = (locations[i], query[i])
+                if key not in slow:
+                    slow[key] = self.predict_aqi(key[0], pd.Timestamp(key[1]).to_pydatetime())
+                values[i] = slow[key]
+        return np.round(values)
+
+    # Scoring weightings usable right now ('grid' only once a grid is built)
+    def weightings(self):
+        from waybetter.scoring import WEIGHTINGS
+        return [w for w in WEIGHTINGS if w != 'grid' or self.aqi_grid is not None]
+
+    # Candidate routes from source to destination for travel at `when`:
+    # (routes, errors) as from fetch_routes. On the local graph the eco
+    # route for that time is included; with `alternatives`, that many
+    # diverse extra candidates are generated as well (local graph or ORS
+    # alternative routes), dropping geometries already fetched.
+    def candidate_routes(self, source, destination, when, congestion, preferences=PREFERENCES, alternatives=0):
+        from waybetter.route_matches import geometry_key, route_coordinates
+
+        origin, target = self.places[source], self.places[destination]
+        if getattr(self.routing, 'graph', None) is not None:
+            graph = self.routing.graph
+            penalties = {
+                'station_aqi': self.predict_aqi_batch(graph.stations, [when] * len(graph.stations)),
+                'station_congestion': [congestion.get(station, np.nan) for station in graph.stations],
+            }
+            routes, errors = self.routing.fetch_routes(
+                origin, target, tuple(dict.fromkeys((*preferences, 'eco'))), **penalties
+            )
+            if alternatives:
+                extra, extra_errors = self.routing.fetch_alternatives(origin, target, alternatives, **penalties)
+        else:
+            routes, errors = self.routing.fetch_routes(origin, target, preferences)
+            if alternatives:
+                extra, extra_errors = self.routing.fetch_alternatives(origin, target, alternatives)
+        if alternatives:
+            seen = {geometry_key(route_coordinates(route)) for route, _ in routes}
+            for route, pref in extra:
+                key = geometry_key(route_coordinates(route))
+                if key not in seen:
+                    seen.add(key)
+                    routes.append((route, pref))
+            errors = errors + extra_errors
+        return routes, errors
+
+    # Fetch candidate routes from source to destination (names in `places`)
+    # and rank them by eco-score for travel at `when`, with `alternatives`
+    # extra diverse candidates (see candidate_routes)
+    def plan_routes(self, source, destination, when, weighting='station', preferences=PREFERENCES,
+                    congestion=None, alternatives=0):
+        from waybetter.scoring import pareto_front, rank_routes
+
+        when = local_time(when).to_pydatetime()
+        results = RouteResults(source, destination, pd.Timestamp(when), weighting)
+        results.congestion = congestion or self.congestion.for_slot(self.places, when)
+
+        routes, results.errors = self.candidate_routes(source, destination, when, results.congestion,
+                                                       preferences, alternatives)
+
+        # Interpolated field for the travel time slot, if one was precomputed
+        aqi_sampler = None
+        if weighting == 'grid':
+            grid = self.aqi_grid
+            slot = grid.slot_for(when) if grid is not None else None
+            if slot is None:
+                results.notes.append("No interpolated AQI field for this time; using distance-weighted exposure.")
+                weighting = results.weighting = 'distance'
+            else:
+                aqi_sampler = lambda lats, lons: grid.sample(lats, lons, slot)
+
+        # Calculate eco-scores for all candidates at once (best first)
+        matches = [self.match_store.match(route, self.station_index, self.threshold_km) for route, _ in routes]
+        results.routes = rank_routes(
+            routes,
+            matches,
+            aqi_for=lambda stations: [self.predict_aqi(place, when) for place in stations],
+            congestion_for=lambda stations: [results.congestion[place] for place in stations],
+            weighting=weighting,
+            aqi_sampler=aqi_sampler,
+        )
+        results.front = pareto_front(results.routes)
+        return results
+
+    # Score the candidate routes for departures every `step_minutes` over
+    # `hours` from `start`. Routes and station matches are fetched once
+    # (through the route cache and match store); AQI and congestion for the
+    # whole (departures x stations) matrix come from one vectorized lookup
+    # each, and every route is scored at every departure with two matrix
+    # products. 'grid' weighting sweeps as 'distance'.
+    def sweep_departures(self, source, destination, start, hours=SWEEP_HOURS, step_minutes=SWEEP_STEP_MINUTES,
+                         weighting='distance', preferences=PREFERENCES, alternatives=0):
+        from waybetter.scoring import PairPlan
+
+        start = local_time(start)
+        times = pd.date_range(start, start + pd.Timedelta(hours=hours), freq=pd.Timedelta(minutes=step_minutes))
+        sweep = DepartureSweep(source, destination, times, 'station' if weighting == 'station' else 'distance')
+        if weighting == 'grid':
+            sweep.notes.append("Departure sweeps use distance-weighted exposure.")
+
+        congestion = self.congestion.for_slot(self.places, start.to_pydatetime())
+        routes, sweep.errors = self.candidate_routes(source, destination, start.to_pydatetime(), congestion,
+                                                     preferences, alternatives)
+        matches = [self.match_store.match(route, self.station_index, self.threshold_km) for route, _ in routes]
+        plan = PairPlan(routes, sweep.errors, matches, sweep.weighting)
+        sweep.preferences = plan.preferences
+        if not plan.stations:
+            return sweep
+
+        n = len(plan.stations)
+        locations = np.tile(np.array(plan.stations, dtype=object), len(times))
+        slot_times = np.repeat(times.values, n)
+        aqi = self.predict_aqi_batch(locations, slot_times).reshape(len(times), n)
+        congestion = np.asarray(self.congestion.lookup(locations, slot_times), dtype=np.float64).reshape(len(times), n)
+        sweep.avg_aqi, sweep.avg_congestion, sweep.exposure, sweep.eco_score = plan.metrics(aqi, congestion)
+        sweep.duration_min = plan.duration_s / 60
+        sweep.distance_km = plan.distance_m / 1000
+        return sweep
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+# Process-wide engine with default settings
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = Engine()
+    return _engine
+
+
+def plan_routes(source, destination, when, **kwargs):
+    return get_engine().plan_routes(source, destination, when, **kwargs)
@@ -0,0 +1,179 @@
+import argparse
+import json
+import os
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+FORECAST_CUBE_DIR = os.environ.get("FORECAST_CUBE_DIR", "forecast_cube")
+META = "cube.json"
+STEP_SECONDS = 900
+DEFAULT_HORIZON_DAYS = 45
+
+
+def _forecast_row(model, horizon):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        forecast = model.forecast(steps=horizon)
+    return np.asarray(forecast, dtype=np.float32)
+
+
+# Observations recorded after `since` (ns), to extend a model without refitting
+def _new_observations(aqi_index, location, since):
+    times = aqi_index.times[location]
+    return aqi_index.values[location][np.searchsorted(times, since, side='right'):]
+
+
+# Precomputed AQI forecasts: one row per location, one column per 15-minute
+# step after that location's last observation. Stored as a .npy that is
+# memory-mapped on open, so a lookup is an index into the page cache rather
+# than an ARIMA forecast on the request thread.
+class ForecastCube:
+    def __init__(self, directory=FORECAST_CUBE_DIR):
+        self.directory = Path(directory)
+        with open(self.directory / META) as f:
+            self.meta = json.load(f)
+        self.cube = np.load(self.directory / self.meta['file'], mmap_mode='r')
+        self.rows = {location: i for i, location in enumerate(self.meta['locations'])}
+        self.origins = np.asarray(self.meta['origins'], dtype=np.int64)
+        self.step_ns = self.meta['step_seconds'] * 10**9
+        self.horizon = self.cube.shape[1]
+
+    @classmethod
+    def open(cls, directory=FORECAST_CUBE_DIR):
+        if not Path(directory, META).exists():
+            return None
+        return cls(directory)
+
+    # Forecast for location at date_time, or None if the location isn't in the
+    # cube or the time falls outside its horizon. Steps are counted the same
+    # way predict_aqi counts them for a live forecast.
+    def lookup(self, location, date_time):
+        row = self.rows.get(location)
+        if row is None:
+            return None
+        step = max(1, int((pd.Timestamp(date_time).value - self.origins[row]) / self.step_ns))
+        if step > self.horizon:
+            return None
+        return float(self.cube[row, step - 1])
+
+    # Vectorized lookup, NaN where lookup() would return None
+    def lookup_batch(self, locations, date_times):
+        rows = np.array([self.rows.get(location, -1) for location in locations])
+        query = pd.to_datetime(np.asarray(date_times)).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        steps = np.maximum(1, ((query - self.origins[rows]) / self.step_ns).astype(np.int64))
+        valid = (rows >= 0) & (steps <= self.horizon)
+
+        result = np.full(len(rows), np.nan)
+        result[valid] = self.cube[rows[valid], steps[valid] - 1]
+        return result
+
+
+def _write(directory, meta, cube):
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    previous = meta.get('file')
+
+    # New generation file first, then swap the metadata that points at it;
+    # readers that already mapped the old file keep a valid mapping.
+    meta['file'] = f"cube-{time.time_ns()}.npy"
+    np.save(directory / meta['file'], cube)
+    tmp = directory / (META + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp, directory / META)
+
+    for old in directory.glob('cube-*.npy'):
+        if old.name not in (meta['file'], previous):
+            old.unlink(missing_ok=True)
+
+
+def build_cube(models, aqi_index, directory=FORECAST_CUBE_DIR, horizon_days=DEFAULT_HORIZON_DAYS):
+    horizon = int(horizon_days * 86400 / STEP_SECONDS)
+    locations = [location for location in models.keys() if location in aqi_index]
+    cube = np.full((len(locations), horizon), np.nan, dtype=np.float32)
+    origins = []
+    for i, location in enumerate(locations):
+        cube[i] = _forecast_row(models[location], horizon)
+        origins.append(int(aqi_index.times[location][-1]))
+
+    meta = {
+        'locations': locations,
+        'origins': origins,
+        # Where each model's own history ends; refresh appends from here
+        'model_origins': list(origins),
+        'step_seconds': STEP_SECONDS,
+        'built_at': time.time(),
+    }
+    _write(directory, meta, cube)
+    return meta
+
+
+# Re-forecast only the locations that have observations newer than their row's
+# origin, extending the model with those observations instead of refitting.
+# Returns the locations that were refreshed.
+def refresh_cube(models, aqi_index, directory=FORECAST_CUBE_DIR):
+    current = ForecastCube(directory)
+    meta = dict(current.meta)
+    cube = np.array(current.cube)
+
+    refreshed = []
+    for row, location in enumerate(meta['locations']):
+        if location not in aqi_index:
+            continue
+        last = int(aqi_index.times[location][-1])
+        if last <= meta['origins'][row]:
+            continue
+
+        model = models[location]
+        new_obs = _new_observations(aqi_index, location, meta['model_origins'][row])
+        if len(new_obs) and hasattr(model, 'append'):
+            model = model.append(new_obs, refit=False)
+        cube[row] = _forecast_row(model, cube.shape[1])
+        meta['origins'][row] = last
+        refreshed.append(location)
+
+    if refreshed:
+        meta['built_at'] = time.time()
+        _write(directory, meta, cube)
+    return refreshed
+
+
+def main():
+    from waybetter.aqi_index import AQIIndex
+    from waybetter.aqi_store import AQI_CSV, AQI_STORE_DIR, load_frame
+    from waybetter.model_store import MANIFEST, MODEL_STORE_DIR, ModelStore
+
+    parser = argparse.ArgumentParser(prog='python -m waybetter.forecast_cube')
+    parser.add_argument('command', choices=['build', 'refresh'])
+    parser.add_argument('--data', default=AQI_CSV, help='AQI CSV, used when the Parquet store is not built')
+    parser.add_argument('--store', default=AQI_STORE_DIR, help='Parquet AQI store directory')
+    parser.add_argument('--models', default=MODEL_STORE_DIR,
+                        help='model store directory, or a pickled {location: model} dict')
+    parser.add_argument('--directory', default=FORECAST_CUBE_DIR)
+    parser.add_argument('--horizon-days', type=float, default=DEFAULT_HORIZON_DAYS)
+    args = parser.parse_args()
+
+    aqi_index = AQIIndex.from_frame(load_frame(args.data, args.store))
+
+    if Path(args.models, MANIFEST).exists():
+        models = ModelStore(args.models, max_loaded=1)
+    else:
+        import pickle
+        with open(args.models, 'rb') as f:
+            models = pickle.load(f)
+
+    t0 = time.perf_counter()
+    if args.command == 'build' or not Path(args.directory, META).exists():
+        meta = build_cube(models, aqi_index, args.directory, args.horizon_days)
+        print(f"built forecast cube for {len(meta['locations'])} locations in {time.perf_counter() - t0:.1f}s")
+    else:
+        refreshed = refresh_cube(models, aqi_index, args.directory)
+        print(f"refreshed {len(refreshed)} locations in {time.perf_counter() - t0:.1f}s: {', '.join(refreshed)}")
+
+
+if __name__ == '__main__':
+    main()
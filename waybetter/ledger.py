@@ -0,0 +1,217 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+
+from waybetter.rewards import RewardContract, event_topics
+
+LEDGER_PATH = os.environ.get("LEDGER_PATH", "rewards_ledger.sqlite3")
+LEDGER_START_BLOCK = int(os.environ.get("LEDGER_START_BLOCK", "0"))
+LEDGER_EVENTS = ('Funded', 'RewardGiven', 'RewardWithdrawn')
+# Blocks per eth_getLogs request
+CHUNK_BLOCKS = 2000
+
+
+# Local ledger of the reward contract's Funded/RewardGiven/RewardWithdrawn
+# logs in SQLite, one row per log keyed by (block, log_index), with the last
+# indexed block kept alongside so sync() only asks the node for new blocks.
+# Amounts are stored exactly in wei (as text) and as float ETH for sums.
+class Ledger:
+    def __init__(self, path=LEDGER_PATH):
+        self.path = str(path)
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS events (
+                block INTEGER NOT NULL,
+                log_index INTEGER NOT NULL,
+                tx_hash TEXT NOT NULL,
+                event TEXT NOT NULL,
+                user TEXT NOT NULL,
+                amount_wei TEXT NOT NULL,
+                amount_eth REAL NOT NULL,
+                PRIMARY KEY (block, log_index)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS events_user ON events (user, block)")
+        conn.execute("CREATE INDEX IF NOT EXISTS events_event ON events (event, block)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS ledger_cursor (
+                contract TEXT PRIMARY KEY,
+                block INTEGER NOT NULL
+            )
+        """)
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def last_block(self, contract_address):
+        row = self._conn().execute("SELECT block FROM ledger_cursor WHERE contract = ?", (contract_address,)).fetchone()
+        return row[0] if row else LEDGER_START_BLOCK - 1
+
+    # Index new logs up to `confirmations` blocks behind the head.
+    # Returns the number of events added.
+    def sync(self, rewards, confirmations=0, chunk_blocks=CHUNK_BLOCKS):
+        from web3 import Web3
+
+        web3, contract = rewards.web3, rewards.contract
+        events = {name: getattr(contract.events, name)() for name in LEDGER_EVENTS}
+        topics = {topic: name for name, topic in event_topics(LEDGER_EVENTS).items()}
+
+        head = web3.eth.block_number - confirmations
+        start = self.last_block(contract.address) + 1
+        added = 0
+        for from_block in range(start, head + 1, chunk_blocks):
+            to_block = min(from_block + chunk_blocks - 1, head)
+            logs = web3.eth.get_logs({
+                'address': contract.address,
+                'fromBlock': from_block,
+                'toBlock': to_block,
+                'topics': [list(topics)],
+            })
+            rows = []
+            for log in logs:
+                name = topics[Web3.to_hex(log['topics'][0])]
+                decoded = events[name].process_log(log)
+                args = decoded['args']
+                user, amount = args.get('user', args.get('sender')), args['amount']
+                rows.append((
+                    decoded['blockNumber'], decoded['logIndex'], Web3.to_hex(decoded['transactionHash']),
+                    name, user, str(amount), float(Web3.from_wei(amount, 'ether')),
+                ))
+
+            # Events and cursor move together, so a crash never skips or repeats a range
+            conn = self._conn()
+            with conn:
+                conn.executemany("INSERT OR IGNORE INTO events VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                conn.execute("INSERT OR REPLACE INTO ledger_cursor (contract, block) VALUES (?, ?)",
+                             (contract.address, to_block))
+            added += len(rows)
+        return added
+
+    # Top wallets by total RewardGiven: (user, total ETH, rewards)
+    def leaderboard(self, limit=10):
+        return self._conn().execute("""
+            SELECT user, SUM(amount_eth) AS total, COUNT(*) FROM events
+            WHERE event = 'RewardGiven' GROUP BY user ORDER BY total DESC LIMIT ?
+        """, (limit,)).fetchall()
+
+    # All events for one wallet, oldest first: (block, event, amount ETH, tx hash)
+    def history(self, user):
+        from web3 import Web3
+        return self._conn().execute(
+            "SELECT block, event, amount_eth, tx_hash FROM events WHERE user = ? ORDER BY block, log_index",
+            (Web3.to_checksum_address(user),)
+        ).fetchall()
+
+    # Rewards credited minus withdrawn for one wallet, in ETH
+    def outstanding(self, user):
+        from web3 import Web3
+        row = self._conn().execute("""
+            SELECT COALESCE(SUM(CASE event WHEN 'RewardGiven' THEN amount_eth
+                                           WHEN 'RewardWithdrawn' THEN -amount_eth END), 0)
+            FROM events WHERE user = ?
+        """, (Web3.to_checksum_address(user),)).fetchone()
+        return row[0]
+
+    # ETH held by the contract after each block with funding or withdrawals:
+    # [(block, balance ETH)]. Credited rewards stay in the contract until withdrawn.
+    def balance_history(self):
+        return self._conn().execute("""
+            SELECT block, SUM(SUM(CASE event WHEN 'Funded' THEN amount_eth ELSE -amount_eth END))
+                              OVER (ORDER BY block)
+            FROM events WHERE event IN ('Funded', 'RewardWithdrawn') GROUP BY block ORDER BY block
+        """).fetchall()
+
+    def totals(self):
+        return dict(self._conn().execute(
+            "SELECT event, SUM(amount_eth) FROM events GROUP BY event"
+        ).fetchall())
+
+
+# Background thread keeping a Ledger in sync with the chain
+class LedgerTailer:
+    def __init__(self, ledger, rewards_factory=RewardContract, interval=5.0, confirmations=0):
+        self.ledger = ledger
+        self.rewards_factory = rewards_factory
+        self.interval = interval
+        self.confirmations = confirmations
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="ledger-tailer", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        rewards = None
+        while not self._stop.is_set():
+            try:
+                rewards = rewards or self.rewards_factory()
+                if self.ledger.sync(rewards, self.confirmations):
+                    # New contract events: cached owner/balance reads are stale
+                    rewards.invalidate()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = f"{type(e).__name__}: {e}"
+                rewards = None
+            self._stop.wait(self.interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m waybetter.ledger', description='local rewards ledger')
+    parser.add_argument('--path', default=LEDGER_PATH)
+    sub = parser.add_subparsers(dest='command', required=True)
+    sync_parser = sub.add_parser('sync', help='index new contract events')
+    sync_parser.add_argument('--confirmations', type=int, default=0)
+    sync_parser.add_argument('--follow', action='store_true', help='keep tailing new blocks')
+    board_parser = sub.add_parser('leaderboard')
+    board_parser.add_argument('--limit', type=int, default=10)
+    history_parser = sub.add_parser('history')
+    history_parser.add_argument('user')
+    sub.add_parser('balance', help='contract balance after each funding/withdrawal block')
+    args = parser.parse_args()
+
+    ledger = Ledger(args.path)
+    if args.command == 'sync':
+        rewards = RewardContract()
+        while True:
+            t0 = time.perf_counter()
+            added = ledger.sync(rewards, args.confirmations)
+            print(f"indexed {added} events up to block {ledger.last_block(rewards.contract.address)} "
+                  f"in {time.perf_counter() - t0:.2f}s")
+            if not args.follow:
+                break
+            time.sleep(5)
+    elif args.command == 'leaderboard':
+        for rank, (user, total, count) in enumerate(ledger.leaderboard(args.limit), 1):
+            print(f"{rank:3d}. {user}  {total:.4f} ETH  ({count} rewards)")
+    elif args.command == 'history':
+        for block, event, amount, tx_hash in ledger.history(args.user):
+            print(f"{block:8d}  {event:16s} {amount:.4f} ETH  {tx_hash}")
+        print(f"outstanding: {ledger.outstanding(args.user):.4f} ETH")
+    elif args.command == 'balance':
+        for block, balance in ledger.balance_history():
+            print(f"{block:8d}  {balance:.4f} ETH")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+import argparse
+import json
+import os
+import pickle
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+MODEL_STORE_DIR = os.environ.get("MODEL_STORE_DIR", "arima_models")
+MANIFEST = "manifest.json"
+# Observations kept per model; enough for the Kalman filter to reach the
+# same end state as the full history. Models with a time trend keep the
+# whole series, since statsmodels counts the trend from the first one.
+TAIL_OBSERVATIONS = 500
+
+
+def _slug(location):
+    return re.sub(r'[^A-Za-z0-9]+', '_', location).strip('_').lower()
+
+
+# True for trends with a time term ('t', 'ct' or a polynomial list)
+def _time_trend(trend):
+    if trend is None or isinstance(trend, str):
+        return trend not in (None, 'n', 'c')
+    return any(trend[1:])
+
+
+# Fitted parameters and the tail of the training series for a statsmodels
+# ARIMA result, or None if the model isn't one we can rebuild. The spec
+# records where the tail starts in the original index (a date and frequency,
+# or a position), so forecasts keep their labels.
+def _arima_spec(model):
+    try:
+        from statsmodels.tsa.arima.model import ARIMA
+        if not isinstance(model.model, ARIMA):
+            return None
+        spec = {
+            'order': list(model.model.order),
+            'seasonal_order': list(model.model.seasonal_order),
+            'trend': model.model.trend,
+        }
+        params = np.asarray(model.params, dtype=np.float64)
+        endog = np.asarray(model.model.endog, dtype=np.float64).reshape(-1)
+        index, generated = model.model._index, model.model._index_generated
+    except (ImportError, AttributeError):
+        return None
+
+    start = 0 if _time_trend(spec['trend']) else max(len(endog) - TAIL_OBSERVATIONS, 0)
+    if generated:
+        spec['index'] = None
+    elif isinstance(index, pd.DatetimeIndex) and index.freq is not None:
+        spec['index'] = {'start': index[start].isoformat(), 'freq': index.freqstr}
+    elif isinstance(index, pd.RangeIndex) and index.step == 1:
+        spec['index'] = {'start': int(index[start])}
+    else:
+        # Irregular index: keep the pickle
+        return None
+    return spec, params, endog[start:]
+
+
+def _rebuild_arima(spec, params, endog):
+    from statsmodels.tsa.arima.model import ARIMA
+
+    index = spec.get('index')
+    if index is not None and 'freq' in index:
+        endog = pd.Series(endog, index=pd.date_range(index['start'], periods=len(endog), freq=index['freq']))
+    elif index is not None:
+        endog = pd.Series(endog, index=pd.RangeIndex(index['start'], index['start'] + len(endog)))
+    model = ARIMA(endog, order=tuple(spec['order']), seasonal_order=tuple(spec['seasonal_order']), trend=spec['trend'])
+    return model.filter(params)
+
+
+# Per-location ARIMA model artifacts, loaded on first use.
+# ARIMA results are stored as fitted parameters plus a short tail of the
+# series (.npz) and rebuilt with a single Kalman filter pass; other model
+# types fall back to a pickle per location. At most `max_loaded` models
+# stay in memory, least recently used first out.
+class ModelStore:
+    def __init__(self, directory=MODEL_STORE_DIR, max_loaded=8):
+        self.directory = Path(directory)
+        with open(self.directory / MANIFEST) as f:
+            self.manifest = json.load(f)
+        self.max_loaded = max_loaded
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, location):
+        return location in self.manifest
+
+    def __len__(self):
+        return len(self.manifest)
+
+    def keys(self):
+        return self.manifest.keys()
+
+    def __getitem__(self, location):
+        with self._lock:
+            model = self._loaded.get(location)
+            if model is not None:
+                self._loaded.move_to_end(location)
+                return model
+
+        model = self._load(location)
+        with self._lock:
+            self._loaded[location] = model
+            while len(self._loaded) > self.max_loaded:
+                self._loaded.popitem(last=False)
+        return model
+
+    def get(self, location, default=None):
+        return self[location] if location in self else default
+
+    def _load(self, location):
+        entry = self.manifest[location]
+        path = self.directory / entry['file']
+        if entry['kind'] == 'arima':
+            with np.load(path) as artifact:
+                spec = json.loads(str(artifact['spec']))
+                return _rebuild_arima(spec, artifact['params'], artifact['endog'])
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+
+# Split a pickled {location: model} dict into a ModelStore directory
+def convert(pickle_path, directory=MODEL_STORE_DIR):
+    with open(pickle_path, 'rb') as f:
+        models = pickle.load(f)
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest = {}
+    for location, model in models.items():
+        slug = _slug(location)
+        arima = _arima_spec(model)
+        if arima is not None:
+            spec, params, endog = arima
+            np.savez(directory / f"{slug}.npz", spec=json.dumps(spec), params=params, endog=endog)
+            manifest[location] = {'file': f"{slug}.npz", 'kind': 'arima'}
+        else:
+            with open(directory / f"{slug}.pkl", 'wb') as f:
+                pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+            manifest[location] = {'file': f"{slug}.pkl", 'kind': 'pickle'}
+
+    with open(directory / MANIFEST, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m waybetter.model_store',
+                                     description='convert arima_models.pkl into a per-location model store')
+    parser.add_argument('pickle_path', nargs='?', default='arima_models.pkl')
+    parser.add_argument('directory', nargs='?', default=MODEL_STORE_DIR)
+    args = parser.parse_args()
+
+    manifest = convert(args.pickle_path, args.directory)
+    kinds = [entry['kind'] for entry in manifest.values()]
+    print(f"wrote {len(manifest)} models to {args.directory} "
+          f"({kinds.count('arima')} as parameters, {kinds.count('pickle')} pickled)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,22 @@
+# Mumbai Locations
+places = {
+    'Bandra Kurla Complex': (19.0680, 72.8774),
+    'Bandra': (19.0600, 72.8355),
+    'Borivali East': (19.2306, 72.8598),
+    'Chakala Andheri East': (19.1156, 72.8570),
+    'Colaba': (18.9067, 72.8147),
+    'Deonar': (19.0474, 72.9180),
+    'Kandivali East': (19.2068, 72.8747),
+    'Khindipada Bhandup West': (19.1549, 72.9366),
+    'Kurla': (19.0726, 72.8820),
+    'Malad West': (19.1862, 72.8484),
+    'Mazgaon': (18.9636, 72.8411),
+    'Mulund West': (19.1726, 72.9421),
+    'Navy Nagar Colaba': (18.8922, 72.8122),
+    'Powai': (19.1177, 72.9106),
+    'Siddharth Nagar Worli': (19.0030, 72.8150),
+    'Sion': (19.0421, 72.8612),
+    'Vasai West': (19.3730, 72.8324),
+    'Vile Parle West': (19.0991, 72.8363),
+    'Worli': (18.9949, 72.8152)
+}
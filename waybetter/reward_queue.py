@@ -0,0 +1,544 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+
+from waybetter.rewards import MIN_BALANCE_ETH, REWARD_WEI, RewardContract
+
+CLAIM_QUEUE_PATH = os.environ.get("CLAIM_QUEUE_PATH", "reward_claims.sqlite3")
+POLL_INTERVAL = 1.0
+# Seconds a claim may wait for its batch to fill before it is flushed anyway
+# (REWARD_FLUSH_WINDOW unset sends every claim as its own giveReward)
+REWARD_FLUSH_WINDOW = float(os.environ["REWARD_FLUSH_WINDOW"]) if os.environ.get("REWARD_FLUSH_WINDOW") else None
+REWARD_BATCH_SIZE = int(os.environ.get("REWARD_BATCH_SIZE", "20"))
+# A dispatcher holds the lease for this long past its last heartbeat; it
+# renews it at the start of a pass and again before every transaction
+LEASE_SECONDS = 15
+GAS_BUFFER = 1.2
+# A transaction whose send failed ambiguously is taken as never broadcast
+# once its nonce is still unused after this many seconds
+SETTLE_SECONDS = 30
+# One reward per wallet and route in each window of this many seconds
+CLAIM_WINDOW = int(os.environ.get("CLAIM_WINDOW", str(24 * 3600)))
+
+QUEUED = 'queued'
+SENDING = 'sending'
+SUBMITTED = 'submitted'
+# The send failed after the transaction may have reached the node; settled
+# from the owner's nonce (and its transaction's receipt) before anything else
+UNKNOWN = 'unknown'
+CONFIRMED = 'confirmed'
+FAILED = 'failed'
+FINAL = (CONFIRMED, FAILED)
+
+
+# `block` is the block the claim's transaction was mined in; while the
+# claim is sending or unknown, a block at or before the one it was sent in
+@dataclass(slots=True)
+class Claim:
+    id: int
+    wallet: str
+    status: str
+    tx_hash: str | None
+    nonce: int | None
+    block: int | None
+    error: str | None
+    created_at: float
+    updated_at: float
+
+    @property
+    def done(self):
+        return self.status in FINAL
+
+
+# Raised by ClaimQueue.enqueue when the wallet already has a live claim for
+# the route in this window; `claim` is that earlier claim
+class DuplicateClaim(Exception):
+    def __init__(self, claim):
+        super().__init__(f"reward already claimed for this route (claim {claim.id}, {claim.status})")
+        self.claim = claim
+
+
+# Raised mid-pass when the dispatcher's lease has gone to another holder
+class LeaseLost(Exception):
+    pass
+
+
+# Durable reward claim queue in SQLite (WAL, one connection per thread), so
+# the page and the API only enqueue and poll, and a claim survives restarts
+# of whichever process is dispatching it.
+#
+# Claims made with a route fingerprint are also registered under
+# (wallet, fingerprint, time bucket), so the same route can't be claimed
+# twice in a window no matter how often the page is reloaded. The UNIQUE
+# key in SQLite is the authority across processes; an in-memory dict of
+# recent keys turns repeat attempts away with a single read of the claim,
+# skipping the write transaction. A key whose claim failed may be claimed
+# again; one in 'unknown' may not, since it may still be paid.
+#
+# The API also records the fingerprint of each plan's best route here; only
+# those, planned within the last window, can be claimed through it.
+class ClaimQueue:
+    def __init__(self, path=CLAIM_QUEUE_PATH, window=CLAIM_WINDOW):
+        self.path = str(path)
+        self.window = window
+        self._local = threading.local()
+        self._keys = {}
+        self._keys_bucket = None
+        self._keys_lock = threading.Lock()
+
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS claims (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                wallet TEXT NOT NULL,
+                status TEXT NOT NULL,
+                tx_hash TEXT,
+                nonce INTEGER,
+                block INTEGER,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS claims_status ON claims (status, id)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS claim_keys (
+                wallet TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                bucket INTEGER NOT NULL,
+                claim_id INTEGER NOT NULL,
+                PRIMARY KEY (wallet, fingerprint, bucket)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS planned_routes (
+                fingerprint TEXT PRIMARY KEY,
+                planned_at REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS planned_routes_at ON planned_routes (planned_at)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS dispatcher_lease (
+                name TEXT PRIMARY KEY,
+                holder TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, wallet, fingerprint=None, now=None):
+        now = time.time() if now is None else now
+        if fingerprint is None:
+            conn = self._conn()
+            with conn:
+                return self._insert(conn, wallet, now)
+
+        key = (wallet.lower(), fingerprint, int(now // self.window))
+        with self._keys_lock:
+            # Keys from before the previous bucket can't match again
+            if self._keys_bucket != key[2]:
+                self._keys = {k: v for k, v in self._keys.items() if k[2] >= key[2] - 1}
+                self._keys_bucket = key[2]
+            claim_id = self._keys.get(key)
+        if claim_id is not None:
+            existing = self.get(claim_id)
+            if existing.status != FAILED:
+                raise DuplicateClaim(existing)
+
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT claim_id FROM claim_keys WHERE wallet = ? AND fingerprint = ? AND bucket = ?", key
+            ).fetchone()
+            existing = self.get(row[0]) if row else None
+            if existing is not None and existing.status != FAILED:
+                claim_id = existing.id
+            else:
+                existing = None
+                claim_id = self._insert(conn, wallet, now)
+                conn.execute("INSERT OR REPLACE INTO claim_keys VALUES (?, ?, ?, ?)", (*key, claim_id))
+        with self._keys_lock:
+            self._keys[key] = claim_id
+        if existing is not None:
+            raise DuplicateClaim(existing)
+        return claim_id
+
+    # Record `fingerprint` as a plan's best route, dropping records older
+    # than the window
+    def record_plan(self, fingerprint, now=None):
+        now = time.time() if now is None else now
+        conn = self._conn()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO planned_routes VALUES (?, ?)", (fingerprint, now))
+            conn.execute("DELETE FROM planned_routes WHERE planned_at < ?", (now - self.window,))
+
+    # Whether `fingerprint` was a plan's best route within the window
+    def planned(self, fingerprint, now=None):
+        now = time.time() if now is None else now
+        row = self._conn().execute(
+            "SELECT 1 FROM planned_routes WHERE fingerprint = ? AND planned_at >= ?", (fingerprint, now - self.window)
+        ).fetchone()
+        return row is not None
+
+    def _insert(self, conn, wallet, now):
+        cursor = conn.execute(
+            "INSERT INTO claims (wallet, status, created_at, updated_at) VALUES (?, ?, ?, ?)",
+            (wallet, QUEUED, now, now)
+        )
+        return cursor.lastrowid
+
+    def get(self, claim_id):
+        row = self._conn().execute("SELECT * FROM claims WHERE id = ?", (claim_id,)).fetchone()
+        return Claim(*row) if row else None
+
+    def with_status(self, status, limit=100):
+        rows = self._conn().execute(
+            "SELECT * FROM claims WHERE status = ? ORDER BY id LIMIT ?", (status, limit)
+        ).fetchall()
+        return [Claim(*row) for row in rows]
+
+    def update(self, claim_id, status, **fields):
+        fields['status'] = status
+        fields['updated_at'] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        conn = self._conn()
+        conn.execute(f"UPDATE claims SET {assignments} WHERE id = ?", (*fields.values(), claim_id))
+        conn.commit()
+
+    # Note on queued claims that are waiting (e.g. for contract funds)
+    def note_queued(self, message):
+        conn = self._conn()
+        conn.execute("UPDATE claims SET error = ? WHERE status = ?", (message, QUEUED))
+        conn.commit()
+
+    def stats(self):
+        return dict(self._conn().execute("SELECT status, COUNT(*) FROM claims GROUP BY status").fetchall())
+
+    # Take or renew the named lease for `holder`: 'renewed' if `holder`'s
+    # lease was still live, 'acquired' if it is newly taken, False while
+    # another holder's lease is unexpired. Keeps one dispatcher per owner
+    # account across the Streamlit, API and CLI processes sharing this file.
+    def acquire_lease(self, holder, name='dispatcher', seconds=LEASE_SECONDS):
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT holder, expires_at FROM dispatcher_lease WHERE name = ?", (name,)).fetchone()
+            if row is not None and row[0] != holder and row[1] > now:
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO dispatcher_lease (name, holder, expires_at) VALUES (?, ?, ?)",
+                (name, holder, now + seconds)
+            )
+        return 'renewed' if row is not None and row[0] == holder and row[1] > now else 'acquired'
+
+    def release_lease(self, holder, name='dispatcher'):
+        conn = self._conn()
+        conn.execute("DELETE FROM dispatcher_lease WHERE name = ? AND holder = ?", (name, holder))
+        conn.commit()
+
+
+# Background worker that sends queued claims as giveReward transactions and
+# tracks their receipts, without ever blocking on a block being mined.
+# The owner address is looked up once and the nonce is kept locally
+# (resynced from the node after any send error). Gas is estimated for every
+# transaction with GAS_BUFFER on top: a wallet's first reward writes a new
+# storage slot and costs more than later ones, so no one limit fits all.
+#
+# With flush_window set, claims are aggregated instead: up to batch_size of
+# them go out as one giveRewardBatch transaction, sent as soon as the batch
+# is full or the oldest waiting claim is flush_window seconds old. If the
+# call reverts, the batch is split in halves until the claims that revert
+# are isolated; those fail with the node's error and the rest are sent.
+# Only as many claims go out as the contract balance covers at reward_wei
+# each, so a short balance leaves claims queued instead of reverting them.
+#
+# Claims only fail when they certainly weren't paid. A send that errors
+# after the transaction may have been broadcast (timeout, dropped
+# connection), or a dispatcher dying mid-send, leaves them 'unknown' until
+# the owner's nonce settles it: see settle_unknown().
+class RewardDispatcher:
+    def __init__(self, queue, rewards_factory=RewardContract, interval=POLL_INTERVAL, batch_size=REWARD_BATCH_SIZE,
+                 flush_window=REWARD_FLUSH_WINDOW, reward_wei=REWARD_WEI):
+        self.queue = queue
+        self.rewards_factory = rewards_factory
+        self.interval = interval
+        self.batch_size = batch_size
+        self.flush_window = flush_window
+        self.reward_wei = reward_wei
+        self.holder = uuid.uuid4().hex
+        self.last_error = None
+        self.transactions = 0
+        self._rewards = None
+        self._owner = None
+        self._nonce = None
+        self._sent = 0
+        self._head = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="reward-dispatcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.queue.release_lease(self.holder)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                # Node down or restarting: reconnect and resync on the next pass
+                self.last_error = f"{type(e).__name__}: {e}"
+                self._rewards = None
+                self._nonce = None
+            self._stop.wait(self.interval)
+
+    # One dispatch pass: recover, track receipts, then send queued claims.
+    # Returns the number of claims sent. A pass that loses the lease part
+    # way (slow node calls) stops before its next transaction.
+    def run_once(self):
+        lease = self.queue.acquire_lease(self.holder)
+        if not lease:
+            return 0
+        if self._rewards is None:
+            self._rewards = self.rewards_factory()
+        if lease == 'acquired':
+            self._recover()
+        self.track_receipts()
+        if self.settle_unknown():
+            return 0
+        self._sent = 0
+        try:
+            return self.submit_queued()
+        except LeaseLost:
+            self._nonce = None
+            return self._sent
+
+    # Claims left in 'sending' by a dispatcher that died mid-send may or may
+    # not have reached the node; they wait in 'unknown' to be settled.
+    # Runs whenever this dispatcher takes the lease (first pass, or after
+    # another holder's lease ran out), never on a renewal: our own sends
+    # don't leave claims in 'sending' between passes.
+    def _recover(self):
+        for claim in self.queue.with_status(SENDING, limit=10**6):
+            self.queue.update(claim.id, UNKNOWN, error="interrupted while sending")
+
+    def track_receipts(self):
+        from web3.exceptions import TransactionNotFound
+
+        web3 = self._rewards.web3
+        receipts = {}
+        for claim in self.queue.with_status(SUBMITTED, limit=10**6):
+            # Claims in one batch share a transaction; fetch its receipt once
+            if claim.tx_hash not in receipts:
+                try:
+                    receipts[claim.tx_hash] = web3.eth.get_transaction_receipt(claim.tx_hash)
+                except TransactionNotFound:
+                    receipts[claim.tx_hash] = None
+            receipt = receipts[claim.tx_hash]
+            if receipt is None:
+                continue
+            # Rewards paid out change the contract balance
+            self._rewards.invalidate()
+            if receipt.status == 1:
+                self.queue.update(claim.id, CONFIRMED, block=receipt.blockNumber, error=None)
+            else:
+                self.queue.update(claim.id, FAILED, block=receipt.blockNumber, error="transaction reverted")
+
+    # Settle 'unknown' claims by their nonce. Still unused SETTLE_SECONDS
+    # after the send: never broadcast, so they go back in the queue. Used:
+    # the owner's transaction with that nonce is looked up in the blocks
+    # since the send and its receipt tracked like any other; if it isn't
+    # there, another sender took the nonce and the claims are left for the
+    # ledger to settle. Returns True while a nonce is still unused and
+    # recent, so no new transaction takes it in the meantime.
+    def settle_unknown(self):
+        claims = self.queue.with_status(UNKNOWN, limit=10**6)
+        groups = {}
+        for claim in claims:
+            # Claims without a nonce and block can't be settled here
+            if claim.nonce is not None and claim.block is not None:
+                groups.setdefault((claim.nonce, claim.block), []).append(claim)
+        if not groups:
+            return False
+
+        web3 = self._rewards.web3
+        owner = self._rewards.state().owner
+        pending = web3.eth.get_transaction_count(owner, 'pending')
+        mined = web3.eth.get_transaction_count(owner, 'latest')
+        hold = False
+        for (nonce, block), group in groups.items():
+            if nonce >= pending:
+                if time.time() - max(claim.updated_at for claim in group) < SETTLE_SECONDS:
+                    hold = True
+                    continue
+                for claim in group:
+                    self.queue.update(claim.id, QUEUED, nonce=None, block=None, error=f"not sent ({claim.error})")
+            elif nonce < mined:
+                tx_hash = self._find_transaction(owner, nonce, block)
+                for claim in group:
+                    if tx_hash is not None:
+                        self.queue.update(claim.id, SUBMITTED, tx_hash=tx_hash, block=None, error=None)
+                    else:
+                        self.queue.update(claim.id, UNKNOWN, block=None,
+                                          error=f"nonce {nonce} went to another transaction; check the ledger")
+        return hold
+
+    # Hash of `owner`'s transaction to the contract with `nonce`, searched
+    # from `from_block` to the head, or None
+    def _find_transaction(self, owner, nonce, from_block):
+        web3, address = self._rewards.web3, self._rewards.contract.address
+        for number in range(from_block, web3.eth.block_number + 1):
+            for tx in web3.eth.get_block(number, full_transactions=True)['transactions']:
+                if tx['from'] == owner and tx['nonce'] == nonce and tx['to'] == address:
+                    return web3.to_hex(tx['hash'])
+        return None
+
+    def submit_queued(self):
+        claims = self.queue.with_status(QUEUED, self.batch_size)
+        if not claims:
+            return 0
+        if (self.flush_window is not None and len(claims) < self.batch_size
+                and time.time() - claims[0].created_at < self.flush_window):
+            return 0
+
+        rewards = self._rewards
+        web3 = rewards.web3
+        state = rewards.state()
+        if state.balance_wei < web3.to_wei(MIN_BALANCE_ETH, 'ether'):
+            self.queue.note_queued("waiting for the contract to be funded")
+            return 0
+        if state.owner not in state.accounts:
+            self.queue.note_queued(f"contract owner account ({state.owner}) not available on the node")
+            return 0
+        self._owner = state.owner
+        # Lower bound on the block a transaction sent now is mined in
+        self._head = state.block
+
+        valid = []
+        for claim in claims:
+            if web3.is_address(claim.wallet):
+                valid.append(claim)
+            else:
+                self.queue.update(claim.id, FAILED, error="invalid Ethereum address")
+
+        # Send only what the balance covers, after the claims still in
+        # flight; the rest wait in the queue rather than revert and fail
+        in_flight = self.queue.stats().get(SUBMITTED, 0)
+        affordable = max(state.balance_wei // self.reward_wei - in_flight, 0)
+        if affordable < len(valid):
+            self.queue.note_queued("waiting for the contract to be funded")
+            valid = valid[:affordable]
+
+        if self.flush_window is None:
+            return sum(self._send([claim]) for claim in valid)
+        return self._send(valid) if valid else 0
+
+    # Send one transaction paying `claims`: giveReward for a single claim in
+    # per-claim mode, giveRewardBatch otherwise. Returns the claims sent.
+    def _send(self, claims):
+        from web3.exceptions import ContractLogicError
+
+        web3, contract = self._rewards.web3, self._rewards.contract
+        wallets = [web3.to_checksum_address(claim.wallet) for claim in claims]
+        if self.flush_window is None:
+            call = contract.functions.giveReward(wallets[0])
+        else:
+            call = contract.functions.giveRewardBatch(wallets, [self.reward_wei] * len(wallets))
+        try:
+            gas = int(call.estimate_gas({'from': self._owner}) * GAS_BUFFER)
+        except ContractLogicError as e:
+            return self._isolate(claims, e)
+        if not self.queue.acquire_lease(self.holder):
+            raise LeaseLost(self.holder)
+        if self._nonce is None:
+            self._nonce = web3.eth.get_transaction_count(self._owner, 'pending')
+
+        nonce = self._nonce
+        for claim in claims:
+            self.queue.update(claim.id, SENDING, nonce=nonce, block=self._head)
+        try:
+            tx = call.transact({'from': self._owner, 'gas': gas, 'nonce': nonce})
+        except Exception as e:
+            # Reverts are narrowed down to the claims causing them; nonce
+            # clashes (another sender on the account) go back in the queue;
+            # anything else may have been broadcast and waits to be settled.
+            # Either way resync.
+            self._nonce = None
+            if isinstance(e, ContractLogicError):
+                return self._isolate(claims, e)
+            if 'nonce' in str(e).lower():
+                for claim in claims:
+                    self.queue.update(claim.id, QUEUED, nonce=None, block=None, error=str(e))
+                return 0
+            for claim in claims:
+                self.queue.update(claim.id, UNKNOWN, error=f"send failed: {e}")
+            # Nothing more goes out until the nonce is settled
+            raise
+        self._nonce = nonce + 1
+        self.transactions += 1
+        self._sent += len(claims)
+        tx_hash = web3.to_hex(tx)
+        for claim in claims:
+            self.queue.update(claim.id, SUBMITTED, tx_hash=tx_hash, error=None)
+        return len(claims)
+
+    # `claims` revert together: fail a lone claim, otherwise send each half
+    # on its own so the good claims still go out
+    def _isolate(self, claims, error):
+        if len(claims) == 1:
+            self.queue.update(claims[0].id, FAILED, nonce=None, block=None, error=f"reverted: {error}")
+            return 0
+        half = len(claims) // 2
+        return self._send(claims[:half]) + self._send(claims[half:])
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m waybetter.reward_queue', description='reward claim queue')
+    parser.add_argument('--path', default=CLAIM_QUEUE_PATH)
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('run', help='run the dispatcher in the foreground')
+    sub.add_parser('stats', help='claims per status')
+    args = parser.parse_args()
+
+    queue = ClaimQueue(args.path)
+    if args.command == 'stats':
+        for status, count in sorted(queue.stats().items()):
+            print(f"{status:10s} {count}")
+        return
+
+    dispatcher = RewardDispatcher(queue).start()
+    try:
+        while True:
+            time.sleep(10)
+            if dispatcher.last_error:
+                print(dispatcher.last_error)
+                dispatcher.last_error = None
+    except KeyboardInterrupt:
+        dispatcher.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,300 @@
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+import requests
+from requests.adapters import HTTPAdapter
+
+GANACHE_URL = os.environ.get("GANACHE_URL", "HTTP://127.0.0.1:8545")
+CONTRACT_ADDRESS = os.environ.get("CONTRACT_ADDRESS", "API_KEY")
+# Rewards are only sent while the contract holds at least this much
+MIN_BALANCE_ETH = 1
+# Seconds contract state is served from memory before checking for events
+STATE_TTL = 10
+STATE_EVENTS = ('Funded', 'RewardGiven', 'RewardWithdrawn')
+# Amount credited per claim by giveRewardBatch
+REWARD_WEI = int(os.environ.get("REWARD_WEI", str(10**17)))
+
+# Reward contract ABI. giveRewardBatch(users, amounts) is the batched payout
+# in the upgraded contract: owner only, credits amounts[i] to users[i] and
+# emits RewardGiven for each, in one transaction.
+CONTRACT_ABI = [
+    {
+        "inputs": [],
+        "stateMutability": "nonpayable",
+        "type": "constructor"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {
+                "indexed": True,
+                "internalType": "address",
+                "name": "sender",
+                "type": "address"
+            },
+            {
+                "indexed": False,
+                "internalType": "uint256",
+                "name": "amount",
+                "type": "uint256"
+            }
+        ],
+        "name": "Funded",
+        "type": "event"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {
+                "indexed": True,
+                "internalType": "address",
+                "name": "user",
+                "type": "address"
+            },
+            {
+                "indexed": False,
+                "internalType": "uint256",
+                "name": "amount",
+                "type": "uint256"
+            }
+        ],
+        "name": "RewardGiven",
+        "type": "event"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {
+                "indexed": True,
+                "internalType": "address",
+                "name": "user",
+                "type": "address"
+            },
+            {
+                "indexed": False,
+                "internalType": "uint256",
+                "name": "amount",
+                "type": "uint256"
+            }
+        ],
+        "name": "RewardWithdrawn",
+        "type": "event"
+    },
+    {
+        "inputs": [
+            {
+                "internalType": "address",
+                "name": "user",
+                "type": "address"
+            }
+        ],
+        "name": "checkReward",
+        "outputs": [
+            {
+                "internalType": "uint256",
+                "name": "",
+                "type": "uint256"
+            }
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "fundContract",
+        "outputs": [],
+        "stateMutability": "payable",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "getBalance",
+        "outputs": [
+            {
+                "internalType": "uint256",
+                "name": "",
+                "type": "uint256"
+            }
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {
+                "internalType": "address",
+                "name": "user",
+                "type": "address"
+            }
+        ],
+        "name": "giveReward",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {
+                "internalType": "address[]",
+                "name": "users",
+                "type": "address[]"
+            },
+            {
+                "internalType": "uint256[]",
+                "name": "amounts",
+                "type": "uint256[]"
+            }
+        ],
+        "name": "giveRewardBatch",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "owner",
+        "outputs": [
+            {
+                "internalType": "address",
+                "name": "",
+                "type": "address"
+            }
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {
+                "internalType": "address",
+                "name": "",
+                "type": "address"
+            }
+        ],
+        "name": "rewards",
+        "outputs": [
+            {
+                "internalType": "uint256",
+                "name": "",
+                "type": "uint256"
+            }
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "withdrawReward",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "stateMutability": "payable",
+        "type": "receive"
+    }
+]
+
+
+# Read-only contract state, as of `block`
+@dataclass(slots=True)
+class ContractState:
+    owner: str
+    balance_wei: int
+    accounts: list
+    block: int
+
+    @property
+    def balance_eth(self):
+        from web3 import Web3
+        return Web3.from_wei(self.balance_wei, 'ether')
+
+
+# Topic hash of each named contract event, from the ABI: {name: topic}
+def event_topics(names=STATE_EVENTS):
+    from web3 import Web3
+
+    topics = {}
+    for entry in CONTRACT_ABI:
+        if entry['type'] == 'event' and entry['name'] in names:
+            signature = f"{entry['name']}({','.join(i['type'] for i in entry['inputs'])})"
+            topics[entry['name']] = Web3.to_hex(Web3.keccak(text=signature))
+    return topics
+
+
+# The reward contract on one web3 connection, shared by the Streamlit page
+# and the API service. Pass `web3` to use another provider (e.g. eth-tester).
+# The HTTP provider keeps its connections alive in one pooled session.
+#
+# owner, balance and node accounts are read through state(): served from
+# memory for STATE_TTL seconds, then kept as long as no block since has a
+# Funded/RewardGiven/RewardWithdrawn log from the contract (one eth_getLogs
+# instead of four reads). invalidate() drops it after our own transactions.
+#
+# web3 is imported on first use rather than with this module: it is the
+# slowest import in the app and only the reward paths need it.
+class RewardContract:
+    def __init__(self, url=GANACHE_URL, address=CONTRACT_ADDRESS, web3=None, state_ttl=STATE_TTL):
+        if web3 is None:
+            from web3 import Web3
+
+            session = requests.Session()
+            session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=8))
+            session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=8))
+            web3 = Web3(Web3.HTTPProvider(url, session=session))
+        self.web3 = web3
+        self.contract = self.web3.eth.contract(address=address, abi=CONTRACT_ABI)
+        self.state_ttl = state_ttl
+        self._topics = list(event_topics().values())
+        self._state = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def state(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._state is not None and now - self._checked < self.state_ttl:
+                return self._state
+            if self._state is not None:
+                latest = self.web3.eth.block_number
+                if latest == self._state.block or not self._has_events(self._state.block + 1, latest):
+                    self._state.block = latest
+                    self._checked = now
+                    return self._state
+
+            block = self.web3.eth.block_number
+            self._state = ContractState(
+                owner=self.contract.functions.owner().call(),
+                balance_wei=self.contract.functions.getBalance().call(),
+                accounts=list(self.web3.eth.accounts),
+                block=block,
+            )
+            self._checked = now
+            return self._state
+
+    def _has_events(self, from_block, to_block):
+        logs = self.web3.eth.get_logs({
+            'address': self.contract.address,
+            'fromBlock': from_block,
+            'toBlock': to_block,
+            'topics': [self._topics],
+        })
+        return bool(logs)
+
+    def invalidate(self):
+        with self._lock:
+            self._state = None
+
+    # Reachable node; no round-trip while the cached state is fresh
+    def is_connected(self):
+        if self._state is not None and time.monotonic() - self._checked < self.state_ttl:
+            return True
+        return self.web3.is_connected()
+
+    def owner(self):
+        return self.state().owner
+
+    def balance_eth(self):
+        return self.state().balance_eth
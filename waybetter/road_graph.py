@@ -0,0 +1,535 @@
+import argparse
+import heapq
+import json
+import math
+import os
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import numpy as np
+
+from waybetter.routing import PREFERENCES
+from waybetter.spatial_index import StationIndex, _to_xyz, haversine_km
+
+ROAD_GRAPH_DIR = os.environ.get("ROAD_GRAPH_DIR", "road_graph")
+META = "graph.json"
+# Default speeds (km/h) for drivable OSM highway classes, used where a way has no maxspeed
+HIGHWAY_SPEEDS = {
+    'motorway': 80, 'motorway_link': 40,
+    'trunk': 60, 'trunk_link': 35,
+    'primary': 45, 'primary_link': 30,
+    'secondary': 35, 'secondary_link': 25,
+    'tertiary': 30, 'tertiary_link': 20,
+    'unclassified': 25, 'residential': 20, 'living_street': 10, 'service': 15,
+}
+ONEWAY_CLASSES = ('motorway', 'motorway_link')
+# Eco cost: travel seconds scaled by 1 + AQI_WEIGHT * AQI / 100 + CONGESTION_WEIGHT * congestion / 100
+AQI_WEIGHT = 1.0
+CONGESTION_WEIGHT = 0.5
+LOCAL_PREFERENCES = PREFERENCES + ('eco',)
+# Landmarks for the A* lower bounds, which are worked out for this many
+# consecutive node ids at a time
+LANDMARKS = 8
+BOUND_BLOCK = 256
+# Alternatives: paths wanted, limits on cost relative to the best path and
+# on length shared with a better path, and via paths examined at most
+ALTERNATIVES = 4
+ALT_MAX_STRETCH = 1.4
+ALT_MAX_OVERLAP = 0.8
+ALT_MAX_CANDIDATES = 200
+
+
+# Landmark lower bounds towards one target, indexed by node id. A node's
+# bound is filled in on first lookup together with the rest of its block of
+# BOUND_BLOCK ids (node ids follow the extract, so neighbours mostly share
+# a block); a query only pays for the parts of the graph it reaches.
+class _LandmarkBounds(dict):
+    def __init__(self, from_l, to_l, target, factor):
+        super().__init__()
+        self.from_l, self.to_l = from_l, to_l
+        self.from_t, self.to_t = from_l[:, [target]], to_l[:, [target]]
+        self.factor = factor
+
+    def __missing__(self, v):
+        lo = v - v % BOUND_BLOCK
+        hi = min(lo + BOUND_BLOCK, self.from_l.shape[1])
+        values = np.maximum((self.from_t - self.from_l[:, lo:hi]).max(axis=0),
+                            (self.to_l[:, lo:hi] - self.to_t).max(axis=0))
+        self.update(zip(range(lo, hi), (np.maximum(values, 0.0) * self.factor).tolist()))
+        return self[v]
+
+
+# Drivable road network as CSR arrays: the out-edges of node u are
+# indptr[u]:indptr[u + 1] in targets/length_m/travel_s. Each edge also
+# carries the station its midpoint is matched to (-1 if none), so per-edge
+# AQI and congestion for a departure time are one fancy index away.
+class RoadGraph:
+    def __init__(self, lats, lons, indptr, targets, length_m, travel_s, edge_station, stations, landmarks=None):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.targets = np.asarray(targets, dtype=np.int64)
+        self.length_m = np.asarray(length_m, dtype=np.float64)
+        self.travel_s = np.asarray(travel_s, dtype=np.float64)
+        self.edge_station = np.asarray(edge_station, dtype=np.int64)
+        self.stations = list(stations)
+        self._tree = None
+        self.landmarks = landmarks
+        self._lists = None
+        self._cost_lists = {}
+        self._reverse = None
+        self._edge_keys = None
+
+    @property
+    def n_nodes(self):
+        return len(self.lats)
+
+    @property
+    def n_edges(self):
+        return len(self.targets)
+
+    # From an edge list; keeps the largest strongly connected component so
+    # every snapped origin can reach every snapped destination
+    @classmethod
+    def from_edges(cls, lats, lons, sources, targets, length_m, travel_s, places, threshold_km=1.0):
+        from scipy.sparse import csr_matrix
+        from scipy.sparse.csgraph import connected_components
+
+        lats, lons = np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64)
+        sources, targets = np.asarray(sources, dtype=np.int64), np.asarray(targets, dtype=np.int64)
+        length_m, travel_s = np.asarray(length_m, dtype=np.float64), np.asarray(travel_s, dtype=np.float64)
+
+        n = len(lats)
+        adjacency = csr_matrix((np.ones(len(sources)), (sources, targets)), shape=(n, n))
+        _, labels = connected_components(adjacency, directed=True, connection='strong')
+        keep_nodes = labels == np.bincount(labels).argmax()
+        new_id = np.cumsum(keep_nodes) - 1
+        keep = keep_nodes[sources] & keep_nodes[targets]
+        sources, targets = new_id[sources[keep]], new_id[targets[keep]]
+        length_m, travel_s = length_m[keep], travel_s[keep]
+        lats, lons = lats[keep_nodes], lons[keep_nodes]
+
+        order = np.lexsort((targets, sources))
+        sources, targets, length_m, travel_s = sources[order], targets[order], length_m[order], travel_s[order]
+        indptr = np.concatenate(([0], np.cumsum(np.bincount(sources, minlength=len(lats)))))
+
+        station_index = StationIndex(places)
+        mid_lats = (lats[sources] + lats[targets]) / 2
+        mid_lons = (lons[sources] + lons[targets]) / 2
+        edge_station, _ = station_index.query(mid_lats, mid_lons, threshold_km)
+        graph = cls(lats, lons, indptr, targets, length_m, travel_s, edge_station, station_index.names)
+        graph.landmarks = graph._compute_landmarks()
+        return graph
+
+    def save(self, directory=ROAD_GRAPH_DIR):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        meta = {'file': f"graph-{time.time_ns()}.npz", 'stations': self.stations}
+        np.savez(directory / meta['file'], lats=self.lats, lons=self.lons, indptr=self.indptr, targets=self.targets,
+                 length_m=self.length_m.astype(np.float32), travel_s=self.travel_s.astype(np.float32),
+                 edge_station=self.edge_station.astype(np.int32),
+                 **{f"{name}_{way}": table for name, tables in (self.landmarks or {}).items()
+                    for way, table in zip(('from', 'to'), tables)})
+        tmp = directory / (META + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, directory / META)
+        for old in directory.glob('graph-*.npz'):
+            if old.name != meta['file']:
+                old.unlink(missing_ok=True)
+
+    @classmethod
+    def open(cls, directory=ROAD_GRAPH_DIR):
+        directory = Path(directory)
+        if not (directory / META).exists():
+            return None
+        meta = json.loads((directory / META).read_text())
+        with np.load(directory / meta['file']) as arrays:
+            landmarks = {name: (arrays[f"{name}_from"], arrays[f"{name}_to"]) for name in ('travel_s', 'length_m')
+                         if f"{name}_from" in arrays}
+            return cls(arrays['lats'], arrays['lons'], arrays['indptr'], arrays['targets'], arrays['length_m'],
+                       arrays['travel_s'], arrays['edge_station'], meta['stations'], landmarks or None)
+
+    # Closest graph node to each (lat, lon)
+    def nearest_nodes(self, lats, lons):
+        if self._tree is None:
+            from scipy.spatial import cKDTree
+            self._tree = cKDTree(_to_xyz(self.lats, self.lons))
+        _, ids = self._tree.query(_to_xyz(lats, lons).reshape(-1, 3))
+        return ids
+
+    # Travel-time multiplier per station for the eco cost,
+    # 1 + AQI_WEIGHT * AQI / 100 + CONGESTION_WEIGHT * congestion / 100, from
+    # values aligned with self.stations (NaN where unknown). One extra
+    # trailing entry, from the station means, covers edges away from every
+    # station, so factors[edge_station] is the per-edge multiplier.
+    def eco_factors(self, station_aqi, station_congestion, aqi_weight=AQI_WEIGHT, congestion_weight=CONGESTION_WEIGHT):
+        aqi = np.asarray(station_aqi, dtype=np.float64)
+        congestion = np.asarray(station_congestion, dtype=np.float64)
+        aqi = np.append(aqi, np.nanmean(aqi))
+        congestion = np.append(congestion, np.nanmean(congestion))
+        aqi = np.where(np.isfinite(aqi), aqi, aqi[-1])
+        congestion = np.where(np.isfinite(congestion), congestion, congestion[-1])
+        return 1 + aqi_weight * aqi / 100 + congestion_weight * congestion / 100
+
+    def eco_costs(self, factors):
+        return self.travel_s * np.asarray(factors)[self.edge_station]
+
+    # Shortest-path distances between LANDMARKS far-apart nodes and every
+    # node, under travel time and under length: {'travel_s' | 'length_m':
+    # (from landmark (L, n), to landmark (L, n))}. Computed with scipy's
+    # Dijkstra when the graph is built and stored with it.
+    def _compute_landmarks(self, count=LANDMARKS):
+        from scipy.sparse import csr_matrix
+        from scipy.sparse.csgraph import dijkstra
+
+        shape = (self.n_nodes, self.n_nodes)
+        travel = csr_matrix((self.travel_s, self.targets, self.indptr), shape=shape)
+        # Farthest-point selection: each landmark is the node farthest (in
+        # travel time) from the ones already picked
+        landmarks = [0]
+        nearest = dijkstra(travel, indices=0)
+        while len(landmarks) < min(count, self.n_nodes):
+            landmarks.append(int(np.argmax(np.where(np.isfinite(nearest), nearest, -1))))
+            nearest = np.minimum(nearest, dijkstra(travel, indices=landmarks[-1]))
+
+        tables = {}
+        for name, weights in (('travel_s', self.travel_s), ('length_m', self.length_m)):
+            matrix = csr_matrix((weights, self.targets, self.indptr), shape=shape)
+            tables[name] = (dijkstra(matrix, indices=landmarks), dijkstra(matrix.T.tocsr(), indices=landmarks))
+        return tables
+
+    # Lower bounds on the cost from each node to `target` under `costs` (one
+    # of the graph's own arrays, or any per-edge array) scaled by `scale`,
+    # indexed by node id. Any edge costs at least min(costs / travel_s)
+    # times its travel time, and likewise for length, so the landmark (ALT)
+    # bound of whichever table is tighter at `source`, scaled by that ratio,
+    # never overestimates. Filled in lazily as the search reaches each
+    # part of the graph (see _LandmarkBounds).
+    def lower_bound(self, source, target, costs, scale=1.0):
+        if self.landmarks is None:
+            self.landmarks = self._compute_landmarks()
+        candidates = []
+        for name, base in (('travel_s', self.travel_s), ('length_m', self.length_m)):
+            if costs is base:
+                candidates = [(name, 1.0)]
+                break
+            positive = base > 0
+            candidates.append((name, float(np.min(costs[positive] / base[positive])) if positive.any() else 0.0))
+
+        def bound(name, nodes):
+            from_l, to_l = self.landmarks[name]
+            return np.maximum((from_l[:, [target]] - from_l[:, nodes]).max(axis=0),
+                              (to_l[:, nodes] - to_l[:, [target]]).max(axis=0))
+
+        name, ratio = max(candidates, key=lambda c: c[1] * bound(c[0], [source])[0])
+        # Shrunk a little to tolerate rounding in the stored distances
+        return _LandmarkBounds(*self.landmarks[name], target, ratio * scale * (1 - 1e-6))
+
+    # Least-cost path from source to target as the list of edge ids taken
+    # (None if unreachable). Edge e costs costs[e], times
+    # factors[edge_station[e]] when per-station factors are given (see
+    # eco_factors), so time-dependent penalties never need a fresh per-edge
+    # array. A* over the CSR arrays with the landmark lower bounds as heuristic.
+    def shortest_path(self, source, target, costs, factors=None):
+        if self._lists is None:
+            self._lists = (self.indptr.tolist(), self.targets.tolist(), self.edge_station.tolist())
+        indptr, targets, edge_station = self._lists
+        cost = self._cost_lists.get(id(costs))
+        if cost is None or cost[0] is not costs:
+            cost = (costs, costs.tolist())
+            # The graph's own arrays are reused for every query; keep their lists
+            if costs is self.travel_s or costs is self.length_m:
+                self._cost_lists[id(costs)] = cost
+        cost = cost[1]
+        if factors is None:
+            h = self.lower_bound(source, target, costs)
+        else:
+            factors = np.asarray(factors, dtype=np.float64)
+            h = self.lower_bound(source, target, costs, float(factors.min()))
+            factors = factors.tolist()
+
+        best = {source: 0.0}
+        # Node -> (previous node, edge id) on the best path found so far
+        parent = {source: (-1, -1)}
+        heap = [(h[source], 0.0, source)]
+        while heap:
+            _, g, u = heapq.heappop(heap)
+            if u == target:
+                edges = []
+                while parent[u][0] >= 0:
+                    u, e = parent[u]
+                    edges.append(e)
+                return edges[::-1]
+            if g > best[u]:
+                continue
+            for e in range(indptr[u], indptr[u + 1]):
+                v = targets[e]
+                g_v = g + (cost[e] if factors is None else cost[e] * factors[edge_station[e]])
+                if g_v < best.get(v, math.inf):
+                    best[v] = g_v
+                    parent[v] = (u, e)
+                    heapq.heappush(heap, (g_v + h[v], g_v, v))
+        return None
+
+    # Up to k diverse paths from source to target as edge id lists, best
+    # first, by via-node alternatives: one shortest-path tree out of source
+    # and one into target (scipy's Dijkstra) give, for every node v, the
+    # best path through v, and all candidates share those two trees. Paths
+    # costing more than max_stretch times the best are pruned up front;
+    # candidates are then taken cheapest first if they share at most
+    # max_overlap of their length with every path kept before them. Nodes
+    # on a path already looked at are skipped as via nodes, since they mostly
+    # lead back to the same path.
+    def alternatives(self, source, target, costs, factors=None, k=ALTERNATIVES, max_stretch=ALT_MAX_STRETCH,
+                     max_overlap=ALT_MAX_OVERLAP, max_candidates=ALT_MAX_CANDIDATES):
+        from scipy.sparse import csr_matrix
+        from scipy.sparse.csgraph import dijkstra
+
+        edge_costs = np.asarray(costs, dtype=np.float64)
+        if factors is not None:
+            edge_costs = edge_costs * np.asarray(factors, dtype=np.float64)[self.edge_station]
+        if self._reverse is None:
+            sources = np.repeat(np.arange(self.n_nodes), np.diff(self.indptr))
+            order = np.argsort(self.targets, kind='stable')
+            self._reverse = (order, sources[order], np.concatenate(([0], np.cumsum(np.bincount(self.targets, minlength=self.n_nodes)))))
+        order, reverse_targets, reverse_indptr = self._reverse
+        shape = (self.n_nodes, self.n_nodes)
+
+        forward = csr_matrix((edge_costs, self.targets, self.indptr), shape=shape)
+        from_source, towards_source = dijkstra(forward, indices=source, return_predecessors=True)
+        best = from_source[target]
+        if not np.isfinite(best):
+            return []
+        backward = csr_matrix((edge_costs[order], reverse_targets, reverse_indptr), shape=shape)
+        to_target, towards_target = dijkstra(backward, indices=target, return_predecessors=True,
+                                             limit=max_stretch * best)
+
+        total = from_source + to_target
+        candidates = np.flatnonzero(total <= max_stretch * best)
+        candidates = candidates[np.argsort(total[candidates], kind='stable')]
+
+        kept = []
+        looked_at = np.zeros(self.n_nodes, dtype=bool)
+        for via in candidates[:max_candidates * 50]:
+            if len(kept) >= k or max_candidates <= 0:
+                break
+            if looked_at[via]:
+                continue
+            max_candidates -= 1
+            head = [via]
+            while head[-1] != source:
+                head.append(towards_source[head[-1]])
+            nodes = head[::-1]
+            while nodes[-1] != target:
+                nodes.append(towards_target[nodes[-1]])
+            nodes = np.array(nodes, dtype=np.int64)
+            looked_at[nodes] = True
+            # Via paths whose two halves cross form a loop
+            if len(np.unique(nodes)) != len(nodes):
+                continue
+
+            edges = self._path_edges(nodes, edge_costs)
+            length = self.length_m[edges]
+            if all(length[np.isin(edges, other)].sum() <= max_overlap * length.sum() for other in kept):
+                kept.append(edges)
+        return [edges.tolist() for edges in kept]
+
+    # Cheapest edge for each consecutive pair of nodes on a path. Edges are
+    # sorted by (source, target), so u * n + v is a sorted key over them.
+    def _path_edges(self, nodes, edge_costs):
+        if self._edge_keys is None:
+            sources = np.repeat(np.arange(self.n_nodes), np.diff(self.indptr))
+            self._edge_keys = sources * self.n_nodes + self.targets
+        keys = nodes[:-1] * self.n_nodes + nodes[1:]
+        edges = np.searchsorted(self._edge_keys, keys)
+        # Parallel edges: take the cheapest
+        for i in np.flatnonzero(np.searchsorted(self._edge_keys, keys, side='right') - edges > 1):
+            out = np.arange(edges[i], np.searchsorted(self._edge_keys, keys[i], side='right'))
+            edges[i] = out[np.argmin(edge_costs[out])]
+        return edges
+
+    # ORS-shaped GeoJSON for the path from `source` along `edges`, so
+    # matching and scoring treat local routes exactly like fetched ones
+    def route_geojson(self, source, edges, preference):
+        edges = np.asarray(edges, dtype=np.int64)
+        path = np.concatenate(([source], self.targets[edges]))
+        lats, lons = self.lats[path], self.lons[path]
+        distance = float(self.length_m[edges].sum())
+        duration = float(self.travel_s[edges].sum())
+        bbox = [float(lons.min()), float(lats.min()), float(lons.max()), float(lats.max())]
+        return {
+            'type': 'FeatureCollection',
+            'bbox': bbox,
+            'features': [{
+                'type': 'Feature',
+                'bbox': bbox,
+                'properties': {
+                    'summary': {'distance': round(distance, 1), 'duration': round(duration, 1)},
+                    'way_points': [0, len(path) - 1],
+                },
+                'geometry': {'type': 'LineString', 'coordinates': np.column_stack((lons, lats)).round(6).tolist()},
+            }],
+            'metadata': {'query': {'preference': preference}, 'engine': {'version': 'local'}},
+        }
+
+
+# Same interface as RoutingProvider.fetch_routes, answered in-process from a
+# RoadGraph: 'fastest' and 'recommended' minimise travel time, 'shortest'
+# length, and 'eco' travel time with AQI/congestion penalties when station
+# values (aligned with graph.stations) are passed, travel time otherwise.
+class LocalRoutingProvider:
+    def __init__(self, graph):
+        self.graph = graph
+
+    def fetch_routes(self, origin, destination, preferences=PREFERENCES, profile='driving-car',
+                     station_aqi=None, station_congestion=None):
+        graph = self.graph
+        source, target = (int(node) for node in graph.nearest_nodes([origin[0], destination[0]],
+                                                                    [origin[1], destination[1]]))
+        searches = {
+            'fastest': (graph.travel_s, None),
+            'recommended': (graph.travel_s, None),
+            'shortest': (graph.length_m, None),
+            'eco': (graph.travel_s, None),
+        }
+        if station_aqi is not None and station_congestion is not None:
+            searches['eco'] = (graph.travel_s, graph.eco_factors(station_aqi, station_congestion))
+
+        routes, errors, paths = [], [], {}
+        for pref in preferences:
+            if pref not in searches:
+                errors.append((pref, ValueError(f"unknown preference {pref!r}")))
+                continue
+            edges = graph.shortest_path(source, target, *searches[pref])
+            if edges is None:
+                errors.append((pref, ValueError("no path in the road graph")))
+                continue
+            # Preferences that land on the same path are kept once
+            if tuple(edges) in paths:
+                continue
+            paths[tuple(edges)] = pref
+            routes.append((graph.route_geojson(source, edges, pref), pref))
+        return routes, errors
+
+    # Up to `count` diverse routes under the eco cost (travel time without
+    # station values), labelled 'alternative 1'..; same return shape as
+    # fetch_routes
+    def fetch_alternatives(self, origin, destination, count=ALTERNATIVES, profile='driving-car',
+                           station_aqi=None, station_congestion=None):
+        graph = self.graph
+        source, target = (int(node) for node in graph.nearest_nodes([origin[0], destination[0]],
+                                                                    [origin[1], destination[1]]))
+        factors = None
+        if station_aqi is not None and station_congestion is not None:
+            factors = graph.eco_factors(station_aqi, station_congestion)
+        paths = graph.alternatives(source, target, graph.travel_s, factors, k=count)
+        if not paths:
+            return [], [('alternatives', ValueError("no path in the road graph"))]
+        return [(graph.route_geojson(source, edges, f'alternative {i}'), f'alternative {i}')
+                for i, edges in enumerate(paths, 1)], []
+
+
+# Directed edge list from an OSM XML extract (e.g. an Overpass or osmconvert
+# export of Greater Mumbai): (node lats, node lons, sources, targets,
+# length_m, travel_s). Only drivable highway classes are kept.
+def read_osm(path):
+    node_coords = {}
+    ways = []
+    events = ET.iterparse(path, events=('start', 'end'))
+    _, root = next(events)
+    for event, element in events:
+        if event != 'end':
+            continue
+        if element.tag == 'node':
+            node_coords[int(element.get('id'))] = (float(element.get('lat')), float(element.get('lon')))
+        elif element.tag == 'way':
+            tags = {tag.get('k'): tag.get('v') for tag in element.iter('tag')}
+            highway = tags.get('highway')
+            if highway in HIGHWAY_SPEEDS and tags.get('access') not in ('no', 'private'):
+                refs = [int(nd.get('ref')) for nd in element.iter('nd')]
+                ways.append((refs, highway, tags))
+        # Top-level elements hang off the root until it is cleared as well
+        if element.tag in ('node', 'way', 'relation'):
+            element.clear()
+            root.clear()
+
+    ids = {}
+    lats, lons, sources, targets, speeds = [], [], [], [], []
+    for refs, highway, tags in ways:
+        refs = [ref for ref in refs if ref in node_coords]
+        for ref in refs:
+            if ref not in ids:
+                ids[ref] = len(lats)
+                lats.append(node_coords[ref][0])
+                lons.append(node_coords[ref][1])
+        speed = _maxspeed(tags.get('maxspeed')) or HIGHWAY_SPEEDS[highway]
+        oneway = tags.get('oneway', 'yes' if highway in ONEWAY_CLASSES or tags.get('junction') == 'roundabout' else 'no')
+        pairs = list(zip(refs[:-1], refs[1:]))
+        if oneway == '-1':
+            pairs = [(b, a) for a, b in pairs]
+        elif oneway not in ('yes', 'true', '1'):
+            pairs += [(b, a) for a, b in pairs]
+        for a, b in pairs:
+            sources.append(ids[a])
+            targets.append(ids[b])
+            speeds.append(speed)
+
+    lats, lons = np.array(lats), np.array(lons)
+    sources, targets = np.array(sources, dtype=np.int64), np.array(targets, dtype=np.int64)
+    length_m = haversine_km(lats[sources], lons[sources], lats[targets], lons[targets]) * 1000
+    travel_s = length_m / (np.array(speeds, dtype=np.float64) / 3.6)
+    return lats, lons, sources, targets, length_m, travel_s
+
+
+def _maxspeed(value):
+    if not value:
+        return None
+    number = value.split()[0]
+    try:
+        speed = float(number)
+    except ValueError:
+        return None
+    return speed * 1.609 if 'mph' in value else speed
+
+
+def main():
+    from waybetter.places import places
+
+    parser = argparse.ArgumentParser(prog='python -m waybetter.road_graph', description='local road graph')
+    parser.add_argument('--dir', default=ROAD_GRAPH_DIR)
+    sub = parser.add_subparsers(dest='command', required=True)
+    build_parser = sub.add_parser('build', help='compile an OSM XML extract into CSR arrays')
+    build_parser.add_argument('osm', help='.osm XML file')
+    build_parser.add_argument('--threshold-km', type=float, default=1.0)
+    route_parser = sub.add_parser('route', help='time local routes between two stations')
+    route_parser.add_argument('source')
+    route_parser.add_argument('destination')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        t0 = time.perf_counter()
+        graph = RoadGraph.from_edges(*read_osm(args.osm), places, args.threshold_km)
+        graph.save(args.dir)
+        print(f"{graph.n_nodes:,} nodes, {graph.n_edges:,} edges, "
+              f"{(graph.edge_station >= 0).mean():.1%} near a station, in {time.perf_counter() - t0:.1f}s -> {args.dir}")
+        return
+
+    graph = RoadGraph.open(args.dir)
+    if graph is None:
+        raise SystemExit(f"no road graph in {args.dir}; run the build command first")
+    provider = LocalRoutingProvider(graph)
+    for pref in LOCAL_PREFERENCES:
+        t0 = time.perf_counter()
+        routes, errors = provider.fetch_routes(places[args.source], places[args.destination], (pref,))
+        elapsed = (time.perf_counter() - t0) * 1000
+        for route, _ in routes:
+            summary = route['features'][0]['properties']['summary']
+            print(f"{pref:12s} {summary['distance'] / 1000:6.2f} km {summary['duration'] / 60:6.1f} min  {elapsed:7.1f} ms")
+        for _, e in errors:
+            print(f"{pref:12s} {e}")
+
+
+if __name__ == '__main__':
+    main()
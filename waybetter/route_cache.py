@@ -0,0 +1,179 @@
+import argparse
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+ROUTE_CACHE_PATH = os.environ.get("ROUTE_CACHE_PATH", "route_cache.sqlite3")
+DEFAULT_TTL = 14 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 5000
+# last_access is only rewritten when older than this, so hot keys don't turn
+# every read into a write
+TOUCH_INTERVAL = 60
+
+
+# Persistent route cache in SQLite, keyed by (origin, destination, preference, profile).
+# Geometry is stored as zlib-compressed GeoJSON. WAL mode lets several
+# Streamlit/worker processes share the file; entries expire after `ttl`
+# seconds and the least recently used are evicted beyond `max_entries`.
+class RouteCache:
+    def __init__(self, path=ROUTE_CACHE_PATH, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = str(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS routes (
+                key TEXT PRIMARY KEY,
+                payload BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS routes_last_access ON routes (last_access)")
+        conn.commit()
+
+    # One connection per thread; sqlite3 connections can't be shared across threads
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def key(origin, destination, preference, profile='driving-car'):
+        return "{:.6f},{:.6f}|{:.6f},{:.6f}|{}|{}".format(*origin, *destination, preference, profile)
+
+    def get(self, origin, destination, preference, profile='driving-car'):
+        key = self.key(origin, destination, preference, profile)
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT payload, created_at, last_access FROM routes WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        payload, created_at, last_access = row
+        now = time.time()
+        if self.ttl is not None and now - created_at > self.ttl:
+            conn.execute("DELETE FROM routes WHERE key = ?", (key,))
+            conn.commit()
+            return None
+        if now - last_access > TOUCH_INTERVAL:
+            conn.execute("UPDATE routes SET last_access = ? WHERE key = ?", (now, key))
+            conn.commit()
+        return json.loads(zlib.decompress(payload))
+
+    def put(self, origin, destination, preference, route, profile='driving-car'):
+        key = self.key(origin, destination, preference, profile)
+        payload = zlib.compress(json.dumps(route, separators=(',', ':')).encode(), 6)
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO routes (key, payload, created_at, last_access) VALUES (?, ?, ?, ?)",
+            (key, payload, now, now)
+        )
+        self._evict(conn)
+        conn.commit()
+
+    def _evict(self, conn):
+        if self.max_entries is None:
+            return
+        conn.execute("""
+            DELETE FROM routes WHERE key IN (
+                SELECT key FROM routes ORDER BY last_access DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,))
+
+    # (key, route) for every live entry, without touching last_access
+    def iter_routes(self):
+        cutoff = time.time() - self.ttl if self.ttl is not None else float('-inf')
+        rows = self._conn().execute(
+            "SELECT key, payload FROM routes WHERE created_at >= ?", (cutoff,)
+        ).fetchall()
+        for key, payload in rows:
+            yield key, json.loads(zlib.decompress(payload))
+
+    def purge_expired(self):
+        if self.ttl is None:
+            return 0
+        conn = self._conn()
+        cur = conn.execute("DELETE FROM routes WHERE created_at < ?", (time.time() - self.ttl,))
+        conn.commit()
+        return cur.rowcount
+
+    def stats(self):
+        count, size = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) FROM routes"
+        ).fetchone()
+        return {'entries': count, 'payload_bytes': size}
+
+    def __len__(self):
+        return self.stats()['entries']
+
+
+# Fill the cache for every ordered pair of known places
+def warm(provider, cache, places, preferences, profile='driving-car', delay=0.0):
+    fetched = 0
+    failed = 0
+    for source, destination in itertools.permutations(places, 2):
+        origin, target = places[source], places[destination]
+        missing = [p for p in preferences if cache.get(origin, target, p, profile) is None]
+        if not missing:
+            continue
+
+        routes, errors = provider.fetch_routes(origin, target, missing, profile)
+        fetched += len(routes)
+        failed += len(errors)
+        for pref, e in errors:
+            print(f"{source} -> {destination} ({pref}): {e}")
+        if delay:
+            time.sleep(delay)
+    return fetched, failed
+
+
+def main():
+    from waybetter.places import places
+    from waybetter.routing import ORS_API_KEY, PREFERENCES, RoutingProvider
+
+    parser = argparse.ArgumentParser(prog='python -m waybetter.route_cache')
+    parser.add_argument('--path', default=ROUTE_CACHE_PATH)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    warm_parser = sub.add_parser('warm', help='fetch every origin/destination/preference into the cache')
+    warm_parser.add_argument('--api-key', default=ORS_API_KEY)
+    warm_parser.add_argument('--profile', default='driving-car')
+    warm_parser.add_argument('--preferences', nargs='+', default=list(PREFERENCES))
+    warm_parser.add_argument('--delay', type=float, default=4.5,
+                             help='seconds between pairs, to stay under the ORS rate limit')
+    sub.add_parser('stats', help='print entry count and payload size')
+    sub.add_parser('purge', help='drop expired routes and route matches')
+    args = parser.parse_args()
+
+    cache = RouteCache(args.path)
+    if args.command == 'warm':
+        provider = RoutingProvider(api_key=args.api_key, cache=cache)
+        fetched, failed = warm(provider, cache, places, args.preferences, args.profile, args.delay)
+        print(f"fetched {fetched} routes, {failed} failed")
+
+        from waybetter.route_matches import RouteMatchStore
+        from waybetter.spatial_index import StationIndex
+        computed = RouteMatchStore(args.path).precompute(cache, StationIndex(places))
+        print(f"precomputed {computed} route matches")
+    elif args.command == 'purge':
+        from waybetter.route_matches import RouteMatchStore
+        print(f"purged {cache.purge_expired()} expired routes, "
+              f"{RouteMatchStore(args.path).purge_expired()} expired route matches")
+    print(cache.stats())
+
+
+if __name__ == '__main__':
+    main()
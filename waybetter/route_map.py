@@ -0,0 +1,104 @@
+import numpy as np
+
+from waybetter.route_matches import route_coordinates
+
+MUMBAI_CENTER = (19.0760, 72.8777)
+# Geometry is simplified for this zoom level: finer detail than one screen
+# pixel there is dropped, which is street level for Leaflet
+DETAIL_ZOOM = 15
+# Web Mercator metres per pixel at the equator, zoom 0
+EQUATOR_M_PER_PIXEL = 156543.03
+# Decimal places kept in rendered coordinates (~1 m)
+COORD_DECIMALS = 5
+ROUTE_COLORS = ['blue', 'purple', 'orange', 'red', 'cadetblue', 'darkred']
+
+
+# Tolerance in metres equal to `pixels` screen pixels at `zoom` and `lat`
+def tolerance_for_zoom(zoom=DETAIL_ZOOM, lat=MUMBAI_CENTER[0], pixels=1.0):
+    return pixels * EQUATOR_M_PER_PIXEL * np.cos(np.radians(lat)) / 2 ** zoom
+
+
+# Douglas-Peucker over an (n, 2) [lon, lat] array: indices of the vertices
+# to keep so no dropped vertex is further than tolerance_m from the
+# simplified line. Distances are measured on a local equirectangular
+# projection, which is exact enough at city scale. Runs breadth-first: each
+# round splits every open span at once with array ops, so the number of
+# Python-level steps is the recursion depth rather than the vertex count.
+def simplify_indices(coordinates, tolerance_m):
+    coords = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+    n = len(coords)
+    if n <= 2:
+        return np.arange(n)
+    lat0 = np.radians(coords[:, 1].mean())
+    xy = np.column_stack((coords[:, 0] * np.cos(lat0), coords[:, 1])) * 111320.0
+
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, n - 1]] = True
+    # Interior vertices of spans not yet within tolerance
+    pending = ~keep
+    while pending.any():
+        idx = np.flatnonzero(pending)
+        anchors = np.flatnonzero(keep)
+        span = np.searchsorted(anchors, idx) - 1
+        start, end = xy[anchors[span]], xy[anchors[span + 1]]
+        dx, dy = (end - start).T
+        px, py = (xy[idx] - start).T
+        length = np.hypot(dx, dy)
+        dist = np.where(length > 0, np.abs(dx * py - dy * px) / np.where(length > 0, length, 1.0), np.hypot(px, py))
+
+        # Farthest vertex of each span (idx is sorted, so spans are contiguous runs)
+        firsts = np.flatnonzero(np.r_[True, span[1:] != span[:-1]])
+        runs = np.diff(np.r_[firsts, len(idx)])
+        span_max = np.maximum.reduceat(dist, firsts)
+        group = np.repeat(np.arange(len(firsts)), runs)
+        hits = np.flatnonzero(dist == span_max[group])
+        farthest = hits[np.r_[True, group[hits][1:] != group[hits][:-1]]]
+
+        split = span_max > tolerance_m
+        keep[idx[farthest[split]]] = True
+        pending[idx[np.repeat(~split, runs)]] = False
+        pending[keep] = False
+    return np.flatnonzero(keep)
+
+
+def simplify(coordinates, tolerance_m):
+    coords = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+    return coords[simplify_indices(coords, tolerance_m)]
+
+
+# Folium map of the ranked routes (best first, drawn green and bold) with
+# start/end markers and a layer control, as a standalone HTML document.
+# Route lines are simplified to `tolerance_m` and rounded to
+# COORD_DECIMALS, so long routes don't blow up the page payload.
+def render_route_map(scores, source, destination, origin, target, tolerance_m=None):
+    import folium
+
+    tolerance_m = tolerance_for_zoom() if tolerance_m is None else tolerance_m
+    route_map = folium.Map(location=list(MUMBAI_CENTER), zoom_start=11, tiles="OpenStreetMap")
+
+    for idx, scored in enumerate(scores):
+        line = simplify(route_coordinates(scored.route), tolerance_m).round(COORD_DECIMALS)
+        geometry = {'type': 'LineString', 'coordinates': line.tolist()}
+        pref = scored.preference.capitalize()
+        if idx == 0:
+            name, style = f'Eco-Friendly Route ({pref})', {'color': 'green', 'weight': 5, 'opacity': 0.8}
+        else:
+            name = f'{pref} Route'
+            style = {'color': ROUTE_COLORS[(idx - 1) % len(ROUTE_COLORS)], 'weight': 3, 'opacity': 0.6}
+        folium.GeoJson(geometry, name=name, style_function=lambda _, style=style: style).add_to(route_map)
+
+    folium.Marker(
+        origin,
+        popup=f"Start: {source}",
+        tooltip=f"Start: {source}",
+        icon=folium.Icon(color="green", icon="play", prefix="fa")
+    ).add_to(route_map)
+    folium.Marker(
+        target,
+        popup=f"End: {destination}",
+        tooltip=f"End: {destination}",
+        icon=folium.Icon(color="red", icon="flag-checkered", prefix="fa")
+    ).add_to(route_map)
+    folium.LayerControl().add_to(route_map)
+
+    return folium.Figure().add_child(route_map).render()
@@ -0,0 +1,207 @@
+import argparse
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+from waybetter.route_cache import DEFAULT_MAX_ENTRIES, DEFAULT_TTL, ROUTE_CACHE_PATH, TOUCH_INTERVAL
+from waybetter.spatial_index import haversine_km
+
+# Matches kept decoded in memory per process
+MEMORY_ENTRIES = 2048
+
+
+# Stations a route passes, in order with consecutive repeats collapsed, and
+# the metres of route attributed to each entry. A segment between two
+# vertices belongs to the station matched at its first vertex; segments
+# starting away from every station aren't attributed.
+@dataclass
+class RouteMatch:
+    stations: list
+    lengths_m: np.ndarray
+
+    @property
+    def total_m(self):
+        return float(self.lengths_m.sum())
+
+
+def route_coordinates(route):
+    return np.asarray(route['features'][0]['geometry']['coordinates'], dtype=np.float64)[:, :2]
+
+
+# Digest of a route polyline; a refetched route with new geometry gets a new key
+def geometry_key(coordinates):
+    return hashlib.sha1(np.ascontiguousarray(coordinates, dtype=np.float64).tobytes()).hexdigest()
+
+
+def compute_match(coordinates, station_index, threshold_km=1.0):
+    coordinates = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+    ids, _ = station_index.query_lonlat(coordinates, threshold_km)
+
+    lons, lats = coordinates[:, 0], coordinates[:, 1]
+    segment_m = np.append(haversine_km(lats[:-1], lons[:-1], lats[1:], lons[1:]) * 1000, 0.0)
+
+    matched = ids >= 0
+    ids = ids[matched]
+    if len(ids) == 0:
+        return RouteMatch([], np.zeros(0))
+
+    run_start = np.concatenate(([True], ids[1:] != ids[:-1]))
+    run = np.cumsum(run_start) - 1
+    lengths = np.bincount(run, weights=segment_m[matched], minlength=run[-1] + 1)
+    return RouteMatch([station_index.names[i] for i in ids[run_start]], lengths)
+
+
+# Precomputed match table, stored next to the route cache.
+# Keyed by geometry digest and station-set signature plus threshold, so it
+# stays valid across route refreshes and station changes without explicit
+# invalidation. Rows are dropped like route cache entries: `ttl` seconds
+# after they were last used, and least recently used beyond `max_entries`
+# (a few per cached route, as every route is matched per station set).
+class RouteMatchStore:
+    def __init__(self, path=ROUTE_CACHE_PATH, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES * 3):
+        self.path = str(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._memory = OrderedDict()
+        self._memory_lock = threading.Lock()
+
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS route_matches (
+                geometry_key TEXT NOT NULL,
+                station_key TEXT NOT NULL,
+                stations TEXT NOT NULL,
+                lengths BLOB NOT NULL,
+                last_access REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (geometry_key, station_key)
+            )
+        """)
+        # Tables from before expiry have no last_access; their rows go at the next purge
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(route_matches)")}
+        if 'last_access' not in columns:
+            conn.execute("ALTER TABLE route_matches ADD COLUMN last_access REAL NOT NULL DEFAULT 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS route_matches_last_access ON route_matches (last_access)")
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _station_key(station_index, threshold_km):
+        return f"{station_index.signature}:{threshold_km:g}"
+
+    def get(self, geometry, station_key):
+        key = (geometry, station_key)
+        with self._memory_lock:
+            match = self._memory.get(key)
+            if match is not None:
+                self._memory.move_to_end(key)
+                return match
+
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT stations, lengths, last_access FROM route_matches WHERE geometry_key = ? AND station_key = ?", key
+        ).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if self.ttl is not None and now - row[2] > self.ttl:
+            return None
+        if now - row[2] > TOUCH_INTERVAL:
+            conn.execute("UPDATE route_matches SET last_access = ? WHERE geometry_key = ? AND station_key = ?",
+                         (now, *key))
+            conn.commit()
+        match = RouteMatch(json.loads(row[0]), np.frombuffer(row[1], dtype=np.float32).astype(np.float64))
+        self._remember(key, match)
+        return match
+
+    def _remember(self, key, match):
+        with self._memory_lock:
+            self._memory[key] = match
+            if len(self._memory) > MEMORY_ENTRIES:
+                self._memory.popitem(last=False)
+
+    def put(self, geometry, station_key, match):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO route_matches (geometry_key, station_key, stations, lengths, last_access) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (geometry, station_key, json.dumps(match.stations), match.lengths_m.astype(np.float32).tobytes(),
+             time.time())
+        )
+        self._evict(conn)
+        conn.commit()
+        self._remember((geometry, station_key), match)
+
+    def _evict(self, conn):
+        if self.max_entries is None:
+            return
+        conn.execute("""
+            DELETE FROM route_matches WHERE rowid IN (
+                SELECT rowid FROM route_matches ORDER BY last_access DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,))
+
+    def purge_expired(self):
+        if self.ttl is None:
+            return 0
+        conn = self._conn()
+        cur = conn.execute("DELETE FROM route_matches WHERE last_access < ?", (time.time() - self.ttl,))
+        conn.commit()
+        return cur.rowcount
+
+    # Precomputed match for a route, computed and stored on a miss
+    def match(self, route, station_index, threshold_km=1.0):
+        coordinates = route_coordinates(route)
+        geometry = geometry_key(coordinates)
+        station_key = self._station_key(station_index, threshold_km)
+
+        match = self.get(geometry, station_key)
+        if match is None:
+            match = compute_match(coordinates, station_index, threshold_km)
+            self.put(geometry, station_key, match)
+        return match
+
+    # Offline stage: fill the table for every route in the cache
+    def precompute(self, route_cache, station_index, threshold_km=1.0):
+        station_key = self._station_key(station_index, threshold_km)
+        computed = 0
+        for _, route in route_cache.iter_routes():
+            coordinates = route_coordinates(route)
+            geometry = geometry_key(coordinates)
+            if self.get(geometry, station_key) is None:
+                self.put(geometry, station_key, compute_match(coordinates, station_index, threshold_km))
+                computed += 1
+        return computed
+
+
+def main():
+    from waybetter.places import places
+    from waybetter.route_cache import RouteCache
+    from waybetter.spatial_index import StationIndex
+
+    parser = argparse.ArgumentParser(prog='python -m waybetter.route_matches',
+                                     description='precompute route -> station matches for all cached routes')
+    parser.add_argument('--path', default=ROUTE_CACHE_PATH)
+    parser.add_argument('--threshold-km', type=float, default=1.0)
+    args = parser.parse_args()
+
+    store = RouteMatchStore(args.path)
+    computed = store.precompute(RouteCache(args.path), StationIndex(places), args.threshold_km)
+    print(f"precomputed {computed} route matches")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from requests.adapters import HTTPAdapter
+
+# ORS_BASE_URL can point at a self-hosted ORS or the local stub (benchmarks/ors_stub.py)
+ORS_BASE_URL = os.environ.get("ORS_BASE_URL", "https://api.openrouteservice.org")
+ORS_API_KEY = os.environ.get("ORS_API_KEY", "5b3ce3597851110001cf6248531a9782480a43888f5aa818a94ccc4a")
+PREFERENCES = ("recommended", "fastest", "shortest")
+# Concurrent ORS requests per process; raise it for the API service, where
+# many plans are in flight at once
+ORS_MAX_WORKERS = int(os.environ.get("ORS_MAX_WORKERS", "4"))
+# ORS returns at most this many alternative routes per request
+ORS_MAX_ALTERNATIVES = 3
+
+
+# Routing provider around one long-lived OpenRouteService client.
+# The client keeps a requests.Session, so connections are pooled and reused
+# between calls; preference requests are fanned out on a small thread pool
+# so a plan costs one round-trip of latency instead of three. With a
+# RouteCache attached, only cache misses go over the network.
+class RoutingProvider:
+    def __init__(self, api_key, base_url=ORS_BASE_URL, timeout=10, retry_timeout=20, max_workers=ORS_MAX_WORKERS, cache=None):
+        import openrouteservice
+
+        self.client = openrouteservice.Client(
+            key=api_key,
+            base_url=base_url,
+            timeout=timeout,
+            retry_timeout=retry_timeout,
+        )
+        # Keep a pooled connection per worker thread (requests defaults to 10)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(max_workers, 10))
+        self.client._session.mount('http://', adapter)
+        self.client._session.mount('https://', adapter)
+        # Upper bound on how long fetch_routes waits for any one preference,
+        # covering ORS's own retries on 429/503
+        self.deadline = timeout + retry_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ors")
+        self.cache = cache
+
+    # One directions request; origin/destination are (lat, lon) like `places`
+    def directions(self, origin, destination, preference, profile='driving-car'):
+        return self.client.directions(
+            coordinates=[origin[::-1], destination[::-1]],
+            profile=profile,
+            format='geojson',
+            preference=preference
+        )
+
+    # Fetch all preferences concurrently.
+    # Returns (routes, errors): routes is a list of (route, preference) in the
+    # order of `preferences`, errors a list of (preference, exception) for the
+    # requests that failed or missed the deadline.
+    def fetch_routes(self, origin, destination, preferences=PREFERENCES, profile='driving-car'):
+        cached = {}
+        if self.cache is not None:
+            for pref in preferences:
+                route = self.cache.get(origin, destination, pref, profile)
+                if route is not None:
+                    cached[pref] = route
+
+        futures = {
+            pref: self._executor.submit(self.directions, origin, destination, pref, profile)
+            for pref in preferences if pref not in cached
+        }
+
+        routes = []
+        errors = []
+        for pref in preferences:
+            if pref in cached:
+                routes.append((cached[pref], pref))
+                continue
+            future = futures[pref]
+            try:
+                route = future.result(timeout=self.deadline)
+            except FutureTimeout:
+                future.cancel()
+                errors.append((pref, TimeoutError(f"no response within {self.deadline}s")))
+                continue
+            except Exception as e:
+                errors.append((pref, e))
+                continue
+            if self.cache is not None:
+                self.cache.put(origin, destination, pref, route, profile)
+            routes.append((route, pref))
+        return routes, errors
+
+    # Up to `count` (at most 3) ORS alternatives for the recommended route,
+    # labelled 'alternative 1'..; same return shape as fetch_routes. The
+    # whole response is cached as one entry.
+    def fetch_alternatives(self, origin, destination, count=3, profile='driving-car'):
+        count = min(count, ORS_MAX_ALTERNATIVES)
+        key = f"alternatives-{count}"
+        response = self.cache.get(origin, destination, key, profile) if self.cache is not None else None
+        if response is None:
+            future = self._executor.submit(
+                self.client.directions,
+                coordinates=[origin[::-1], destination[::-1]],
+                profile=profile,
+                format='geojson',
+                alternative_routes={'target_count': count, 'share_factor': 0.8, 'weight_factor': 1.4},
+            )
+            try:
+                response = future.result(timeout=self.deadline)
+            except FutureTimeout:
+                future.cancel()
+                return [], [('alternatives', TimeoutError(f"no response within {self.deadline}s"))]
+            except Exception as e:
+                return [], [('alternatives', e)]
+            if self.cache is not None:
+                self.cache.put(origin, destination, key, response, profile)
+
+        routes = []
+        for i, feature in enumerate(response['features'], 1):
+            route = {**response, 'bbox': feature.get('bbox', response.get('bbox')), 'features': [feature]}
+            routes.append((route, f'alternative {i}'))
+        return routes, []
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.client._session.close()
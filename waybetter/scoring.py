@@ -0,0 +1,232 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from waybetter.route_matches import route_coordinates
+from waybetter.spatial_index import haversine_km
+
+# How matched stations are weighted within a route:
+#   'station'  - every matched station counts once (the original average)
+#   'distance' - by metres of route attributed to the station, so a station
+#                passed for 15 km outweighs one clipped for 50 m
+#   'grid'     - AQI sampled from an interpolated field along the whole
+#                polyline, length-weighted; congestion as for 'distance'
+WEIGHTINGS = ('station', 'distance', 'grid')
+# RouteScore fields traded off against each other, all lower-is-better
+PARETO_OBJECTIVES = ('duration_min', 'distance_km', 'exposure', 'avg_congestion')
+
+
+# Scored candidate route, replacing the old positional 8-tuples
+@dataclass(slots=True)
+class RouteScore:
+    route: dict
+    preference: str
+    eco_score: float
+    matched_places: list
+    distance_km: float
+    duration_min: float
+    avg_aqi: float
+    avg_congestion: float
+    # PM2.5 dose along the matched part of the route, AQI x hours spent near
+    # each station (time split by distance)
+    exposure: float = 0.0
+
+
+# All candidate routes flattened into parallel arrays, one row per
+# (route, matched station) entry: route_ids[i] passes stations[station_ids[i]]
+# with weight weights[i] over lengths_m[i] metres of the route.
+@dataclass(slots=True)
+class RouteTable:
+    route_ids: np.ndarray
+    station_ids: np.ndarray
+    weights: np.ndarray
+    lengths_m: np.ndarray
+    stations: list
+    n_routes: int
+
+    @classmethod
+    def from_matches(cls, matches, weighting='station'):
+        if weighting not in WEIGHTINGS:
+            raise ValueError(f"unknown weighting {weighting!r}, expected one of {WEIGHTINGS}")
+
+        names = [name for match in matches for name in match.stations]
+        stations, station_ids = np.unique(np.array(names, dtype=object), return_inverse=True)
+        route_ids = np.repeat(np.arange(len(matches)), [len(match.stations) for match in matches])
+        lengths = np.concatenate([match.lengths_m for match in matches]) if names else np.zeros(0)
+
+        weights = np.ones(len(names))
+        if weighting in ('distance', 'grid'):
+            # Routes whose matched stretch has no length fall back to equal weights
+            per_route = np.bincount(route_ids, weights=lengths, minlength=len(matches))
+            weights = np.where(per_route[route_ids] > 0, lengths, 1.0)
+
+        return cls(
+            route_ids=route_ids,
+            station_ids=station_ids.reshape(-1),
+            weights=weights,
+            lengths_m=lengths,
+            stations=list(stations),
+            n_routes=len(matches),
+        )
+
+
+# Weighted per-route means of station AQI and congestion, as group-by
+# reductions over the flattened table. aqi / congestion are aligned with
+# table.stations. Routes with no stations come out as NaN.
+def score_table(table, aqi, congestion):
+    aqi = np.asarray(aqi, dtype=np.float64)
+    congestion = np.asarray(congestion, dtype=np.float64)
+
+    total = np.bincount(table.route_ids, weights=table.weights, minlength=table.n_routes)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        avg_aqi = np.bincount(table.route_ids, weights=table.weights * aqi[table.station_ids],
+                              minlength=table.n_routes) / total
+        avg_congestion = np.bincount(table.route_ids, weights=table.weights * congestion[table.station_ids],
+                                     minlength=table.n_routes) / total
+    return avg_aqi, avg_congestion, avg_aqi + avg_congestion
+
+
+# AQI x hours per route: each matched stretch gets the share of the route's
+# duration that its length is of the route's distance
+def exposure_table(table, aqi, distance_m, duration_s):
+    aqi = np.asarray(aqi, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        seconds_per_m = np.where(distance_m > 0, duration_s / distance_m, 0.0)
+    hours = table.lengths_m * seconds_per_m[table.route_ids] / 3600
+    return np.bincount(table.route_ids, weights=hours * aqi[table.station_ids], minlength=table.n_routes)
+
+
+# Length-weighted AQI and AQI x hours along each whole polyline, sampling
+# `sample(lats, lons)` once at the midpoints of every segment of every route.
+# Routes entirely outside the field come out as NaN.
+def field_exposure(routes, sample, distance_m, duration_s):
+    coords = [route_coordinates(route) for route, _ in routes]
+    starts = np.concatenate([c[:-1] for c in coords])
+    ends = np.concatenate([c[1:] for c in coords])
+    route_ids = np.repeat(np.arange(len(coords)), [max(len(c) - 1, 0) for c in coords])
+
+    lengths = haversine_km(starts[:, 1], starts[:, 0], ends[:, 1], ends[:, 0]) * 1000
+    aqi = np.asarray(sample((starts[:, 1] + ends[:, 1]) / 2, (starts[:, 0] + ends[:, 0]) / 2), dtype=np.float64)
+    ok = np.isfinite(aqi)
+    lengths, aqi, route_ids = lengths[ok], aqi[ok], route_ids[ok]
+
+    total = np.bincount(route_ids, weights=lengths, minlength=len(coords))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        avg_aqi = np.bincount(route_ids, weights=lengths * aqi, minlength=len(coords)) / total
+        seconds_per_m = np.where(distance_m > 0, duration_s / distance_m, 0.0)
+    hours = lengths * seconds_per_m[route_ids] / 3600
+    exposure = np.bincount(route_ids, weights=hours * aqi, minlength=len(coords))
+    return avg_aqi, exposure
+
+
+# Score every candidate at once and return RouteScores, best first.
+# routes: list of (route, preference); matches: RouteMatch per route;
+# aqi_for / congestion_for map a list of station names to values and are
+# called once with the stations of all routes combined. The 'grid' weighting
+# also needs aqi_sampler(lats, lons), e.g. a bound AQIGrid.sample.
+def rank_routes(routes, matches, aqi_for, congestion_for, weighting='station', aqi_sampler=None):
+    if weighting == 'grid' and aqi_sampler is None:
+        raise ValueError("the 'grid' weighting needs an aqi_sampler")
+
+    table = RouteTable.from_matches(matches, weighting)
+    if table.n_routes == 0 or not table.stations:
+        return []
+
+    aqi = np.asarray(aqi_for(table.stations), dtype=np.float64)
+    avg_aqi, avg_congestion, eco_score = score_table(table, aqi, congestion_for(table.stations))
+
+    summaries = [route['features'][0]['properties']['summary'] for route, _ in routes]
+    distance_m = np.array([summary['distance'] for summary in summaries], dtype=np.float64)
+    duration_s = np.array([summary['duration'] for summary in summaries], dtype=np.float64)
+    exposure = exposure_table(table, aqi, distance_m, duration_s)
+
+    if weighting == 'grid':
+        field_aqi, field_dose = field_exposure(routes, aqi_sampler, distance_m, duration_s)
+        covered = np.isfinite(field_aqi)
+        avg_aqi = np.where(covered, field_aqi, avg_aqi)
+        exposure = np.where(covered, field_dose, exposure)
+        eco_score = avg_aqi + avg_congestion
+
+    scores = []
+    for i in np.argsort(eco_score, kind='stable'):
+        if not matches[i].stations:
+            continue
+        route, pref = routes[i]
+        scores.append(RouteScore(
+            route=route,
+            preference=pref,
+            eco_score=float(eco_score[i]),
+            matched_places=list(matches[i].stations),
+            distance_km=float(distance_m[i] / 1000),
+            duration_min=float(duration_s[i] / 60),
+            avg_aqi=float(avg_aqi[i]),
+            avg_congestion=float(avg_congestion[i]),
+            exposure=float(exposure[i]),
+        ))
+    return scores
+
+
+# Candidate routes for one origin/destination pair, reduced to dense
+# (routes x stations) matrices so any number of departures score at once
+# (batch planning, departure sweeps)
+class PairPlan:
+    def __init__(self, routes, errors, matches, weighting):
+        self.preferences = [pref for _, pref in routes]
+        self.errors = errors
+        table = RouteTable.from_matches(matches, weighting)
+        self.stations = table.stations
+
+        summaries = [route['features'][0]['properties']['summary'] for route, _ in routes]
+        self.distance_m = np.array([summary['distance'] for summary in summaries], dtype=np.float64)
+        self.duration_s = np.array([summary['duration'] for summary in summaries], dtype=np.float64)
+
+        shape = (table.n_routes, len(table.stations))
+        self.weights = np.zeros(shape)
+        np.add.at(self.weights, (table.route_ids, table.station_ids), table.weights)
+        # Hours spent near each station, for exposure (as in exposure_table)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            seconds_per_m = np.where(self.distance_m > 0, self.duration_s / self.distance_m, 0.0)
+        self.hours = np.zeros(shape)
+        np.add.at(self.hours, (table.route_ids, table.station_ids),
+                  table.lengths_m * seconds_per_m[table.route_ids] / 3600)
+        self.total = self.weights.sum(axis=1)
+
+    # Every route at every departure from (departures x stations) AQI and
+    # congestion matrices aligned with self.stations: (departures x routes)
+    # avg_aqi, avg_congestion, exposure and eco_score (inf for routes with
+    # no matched stations)
+    def metrics(self, aqi, congestion):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            avg_aqi = aqi @ self.weights.T / self.total
+            avg_congestion = congestion @ self.weights.T / self.total
+        exposure = aqi @ self.hours.T
+        eco_score = np.where(self.total > 0, avg_aqi + avg_congestion, np.inf)
+        return avg_aqi, avg_congestion, exposure, eco_score
+
+    # Best route per departure: dict of result columns
+    def score(self, aqi, congestion):
+        avg_aqi, avg_congestion, exposure, eco_score = self.metrics(aqi, congestion)
+        best = np.argmin(eco_score, axis=1)
+        rows = np.arange(len(aqi))
+        return {
+            'preference': np.array(self.preferences, dtype=object)[best],
+            'eco_score': eco_score[rows, best],
+            'avg_aqi': avg_aqi[rows, best],
+            'avg_congestion': avg_congestion[rows, best],
+            'exposure': exposure[rows, best],
+            'distance_km': self.distance_m[best] / 1000,
+            'duration_min': self.duration_s[best] / 60,
+        }
+
+
+# Routes no other route beats on every objective (lower is better on each)
+# while being strictly better on at least one, in their original order
+def pareto_front(scores, objectives=PARETO_OBJECTIVES):
+    if not scores:
+        return []
+    values = np.array([[getattr(score, name) for name in objectives] for score in scores], dtype=np.float64)
+    # dominated[i, j]: route j is at least as good as route i everywhere and better somewhere
+    no_worse = (values[None, :, :] <= values[:, None, :]).all(axis=2)
+    better = (values[None, :, :] < values[:, None, :]).any(axis=2)
+    dominated = (no_worse & better).any(axis=1)
+    return [score for score, out in zip(scores, dominated) if not out]
@@ -0,0 +1,79 @@
+import hashlib
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+# Unit-sphere cartesian coordinates for arrays of lat/lon in degrees
+def _to_xyz(lats, lons):
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+# Great-circle distance in km, vectorized over arrays of points
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+# KD-tree over monitoring station coordinates.
+# Stations are placed on the unit sphere so the straight-line (chord) distance
+# in the tree is monotonic in great-circle distance; a km threshold converts
+# to a chord bound exactly, and one query maps a whole array of route vertices
+# to their nearest station.
+class StationIndex:
+    def __init__(self, places):
+        from scipy.spatial import cKDTree
+
+        # places: dict of station name -> (lat, lon)
+        self.names = list(places.keys())
+        coords = np.array([places[name] for name in self.names], dtype=np.float64).reshape(-1, 2)
+        self.lats = coords[:, 0]
+        self.lons = coords[:, 1]
+        self._tree = cKDTree(_to_xyz(self.lats, self.lons))
+
+    def __len__(self):
+        return len(self.names)
+
+    # Stable digest of the station set, used to key anything derived from it
+    @property
+    def signature(self):
+        digest = hashlib.sha1()
+        digest.update("\x1f".join(self.names).encode())
+        digest.update(np.column_stack((self.lats, self.lons)).tobytes())
+        return digest.hexdigest()
+
+    # Nearest station id for every point, -1 where none is closer than threshold_km.
+    # Also returns the distances in km (inf where unmatched).
+    def query(self, lats, lons, threshold_km=1.0):
+        points = _to_xyz(lats, lons).reshape(-1, 3)
+        chord = 2 * np.sin(threshold_km / (2 * EARTH_RADIUS_KM))
+        chord_dist, ids = self._tree.query(points, k=1, distance_upper_bound=chord)
+
+        matched = np.isfinite(chord_dist) & (chord_dist < chord)
+        ids = np.where(matched, ids, -1)
+        dist_km = np.full(len(points), np.inf)
+        dist_km[matched] = 2 * EARTH_RADIUS_KM * np.arcsin(chord_dist[matched] / 2)
+        return ids, dist_km
+
+    # Same as query() for an ORS (lon, lat) coordinate list / array
+    def query_lonlat(self, coordinates, threshold_km=1.0):
+        coords = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+        return self.query(coords[:, 1], coords[:, 0], threshold_km)
+
+    # Ordered station names a route passes, consecutive repeats collapsed
+    def match_route(self, coordinates, threshold_km=1.0):
+        ids, _ = self.query_lonlat(coordinates, threshold_km)
+        ids = ids[ids >= 0]
+        if len(ids) == 0:
+            return []
+        keep = np.concatenate(([True], ids[1:] != ids[:-1]))
+        return [self.names[i] for i in ids[keep]]
+
+    def nearest_name(self, lat, lon, threshold_km=1.0):
+        ids, _ = self.query([lat], [lon], threshold_km)
+        return self.names[ids[0]] if ids[0] >= 0 else None